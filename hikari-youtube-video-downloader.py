@@ -29,27 +29,63 @@ Author: Gary19gts
 Website: https://github.com/Gary19gts
 """
 
+import time
+# Taken before any heavy import, for the startup metrics
+STARTED = time.perf_counter()
+
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import threading
 import os
-import re
 import subprocess
 import sys
 from pathlib import Path
-import requests
-from PIL import Image, ImageTk
-import io
 import json
+from hikari import HikariEngine, EngineError, detect_url_type
+from hikari.urls import classify_url, canonical_url
+from hikari.engine import check_quality, check_format, quality_key, is_audio_format, AUDIO_FORMATS, AUDIO_QUALITIES
+from hikari.formats import FormatTable, summarize_formats
+from hikari.cache import MetadataCache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+from hikari.jobs import DownloadJob, DownloadQueue, QUEUED, RUNNING, DONE, FAILED, PAUSED, CANCELLED, PROCESSING
+from hikari.thumbnails import ThumbnailCache
+from hikari.events import EventBus
+from hikari.progress import format_bytes, format_eta
+from hikari.segmented import DEFAULT_CONNECTIONS
+from hikari.journal import JobJournal
+from hikari.bandwidth import BandwidthLimiter
+from hikari.ingest import BulkImport
+from hikari.archive import DownloadArchive, format_key
+from hikari.metrics import StartupMetrics
+from hikari.tracing import Tracer, DEFAULT_TRACE_PATH
+from hikari.postprocess import PostProcessPool, DEFAULT_WORKERS as DEFAULT_POSTPROCESS_WORKERS
+from hikari.workers import ProcessEngine
 
 # CustomTkinter configuration
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
 
+# How often the UI drains events published by worker threads
+UI_EVENT_INTERVAL_MS = 100
+
+# Bandwidth limit choices in MB/s, 0 is unlimited
+BANDWIDTH_LIMITS = {"Unlimited": 0, "1 MB/s": 1, "2 MB/s": 2, "5 MB/s": 5, "10 MB/s": 10, "25 MB/s": 25}
+
+# Share of the bandwidth limit a new job gets relative to running ones
+JOB_PRIORITIES = {"Low": 0.5, "Normal": 1.0, "High": 2.0}
+
+# Auto-analysis delay after a paste and while typing
+ANALYZE_DELAY_PASTE_MS = 150
+ANALYZE_DELAY_TYPING_MS = 800
+
+# Selector choices; audio-only formats offer bitrates instead of resolutions
+VIDEO_QUALITIES = ["4K (2160p)", "2K (1440p)", "1080p", "720p", "480p", "360p", "Best available"]
+OUTPUT_FORMATS = ["mp4", "webm", "mkv"] + list(AUDIO_FORMATS)
+
 class HikariYoutubeDownloader:
-    def __init__(self):
+    def __init__(self, trace=False, worker_processes=None):
         print("Starting Hikari Youtube Video Downloader...")
+        self.metrics = StartupMetrics(STARTED)
         
         # Create main window
         self.root = ctk.CTk()
@@ -78,11 +114,61 @@ class HikariYoutubeDownloader:
         self.video_format = tk.StringVar(value="mp4")
         self.download_library = tk.StringVar(value="yt-dlp")
         self.url_var = tk.StringVar()
+        self.max_workers = tk.StringVar(value=str(self.config.get('max_workers', 3)))
+        self.bandwidth_limit = tk.StringVar(value=self.bandwidth_label(self.config.get('bandwidth_limit', 0)))
+        self.job_priority = tk.StringVar(value="Normal")
+        # Dropdowns of the settings rows, by label
+        self.setting_menus = {}
         
         # Variables for available formats
-        self.available_formats = {}
+        self.available_formats = FormatTable()
         self.video_info = None
         self.current_url = ""
+        self.playlist_entries = []
+        
+        # Running bulk URL import and the jobs it queued
+        self.bulk_import = None
+        self.bulk_job_keys = set()
+        
+        # Debounced auto-analysis; results of older generations are discarded
+        self.analyze_timer = None
+        self.analysis_generation = 0
+        # When the latest analysis was started, for the first-analysis metric
+        self.analysis_started = None
+        self.last_url_length = 0
+        
+        # Worker threads never touch widgets, they publish events here
+        self.events = EventBus()
+        
+        # Per-phase timings written to ~/.hikari/trace.jsonl, off unless asked for
+        trace = trace or self.config.get('trace', False) or os.environ.get('HIKARI_TRACE')
+        self.tracer = Tracer(DEFAULT_TRACE_PATH if trace else None)
+        
+        # Headless engine doing analysis and downloads
+        engine_options = dict(on_event=self.on_engine_event,
+                              cache=self.create_metadata_cache(),
+                              connections=self.config.get('segmented_connections', DEFAULT_CONNECTIONS),
+                              limiter=BandwidthLimiter(self.config.get('bandwidth_limit', 0) * 1024 * 1024),
+                              tracer=self.tracer,
+                              postprocessor=PostProcessPool(self.config.get('postprocess_workers',
+                                                                            DEFAULT_POSTPROCESS_WORKERS)))
+        # Optionally run yt-dlp in worker processes, off this interpreter
+        if worker_processes is None:
+            worker_processes = self.config.get('worker_processes', 0)
+        if worker_processes:
+            self.engine = ProcessEngine(workers=worker_processes, **engine_options)
+        else:
+            self.engine = HikariEngine(**engine_options)
+        
+        # Thumbnails are fetched and resized in background threads
+        self.thumbnails = ThumbnailCache(tracer=self.tracer)
+        
+        # Download queue with a bounded worker pool
+        self.download_queue = DownloadQueue(self.engine,
+                                            max_workers=int(self.max_workers.get()),
+                                            on_update=self.on_job_update,
+                                            journal=self.create_job_journal(),
+                                            archive=self.create_download_archive())
         
         # Setup UI
         self.setup_ui()
@@ -90,6 +176,13 @@ class HikariYoutubeDownloader:
         # Bind to automatically verify URL
         self.url_var.trace('w', self.on_url_change)
         
+        # Start draining worker events
+        self.root.after(UI_EVENT_INTERVAL_MS, self.process_events)
+        
+        # Continue downloads interrupted by the last close or crash
+        self.resume_unfinished_jobs()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Bring window to front
         self.root.lift()
         self.root.attributes('-topmost', True)
@@ -99,10 +192,12 @@ class HikariYoutubeDownloader:
     
     def load_config(self):
         """Load saved configuration"""
+        self.config = {}
         try:
             if self.config_file.exists():
                 with open(self.config_file, 'r') as f:
                     config = json.load(f)
+                    self.config = config
                     self.saved_output_folder = config.get('output_folder', str(Path.home() / "Downloads"))
                     print(f"✅ Configuration loaded: {self.saved_output_folder}")
             else:
@@ -115,15 +210,60 @@ class HikariYoutubeDownloader:
     def save_config(self):
         """Save current configuration"""
         try:
-            config = {
-                'output_folder': self.output_folder.get()
-            }
+            config = dict(self.config)
+            config['output_folder'] = self.output_folder.get()
+            self.config = config
             with open(self.config_file, 'w') as f:
                 json.dump(config, f, indent=2)
             print(f"💾 Configuration saved: {self.output_folder.get()}")
         except Exception as e:
             print(f"⚠️ Error saving configuration: {e}")
     
+    def create_metadata_cache(self):
+        """Open the on-disk metadata cache, or run without it on error"""
+        try:
+            return MetadataCache(ttl=self.config.get('metadata_cache_ttl', DEFAULT_TTL),
+                                 max_entries=self.config.get('metadata_cache_size', DEFAULT_MAX_ENTRIES))
+        except Exception as e:
+            print(f"⚠️ Metadata cache disabled: {e}")
+            return None
+    
+    def create_job_journal(self):
+        """Open the job journal, or run without it on error"""
+        try:
+            return JobJournal()
+        except Exception as e:
+            print(f"⚠️ Job journal disabled: {e}")
+            return None
+    
+    def create_download_archive(self):
+        """Open the download archive, or run without it on error"""
+        try:
+            return DownloadArchive()
+        except Exception as e:
+            print(f"⚠️ Download archive disabled: {e}")
+            return None
+    
+    def resume_unfinished_jobs(self):
+        """Re-queue jobs left queued or running by the previous session"""
+        jobs = self.download_queue.resume_unfinished()
+        if jobs:
+            self.update_status(f"♻️ Resuming {len(jobs)} unfinished download(s)")
+            print(f"♻️ Resuming {len(jobs)} unfinished download(s)")
+    
+    def on_close(self):
+        """Record the queue state before closing the window"""
+        if self.bulk_import:
+            self.bulk_import.cancel()
+        self.download_queue.shutdown()
+        # Merges not started yet are redone from the downloaded streams next time
+        self.engine.postprocessor.shutdown()
+        self.engine.close()
+        self.thumbnails.close()
+        self.metrics.save()
+        self.tracer.disable()
+        self.root.destroy()
+    
     def setup_ui(self):
         # Header con título y autor
         header_frame = ctk.CTkFrame(self.root, fg_color="#f0f0f0", height=120)
@@ -205,6 +345,22 @@ class HikariYoutubeDownloader:
                                          font=ctk.CTkFont(size=13, weight="bold"))
         self.verify_button.pack(side="right")
         
+        # Bulk import of URL lists
+        import_frame = ctk.CTkFrame(url_section, fg_color="transparent")
+        import_frame.pack(fill="x", pady=(8, 0))
+        
+        for text, command in [("📄 Import URL list...", self.import_urls_from_file),
+                              ("📋 Paste URL list", self.import_urls_from_clipboard)]:
+            ctk.CTkButton(import_frame, 
+                          text=text,
+                          command=command,
+                          height=32,
+                          corner_radius=8,
+                          fg_color="#e0e0e0",
+                          hover_color="#c0c0c0",
+                          text_color="#2b2b2b",
+                          font=ctk.CTkFont(size=11)).pack(side="left", fill="x", expand=True, padx=(0, 5))
+        
         # URL warning label (hidden by default)
         self.url_warning_label = ctk.CTkLabel(url_section, 
                                              text="",
@@ -224,7 +380,7 @@ class HikariYoutubeDownloader:
         
         # Video Quality
         quality_frame = self.create_setting_row(settings_section, "Video Quality", self.video_quality,
-                               ["4K (2160p)", "2K (1440p)", "1080p", "720p", "480p", "360p", "Best available"],
+                               VIDEO_QUALITIES,
                                self.on_quality_change)
         
         # Quality status label
@@ -236,7 +392,7 @@ class HikariYoutubeDownloader:
         
         # Video Format  
         format_frame = self.create_setting_row(settings_section, "Video Format", self.video_format,
-                               ["mp4", "webm", "mkv"],
+                               OUTPUT_FORMATS,
                                self.on_format_change)
         
         # Format status label
@@ -248,9 +404,24 @@ class HikariYoutubeDownloader:
         
         # Processing Engine
         self.create_setting_row(settings_section, "Processing Engine", self.download_library,
-                               ["yt-dlp", "pytube"],
+                               ["yt-dlp", "pytube", "segmented"],
                                self.on_library_change)
         
+        # Parallel downloads
+        self.create_setting_row(settings_section, "Parallel Downloads", self.max_workers,
+                               ["1", "2", "3", "4", "6", "8"],
+                               self.on_workers_change)
+        
+        # Bandwidth limit shared by all downloads
+        self.create_setting_row(settings_section, "Bandwidth Limit", self.bandwidth_limit,
+                               list(BANDWIDTH_LIMITS),
+                               self.on_bandwidth_change)
+        
+        # Bandwidth share of new downloads
+        self.create_setting_row(settings_section, "Download Priority", self.job_priority,
+                               list(JOB_PRIORITIES),
+                               None)
+        
         # Output Folder Section
         folder_section = ctk.CTkFrame(left_frame, fg_color="transparent")
         folder_section.pack(fill="x", padx=20, pady=15)
@@ -395,6 +566,58 @@ class HikariYoutubeDownloader:
         self.progress_bar.pack(fill="x")
         self.progress_bar.set(0)
         
+        # Queue throughput and ETA
+        self.throughput_label = ctk.CTkLabel(status_section, 
+                                           text="",
+                                           font=ctk.CTkFont(size=10),
+                                           text_color="#666666")
+        self.throughput_label.pack(anchor="w", pady=(4, 0))
+        
+        # Download queue
+        self.queue_text = ctk.CTkTextbox(status_section, 
+                                        height=80,
+                                        corner_radius=8,
+                                        fg_color="#f5f5f5",
+                                        border_width=1,
+                                        border_color="#d0d0d0",
+                                        font=ctk.CTkFont(size=10))
+        self.queue_text.pack(fill="x", pady=(8, 0))
+        self.queue_text.insert("1.0", "📋 Download queue is empty")
+        self.queue_text.configure(state="disabled")
+        
+        # Pause / resume / cancel for one job or the whole queue
+        queue_controls = ctk.CTkFrame(status_section, fg_color="transparent")
+        queue_controls.pack(fill="x", pady=(8, 0))
+        
+        self.selected_job = ctk.StringVar(value="All jobs")
+        self.job_menu = ctk.CTkOptionMenu(queue_controls, 
+                                         variable=self.selected_job,
+                                         values=["All jobs"],
+                                         height=32,
+                                         corner_radius=8,
+                                         fg_color="#ffffff",
+                                         button_color="#0078d4",
+                                         button_hover_color="#005a9e",
+                                         dropdown_fg_color="#ffffff",
+                                         text_color="#2b2b2b",
+                                         dropdown_text_color="#2b2b2b",
+                                         font=ctk.CTkFont(size=11))
+        self.job_menu.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        
+        for text, command in [("⏸ Pause", self.pause_selected_jobs),
+                              ("▶ Resume", self.resume_selected_jobs),
+                              ("✖ Cancel", self.cancel_selected_jobs)]:
+            ctk.CTkButton(queue_controls, 
+                          text=text,
+                          command=command,
+                          width=80,
+                          height=32,
+                          corner_radius=8,
+                          fg_color="#e0e0e0",
+                          hover_color="#c0c0c0",
+                          text_color="#2b2b2b",
+                          font=ctk.CTkFont(size=11)).pack(side="left", padx=(5, 0))
+        
         # Download Button
         self.download_button = ctk.CTkButton(preview_section, 
                                            text="Download Video",
@@ -484,9 +707,6 @@ class HikariYoutubeDownloader:
                             font=ctk.CTkFont(size=9),
                             text_color="#999999")
         footer.pack(side="bottom", pady=5)
-        
-        # Initialize states
-        self.check_libraries()
     
     def create_setting_row(self, parent, label_text, variable, values, command):
         """Create a settings row with consistent style"""
@@ -515,20 +735,42 @@ class HikariYoutubeDownloader:
                 "Higher quality = larger file size\n"
                 "Lower quality = smaller file size\n\n"
                 "Recommended: 1080p for best balance\n\n"
+                "For audio-only formats, choose a bitrate instead.\n\n"
                 "Note: Not all qualities are available for every video."))
         elif label_text == "Video Format":
             info.bind("<Button-1>", lambda e: self.show_info_dialog("Video Format", 
                 "Select the output video format.\n\n"
                 "• MP4: Most compatible, works everywhere\n"
                 "• WEBM: Good compression, web optimized\n"
-                "• MKV: High quality, supports multiple tracks\n\n"
+                "• MKV: High quality, supports multiple tracks\n"
+                "• M4A / OPUS / MP3: Audio only, no video is downloaded\n"
+                "  (OPUS and MP3 need yt-dlp and ffmpeg)\n\n"
                 "Recommended: MP4 for maximum compatibility"))
         elif label_text == "Processing Engine":
             info.bind("<Button-1>", lambda e: self.show_info_dialog("Processing Engine", 
                 "Select the download library to use.\n\n"
                 "• yt-dlp: More powerful, better format support\n"
-                "• pytube: Simpler, lightweight\n\n"
+                "• pytube: Simpler, lightweight\n"
+                "• segmented: Parallel connections, progressive formats only\n\n"
                 "Recommended: yt-dlp for best results"))
+        elif label_text == "Parallel Downloads":
+            info.bind("<Button-1>", lambda e: self.show_info_dialog("Parallel Downloads", 
+                "Number of videos downloaded at the same time.\n\n"
+                "Each click on 'Download Video' adds the video to the queue\n"
+                "with the quality, format and engine selected at that moment.\n\n"
+                "Recommended: 3 for most connections"))
+        elif label_text == "Bandwidth Limit":
+            info.bind("<Button-1>", lambda e: self.show_info_dialog("Bandwidth Limit", 
+                "Maximum total download speed of all running downloads.\n\n"
+                "The limit is shared between active downloads by priority\n"
+                "and can be changed while they are running.\n\n"
+                "Recommended: Unlimited unless the connection is shared"))
+        elif label_text == "Download Priority":
+            info.bind("<Button-1>", lambda e: self.show_info_dialog("Download Priority", 
+                "Share of the bandwidth limit for newly queued videos.\n\n"
+                "• High: twice the share of a Normal download\n"
+                "• Low: half the share of a Normal download\n\n"
+                "Only matters when a bandwidth limit is set"))
         
         # Dropdown
         dropdown = ctk.CTkOptionMenu(row_frame, 
@@ -545,6 +787,7 @@ class HikariYoutubeDownloader:
                                     dropdown_text_color="#2b2b2b",
                                     font=ctk.CTkFont(size=12))
         dropdown.pack(fill="x")
+        self.setting_menus[label_text] = dropdown
         
         return row_frame
     
@@ -588,6 +831,19 @@ class HikariYoutubeDownloader:
         info += f"🎬 Selected Quality: {self.video_quality.get()}\n"
         info += f"📹 Selected Format: {self.video_format.get()}\n"
         info += f"⚙️ Processing Engine: {self.download_library.get()}\n"
+        info += f"🧭 Tracing: {self.tracer.path if self.tracer.enabled else 'Off'}\n"
+        if isinstance(self.engine, ProcessEngine):
+            workers = self.engine.pool.workers
+            info += f"🧩 Worker processes: {len(workers)}/{self.engine.pool.size} running " \
+                    f"({sum(w.busy for w in workers)} calls in progress)\n"
+        else:
+            info += f"♻️ yt-dlp instances: {self.engine.ydl_pool.created} created, {self.engine.ydl_pool.reused} reused\n"
+        
+        # Startup timings of this session
+        if self.metrics.marks:
+            info += "\n⏱️ Startup:\n"
+            for name, seconds in self.metrics.marks.items():
+                info += f"  {name.replace('_', ' ')}: {seconds:.2f} s\n"
         
         text.insert("1.0", info)
         text.configure(state="disabled")
@@ -635,8 +891,7 @@ class HikariYoutubeDownloader:
         
         for i, lib in enumerate(libraries, 1):
             try:
-                self.root.after(0, lambda l=lib, idx=i, total=len(libraries): 
-                    self.update_status(f"📥 Updating {l}... ({idx}/{total})"))
+                self.publish_status(f"📥 Updating {lib}... ({i}/{len(libraries)})")
                 
                 # Ejecutar pip install --upgrade
                 result = subprocess.run(
@@ -657,7 +912,7 @@ class HikariYoutubeDownloader:
                 failed_libs.append(f"{lib} ({str(e)})")
         
         # Actualizar UI en el hilo principal
-        self.root.after(0, lambda: self._update_libraries_complete(success_count, failed_libs))
+        self.events.call(self._update_libraries_complete, success_count, failed_libs)
     
     def _update_libraries_complete(self, success_count, failed_libs):
         """Callback when update finishes"""
@@ -683,22 +938,46 @@ class HikariYoutubeDownloader:
     
 
     def check_libraries(self):
-        """Check library status"""
+        """Load the selected library in the background, so the first analysis does not wait for it"""
+        threading.Thread(target=self._check_libraries_thread, args=(self.download_library.get(),),
+                         daemon=True).start()
+    
+    def _check_libraries_thread(self, library):
         # Silent verification, no UI messages
-        try:
-            import yt_dlp
-        except ImportError:
-            pass
+        if library == "pytube":
+            try:
+                import pytube
+            except ImportError:
+                pass
         
-        try:
-            import pytube
-        except ImportError:
-            pass
+        # Analysis always uses yt-dlp
+        if self.engine.prewarm():
+            self.metrics.mark('extractor_prewarm')
+    
+    def on_window_shown(self):
+        """First turn of the event loop: record startup time and warm up the engine"""
+        self.root.update_idletasks()
+        self.metrics.mark('time_to_window')
+        self.check_libraries()
     
     def on_url_change(self, *args):
         """Executed when URL changes"""
         url = self.url_var.get().strip()
         
+        # A multi-line paste is a list of URLs, import them all
+        if "\n" in url:
+            self.root.after(0, lambda: self.url_var.set(""))
+            self.import_urls(url.splitlines(), "pasted list")
+            return
+        
+        # A new keystroke supersedes any pending auto-analysis
+        self.cancel_pending_analysis()
+        url_length, self.last_url_length = self.last_url_length, len(url)
+        
+        # Whatever the new text is, results for the old URL no longer apply
+        if url != self.current_url:
+            self.clear_analysis()
+        
         # Hide warning if no URL
         if not url:
             self.url_warning_label.pack_forget()
@@ -707,19 +986,23 @@ class HikariYoutubeDownloader:
         # Detect URL type and show warning if needed
         url_type, message = self.detect_url_type(url)
         
-        if url_type == 'normal_video':
-            # Valid URL - hide warning
-            self.url_warning_label.pack_forget()
+        if url_type in ['normal_video', 'playlist', 'channel']:
+            if url_type == 'normal_video':
+                # Valid URL - hide warning
+                self.url_warning_label.pack_forget()
+            else:
+                # Playlist or channel - every video will be analyzed
+                self.url_warning_label.configure(
+                    text="📃 Playlist/channel detected. All its videos will be analyzed and queued.",
+                    text_color="#0078d4"
+                )
+                self.url_warning_label.pack(fill="x", pady=(5, 0))
             
             if url != self.current_url:
-                # Clear previous information
-                self.available_formats = {}
-                self.video_info = None
-                self.quality_status_label.configure(text="")
-                self.format_status_label.configure(text="")
-                
-                # Automatically verify after delay
-                self.root.after(3000, lambda: self.auto_analyze(url))
+                # Automatically verify after a short delay, shorter for pastes
+                pasted = abs(len(url) - url_length) > 5
+                delay = ANALYZE_DELAY_PASTE_MS if pasted else ANALYZE_DELAY_TYPING_MS
+                self.analyze_timer = self.root.after(delay, lambda: self.auto_analyze(url))
         
         elif url_type == 'video_in_playlist':
             # Soft warning - can try to download
@@ -732,10 +1015,8 @@ class HikariYoutubeDownloader:
         else:
             # Unsupported URL - show warning
             warning_messages = {
-                'playlist': "❌ Playlists not supported. Use individual video URL.",
                 'shorts': "❌ YouTube Shorts not supported. Use normal video URL.",
                 'live': "❌ Live streams not supported.",
-                'channel': "❌ Channel URLs not supported. Use video URL.",
                 'unknown': "❌ URL not recognized. Use format: youtube.com/watch?v=..."
             }
             
@@ -743,13 +1024,30 @@ class HikariYoutubeDownloader:
             self.url_warning_label.configure(text=warning_text, text_color="#dc3545")
             self.url_warning_label.pack(fill="x", pady=(5, 0))
     
+    def clear_analysis(self):
+        """Forget the analyzed video and discard any analysis still running"""
+        self.analysis_generation += 1
+        self.current_url = ""
+        self.available_formats = FormatTable()
+        self.video_info = None
+        self.playlist_entries = []
+        self.quality_status_label.configure(text="")
+        self.format_status_label.configure(text="")
+    
+    def cancel_pending_analysis(self):
+        """Cancel the scheduled auto-analysis, if any"""
+        if self.analyze_timer is not None:
+            self.root.after_cancel(self.analyze_timer)
+            self.analyze_timer = None
+    
     def auto_analyze(self, url):
         """Automatic video analysis"""
+        self.analyze_timer = None
         current_url = self.url_var.get().strip()
         if current_url == url:
             url_type, _ = self.detect_url_type(url)
-            # Solo auto-analizar si es video normal o video en playlist
-            if url_type in ['normal_video', 'video_in_playlist']:
+            # Solo auto-analizar si es video normal, video en playlist o playlist
+            if url_type in ['normal_video', 'video_in_playlist', 'playlist', 'channel']:
                 self.analyze_video()
     
     def on_quality_change(self, value):
@@ -758,12 +1056,42 @@ class HikariYoutubeDownloader:
     
     def on_format_change(self, value):
         """Executed when selected format changes"""
+        self.update_quality_choices()
         self.check_format_availability()
+        self.check_quality_availability()
+    
+    def update_quality_choices(self):
+        """Offer bitrates for audio-only formats and resolutions for video formats"""
+        audio = is_audio_format(self.video_format.get())
+        choices = list(AUDIO_QUALITIES) if audio else VIDEO_QUALITIES
+        self.setting_menus["Video Quality"].configure(values=choices)
+        if self.video_quality.get() not in choices:
+            self.video_quality.set("Best audio" if audio else "1080p")
     
     def on_library_change(self, value):
         """Executed when selected library changes"""
         self.check_libraries()
     
+    def on_workers_change(self, value):
+        """Executed when the number of parallel downloads changes"""
+        self.download_queue.set_max_workers(int(value))
+        self.config['max_workers'] = int(value)
+        self.save_config()
+    
+    def bandwidth_label(self, limit):
+        """Selector entry for a bandwidth limit in MB/s"""
+        for label, value in BANDWIDTH_LIMITS.items():
+            if value == limit:
+                return label
+        return "Unlimited"
+    
+    def on_bandwidth_change(self, value):
+        """Executed when the bandwidth limit changes, running jobs follow it immediately"""
+        limit = BANDWIDTH_LIMITS.get(value, 0)
+        self.engine.limiter.set_rate(limit * 1024 * 1024)
+        self.config['bandwidth_limit'] = limit
+        self.save_config()
+    
     def check_quality_availability(self):
         """Check if selected quality is available"""
         if not self.available_formats:
@@ -776,40 +1104,23 @@ class HikariYoutubeDownloader:
             self.quality_status_label.configure(text="")
             return
         
-        # Map selector qualities to analysis keys correctly
-        quality_mapping = {
-            "4K (2160p)": "2160p",
-            "2K (1440p)": "1440p", 
-            "1080p": "1080p",
-            "720p": "720p",
-            "480p": "480p",
-            "360p": "360p",
-            "240p": "240p",
-            "144p": "144p"
-        }
-        
-        quality_key = quality_mapping.get(selected_quality, selected_quality)
+        key = quality_key(selected_quality)
         
         # Debug: show what is being searched
-        print(f"DEBUG: Searching quality '{selected_quality}' -> key '{quality_key}'")
-        print(f"DEBUG: Available formats: {list(self.available_formats.keys())}")
+        print(f"DEBUG: Searching quality '{selected_quality}' -> key '{key}'")
+        print(f"DEBUG: Available heights: {list(self.available_formats.heights)}")
         
         # Check if quality is available
-        if quality_key in self.available_formats:
+        available, closest_height = check_quality(self.available_formats, selected_quality)
+        if available:
             self.quality_status_label.configure(text="✅ Available")
             self.quality_status_label.configure(text_color="#28a745")
+        elif closest_height:
+            self.quality_status_label.configure(text=f"❌ Not available. Closest: {closest_height}p")
+            self.quality_status_label.configure(text_color="#dc3545")
         else:
-            # Find closest available quality
-            available_heights = [int(k.replace('p', '')) for k in self.available_formats.keys() if k.replace('p', '').isdigit()]
-            target_height = int(quality_key.replace('p', ''))
-            
-            if available_heights:
-                closest_height = min(available_heights, key=lambda x: abs(x - target_height))
-                self.quality_status_label.configure(text=f"❌ Not available. Closest: {closest_height}p")
-                self.quality_status_label.configure(text_color="#dc3545")
-            else:
-                self.quality_status_label.configure(text="❌ Not available")
-                self.quality_status_label.configure(text_color="#dc3545")
+            self.quality_status_label.configure(text="❌ Not available")
+            self.quality_status_label.configure(text_color="#dc3545")
     
     def check_format_availability(self):
         """Check if selected format is available"""
@@ -818,18 +1129,9 @@ class HikariYoutubeDownloader:
             return
         
         selected_format = self.video_format.get()
-        format_available = False
-        
-        for quality, formats in self.available_formats.items():
-            for fmt in formats:
-                if fmt['ext'].lower() == selected_format.lower():
-                    format_available = True
-                    break
-            if format_available:
-                break
         
         # Update status label
-        if format_available:
+        if check_format(self.available_formats, selected_format):
             self.format_status_label.configure(text="✅ Available")
             self.format_status_label.configure(text_color="#28a745")
         else:
@@ -867,51 +1169,13 @@ class HikariYoutubeDownloader:
     
     def detect_url_type(self, url):
         """Detects YouTube URL type and returns information about it"""
-        # Patterns for different URL types
-        patterns = {
-            'normal_video': [
-                r'^(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})$',
-                r'^(?:https?://)?(?:www\.)?youtu\.be/([a-zA-Z0-9_-]{11})$'
-            ],
-            'video_in_playlist': r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})&list=',
-            'playlist': r'(?:https?://)?(?:www\.)?youtube\.com/playlist\?list=',
-            'shorts': r'(?:https?://)?(?:www\.)?youtube\.com/shorts/([a-zA-Z0-9_-]{11})',
-            'live': r'(?:https?://)?(?:www\.)?youtube\.com/live/([a-zA-Z0-9_-]{11})',
-            'channel': r'(?:https?://)?(?:www\.)?youtube\.com/(?:channel|c|user)/',
-        }
-        
-        # Check normal video (without additional parameters)
-        for pattern in patterns['normal_video']:
-            if re.match(pattern, url):
-                return 'normal_video', None
-        
-        # Check video in playlist
-        if re.search(patterns['video_in_playlist'], url):
-            return 'video_in_playlist', "⚠️ Video in playlist URL detected.\n\nThis program only downloads individual videos.\n\nPlease use the video URL without the '&list=' parameter:\n\nCorrect example:\nhttps://www.youtube.com/watch?v=VIDEO_ID"
-        
-        # Check playlist
-        if re.search(patterns['playlist'], url):
-            return 'playlist', "❌ Playlist URL detected.\n\nThis program does NOT support downloading complete playlists.\n\nPlease copy the URL of an individual video."
-        
-        # Check shorts
-        if re.search(patterns['shorts'], url):
-            return 'shorts', "❌ YouTube Shorts URL detected.\n\nThis program does NOT support YouTube Shorts.\n\nPlease use a normal video URL:\nhttps://www.youtube.com/watch?v=VIDEO_ID"
-        
-        # Check live
-        if re.search(patterns['live'], url):
-            return 'live', "❌ Live stream URL detected.\n\nThis program does NOT support live streams.\n\nPlease use a normal video URL."
-        
-        # Check channel
-        if re.search(patterns['channel'], url):
-            return 'channel', "❌ Channel URL detected.\n\nThis program does NOT support downloading channels.\n\nPlease copy the URL of an individual video."
-        
-        return 'unknown', "❌ URL not recognized.\n\nPlease use a valid YouTube video URL:\n\n• https://www.youtube.com/watch?v=VIDEO_ID\n• https://youtu.be/VIDEO_ID"
+        return detect_url_type(url)
     
     def validate_url(self, url):
         """Validates if the URL is a normal YouTube video"""
         url_type, message = self.detect_url_type(url)
         
-        if url_type == 'normal_video':
+        if url_type in ['normal_video', 'playlist', 'channel']:
             return True
         elif url_type == 'video_in_playlist':
             # Show warning but allow to continue
@@ -935,115 +1199,149 @@ class HikariYoutubeDownloader:
             return
         
         # Detect URL type
-        url_type, message = self.detect_url_type(url)
+        url_type, video_id, _ = classify_url(url)
         
         # If video in playlist, clean the URL
         if url_type == 'video_in_playlist':
-            # Extract only the video ID without the playlist parameter
-            match = re.search(r'watch\?v=([a-zA-Z0-9_-]{11})', url)
-            if match:
-                video_id = match.group(1)
-                url = f"https://www.youtube.com/watch?v={video_id}"
-                self.url_var.set(url)  # Update URL in the field
-                messagebox.showinfo("URL Cleaned", 
-                    "The playlist parameter has been removed.\n\n"
-                    "Only the individual video will be downloaded.")
+            # Keep only the video, without the playlist parameter
+            url = canonical_url(video_id)
+            url_type = 'normal_video'
+            self.url_var.set(url)  # Update URL in the field
+            messagebox.showinfo("URL Cleaned", 
+                "The playlist parameter has been removed.\n\n"
+                "Only the individual video will be downloaded.")
         
         # Validate URL
         if not self.validate_url(url):
             return
         
+        self.cancel_pending_analysis()
         self.current_url = url
         
+        # Results of any earlier analysis still running will be discarded
+        self.analysis_generation += 1
+        token = self.analysis_generation
+        self.analysis_started = time.perf_counter()
+        
+        # Playlists and channels are expanded into their videos
+        target = self.fetch_playlist if url_type in ['playlist', 'channel'] else self.fetch_video_formats
+        
         # Execute analysis in separate thread
-        thread = threading.Thread(target=self.fetch_video_formats, args=(url,))
+        thread = threading.Thread(target=target, args=(url, token))
         thread.daemon = True
         thread.start()
     
-    def fetch_video_formats(self, url):
-        """Get available video formats using yt-dlp"""
+    def is_stale(self, token):
+        """True once a newer analysis has been started"""
+        return token != self.analysis_generation
+    
+    def fetch_video_formats(self, url, token):
+        """Get available video formats using the engine"""
         try:
-            self.root.after(0, lambda: self.update_status("🔍 Analyzing video and available formats..."))
+            video_formats, video_info = self.engine.analyze(url)
             
-            import yt_dlp
+            # Update UI in main thread
+            self.events.call(self.apply_analysis, token, video_formats, video_info)
             
-            # Configuration to get complete information
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'listformats': True,
-            }
+        except EngineError as e:
+            self.events.call(self.show_analysis_error, token, e, "❌ Error analyzing video")
+    
+    def apply_analysis(self, token, video_formats, video_info, playlist_entries=None):
+        """Store analysis results unless they were superseded meanwhile"""
+        if self.is_stale(token):
+            print("Discarding results of a superseded analysis")
+            return
+        
+        self.available_formats = video_formats
+        self.video_info = video_info
+        self.playlist_entries = playlist_entries or []
+        # From the click (or auto-analysis) to results, not from process start:
+        # the time the user took to paste a URL says nothing about the app
+        if self.analysis_started is not None:
+            self.metrics.record('first_analysis', time.perf_counter() - self.analysis_started)
+        
+        with self.tracer.span('ui.show_analysis', video_id=video_info.get('id'),
+                              videos=len(playlist_entries) if playlist_entries is not None else None):
+            if playlist_entries is not None:
+                self.show_playlist_results()
+            else:
+                self.show_analysis_results()
+    
+    def show_analysis_error(self, token, error, status):
+        """Report an analysis error unless it was superseded meanwhile"""
+        if self.is_stale(token):
+            return
+        self.update_status(status)
+        messagebox.showerror(error.title, str(error))
+    
+    def fetch_playlist(self, url, token):
+        """Expand a playlist/channel and analyze its videos concurrently"""
+        try:
+            title, entries = self.engine.expand(url)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Extract video information
-                title = info.get('title', 'No title')
-                duration = info.get('duration', 0)
-                uploader = info.get('uploader', 'Unknown')
-                
-                # Process formats in more detail
-                formats = info.get('formats', [])
-                video_formats = {}
-                audio_formats = []
-                
-                for f in formats:
-                    format_id = f.get('format_id', '')
-                    ext = f.get('ext', 'unknown')
-                    filesize = f.get('filesize')
-                    fps = f.get('fps')
-                    vcodec = f.get('vcodec', 'none')
-                    acodec = f.get('acodec', 'none')
-                    height = f.get('height')
-                    width = f.get('width')
-                    
-                    # Filter video formats (that have video codec and height)
-                    if vcodec != 'none' and height and height > 0:
-                        quality_key = f"{height}p"
-                        
-                        if quality_key not in video_formats:
-                            video_formats[quality_key] = []
-                        
-                        size_mb = f"~{filesize // (1024*1024)} MB" if filesize else "Unknown size"
-                        
-                        video_formats[quality_key].append({
-                            'format_id': format_id,
-                            'ext': ext,
-                            'fps': fps if fps else 'N/A',
-                            'size': size_mb,
-                            'vcodec': vcodec,
-                            'acodec': acodec,
-                            'width': width,
-                            'height': height,
-                            'has_audio': acodec != 'none'
-                        })
-                    
-                    # Filter audio formats
-                    elif acodec != 'none' and vcodec == 'none':
-                        audio_formats.append({
-                            'format_id': format_id,
-                            'ext': ext,
-                            'acodec': acodec,
-                            'size': f"~{filesize // (1024*1024)} MB" if filesize else "Unknown size"
-                        })
-                
-                self.available_formats = video_formats
-                self.video_info = {
-                    'title': title,
-                    'duration': duration,
-                    'uploader': uploader,
-                    'audio_formats': audio_formats
-                }
-                
-                # Update UI in main thread
-                self.root.after(0, lambda: self.show_analysis_results())
-                
-        except ImportError:
-            self.root.after(0, lambda: messagebox.showerror("Error", "yt-dlp is not installed.\nRun: pip install yt-dlp"))
-        except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Error analyzing video: {str(e)}"))
-            self.root.after(0, lambda: self.update_status("❌ Error analyzing video"))
+            if self.is_stale(token):
+                return
+            
+            if not entries:
+                self.publish_status("❌ No videos found in playlist")
+                return
+            
+            self.publish_status(f"🔍 Found {len(entries)} videos, analyzing formats...")
+            
+            def on_result(done, total, entry_url, error):
+                self.publish_status(f"🔍 Analyzed {done}/{total} videos...")
+                self.publish_progress(done / total)
+            
+            results = self.engine.analyze_many([entry['url'] for entry in entries],
+                                               max_workers=self.config.get('analysis_workers', 8),
+                                               on_result=on_result,
+                                               cancelled=lambda: self.is_stale(token))
+        except EngineError as e:
+            self.events.call(self.show_analysis_error, token, e, "❌ Error analyzing playlist")
+            return
+        
+        if self.is_stale(token):
+            return
+        
+        analyzed = [result for result in results if result[3] is None]
+        
+        # Merge formats of all videos so quality/format checks cover the whole list
+        merged_formats = FormatTable.merge(video_formats for _, video_formats, _, _ in analyzed)
+        
+        video_info = {
+            'title': title,
+            'duration': sum(info['duration'] or 0 for _, _, info, _ in analyzed),
+            'uploader': f"{len(analyzed)} videos",
+            'audio_formats': merged_formats.audio,
+            'failed': len(results) - len(analyzed)
+        }
+        
+        self.events.call(self.apply_analysis, token, merged_formats, video_info, analyzed)
+    
+    def show_playlist_results(self):
+        """Show the result of a playlist analysis"""
+        if not self.video_info:
+            return
+        
+        self.video_info_frame.pack(fill="x", pady=(0, 10))
+        self.video_title_label.configure(text=f"📃 {self.video_info['title']}")
+        self.video_title_label.pack(pady=(0, 5))
+        
+        duration_min = self.video_info['duration'] // 60
+        status = f"🎬 {self.video_info['uploader']} | ⏱️ {duration_min} min"
+        if self.video_info['failed']:
+            status += f" | ❌ {self.video_info['failed']} unavailable"
+        self.video_status_label.configure(text=status)
+        self.video_status_label.pack()
+        
+        self.formats_frame.pack(fill="x", pady=(0, 15))
+        self.update_formats_display()
+        
+        self.check_quality_availability()
+        self.check_format_availability()
+        
+        self.update_progress(0)
+        self.update_status(f"✅ Playlist verified - {len(self.playlist_entries)} videos ready to queue")
     
     def show_analysis_results(self):
         """Show analysis results"""
@@ -1082,93 +1380,48 @@ class HikariYoutubeDownloader:
         self.update_status("✅ Video verified - Ready to download")
     
     def load_thumbnail(self):
-        """Downloads and displays the video thumbnail"""
+        """Loads the video thumbnail in the background and displays it"""
         if not self.video_info:
             return
         
+        thread = threading.Thread(target=self._load_thumbnail_thread,
+                                  args=(self.video_info.get('id'), self.video_info.get('thumbnail')))
+        thread.daemon = True
+        thread.start()
+    
+    def _load_thumbnail_thread(self, video_id, thumbnail_url):
+        """Fetch and resize the thumbnail without blocking the UI"""
         try:
-            # Get thumbnail URL from yt-dlp
-            import yt_dlp
-            url = self.current_url
-            
-            ydl_opts = {'quiet': True, 'no_warnings': True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                thumbnail_url = info.get('thumbnail')
-                
-                if thumbnail_url:
-                    # Download image
-                    response = requests.get(thumbnail_url, timeout=5)
-                    if response.status_code == 200:
-                        # Convert to PIL image
-                        from PIL import Image
-                        import io
-                        
-                        image_data = io.BytesIO(response.content)
-                        pil_image = Image.open(image_data)
-                        
-                        # Resize to fit frame (max 400x180)
-                        pil_image.thumbnail((400, 160), Image.Resampling.LANCZOS)
-                        
-                        # Convert to CTkImage
-                        ctk_image = ctk.CTkImage(light_image=pil_image, 
-                                                dark_image=pil_image,
-                                                size=pil_image.size)
-                        
-                        # Show in label
-                        self.thumbnail_label.configure(image=ctk_image, text="")
-                        self.thumbnail_label.image = ctk_image  # Keep reference
+            pil_image = self.thumbnails.get(video_id, thumbnail_url)
         except Exception as e:
             print(f"Could not load thumbnail: {e}")
             # If it fails, keep the placeholder
+            return
+        
+        if pil_image is not None:
+            self.events.call(self.show_thumbnail, video_id, pil_image)
+    
+    def show_thumbnail(self, video_id, pil_image):
+        """Display a resized thumbnail if its video is still the current one"""
+        if not self.video_info or self.video_info.get('id') != video_id:
+            return
+        
+        # Convert to CTkImage
+        ctk_image = ctk.CTkImage(light_image=pil_image, 
+                                dark_image=pil_image,
+                                size=pil_image.size)
+        
+        # Show in label
+        self.thumbnail_label.configure(image=ctk_image, text="")
+        self.thumbnail_label.image = ctk_image  # Keep reference
     
     def update_formats_display(self):
         """Update available formats display"""
         if not self.available_formats:
             return
         
-        # Generate analysis text
-        analysis_text = ""
-        
-        # Ordenar por resolución
-        sorted_qualities = sorted(self.available_formats.keys(), 
-                                key=lambda x: int(x.replace('p', '')), reverse=True)
-        
-        # Show available resolutions
-        analysis_text += "🎬 RESOLUTIONS:\n"
-        for quality in sorted_qualities[:6]:  # Show maximum 6
-            formats_list = self.available_formats[quality]
-            height_num = int(quality.replace('p', ''))
-            
-            # Emoji by quality
-            if height_num >= 2160:
-                emoji = "🔥"
-            elif height_num >= 1440:
-                emoji = "⭐"
-            elif height_num >= 1080:
-                emoji = "✅"
-            elif height_num >= 720:
-                emoji = "📺"
-            else:
-                emoji = "📱"
-            
-            # Contar formatos
-            formats_count = len(formats_list)
-            analysis_text += f"  {emoji} {quality} ({formats_count} formats)\n"
-        
-        if len(sorted_qualities) > 6:
-            analysis_text += f"  ... +{len(sorted_qualities)-6} more\n"
-        
-        # Información adicional
-        analysis_text += f"\n📹 FORMATS: "
-        all_formats = set()
-        for formats_list in self.available_formats.values():
-            for fmt in formats_list:
-                all_formats.add(fmt['ext'].upper())
-        analysis_text += ", ".join(sorted(all_formats))
-        
-        # Recomendación
-        analysis_text += "\n\n💡 TIP: MP4 1080p recommended"
+        # Resolutions (maximum 6, highest first), extensions and a tip
+        analysis_text = summarize_formats(self.available_formats)
         
         # Actualizar textbox
         self.formats_text.configure(state="normal")
@@ -1180,11 +1433,41 @@ class HikariYoutubeDownloader:
     
     def update_status(self, message):
         self.status_label.configure(text=message)
-        self.root.update()
     
     def update_progress(self, value):
         self.progress_bar.set(value)
-        self.root.update()
+    
+    def publish_status(self, message):
+        """Thread-safe status update, only the latest pending message is shown"""
+        self.events.publish('status', {'message': message}, coalesce_key='main')
+    
+    def publish_progress(self, value):
+        """Thread-safe progress update, only the latest pending value is shown"""
+        self.events.publish('progress', {'value': value}, coalesce_key='main')
+    
+    def process_events(self):
+        """Drain worker events on the UI thread at a fixed cadence"""
+        jobs_changed = False
+        for kind, data in self.events.drain():
+            try:
+                if kind == 'status':
+                    self.update_status(data['message'])
+                elif kind == 'progress':
+                    self.update_progress(data['value'])
+                elif kind == 'job':
+                    jobs_changed = True
+                    self.handle_job_update(data['job'], data['kind'], data['data'])
+                elif kind == 'import':
+                    self.show_import_progress(data['import'])
+                elif kind == 'call':
+                    data['func'](*data['args'])
+            except Exception as e:
+                print(f"⚠️ Error processing UI event '{kind}': {e}")
+        
+        if jobs_changed:
+            self.update_queue_view()
+        
+        self.root.after(UI_EVENT_INTERVAL_MS, self.process_events)
     
     def start_download(self, is_test=False):
         url = self.url_var.get().strip()
@@ -1201,46 +1484,27 @@ class HikariYoutubeDownloader:
             messagebox.showwarning("Warning", "First analyze the video to see available formats")
             return
         
+        if self.playlist_entries and url == self.current_url:
+            self.queue_playlist(is_test)
+            return
+        
         # Check quality and format availability
         selected_quality = self.video_quality.get()
         selected_format = self.video_format.get()
         
-        if selected_quality != "Best available":
-            # Use same mapping as in check_quality_availability
-            quality_mapping = {
-                "4K (2160p)": "2160p",
-                "2K (1440p)": "1440p", 
-                "1080p": "1080p",
-                "720p": "720p",
-                "480p": "480p",
-                "360p": "360p",
-                "240p": "240p",
-                "144p": "144p"
-            }
-            
-            quality_key = quality_mapping.get(selected_quality, selected_quality)
-            
-            if quality_key not in self.available_formats:
-                response = messagebox.askyesno(
-                    "Quality not available", 
-                    f"Quality {selected_quality} is not available for this video.\n\n"
-                    f"Do you want to download in the best available quality?"
-                )
-                if not response:
-                    return
-                self.video_quality.set("Best available")
+        available, _ = check_quality(self.available_formats, selected_quality)
+        if not available:
+            response = messagebox.askyesno(
+                "Quality not available", 
+                f"Quality {selected_quality} is not available for this video.\n\n"
+                f"Do you want to download in the best available quality?"
+            )
+            if not response:
+                return
+            self.video_quality.set("Best available")
         
         # Check format
-        format_available = False
-        for quality, formats in self.available_formats.items():
-            for fmt in formats:
-                if fmt['ext'].lower() == selected_format.lower():
-                    format_available = True
-                    break
-            if format_available:
-                break
-        
-        if not format_available:
+        if not check_format(self.available_formats, selected_format):
             response = messagebox.askyesno(
                 "Format not available", 
                 f"Format {selected_format} is not available for this video.\n\n"
@@ -1249,213 +1513,244 @@ class HikariYoutubeDownloader:
             if not response:
                 return
             self.video_format.set("mp4")
+            self.update_quality_choices()
         
-        # Disable button
-        self.download_button.configure(state="disabled")
-        
-        # Start download in separate thread
-        thread = threading.Thread(target=self.download_video, args=(url, is_test))
-        thread.daemon = True
-        thread.start()
+        # Offer to download again what the archive already has
+        archive = self.download_queue.archive
+        video_id = classify_url(url)[1]
+        fmt = format_key(self.video_quality.get(), self.video_format.get())
+        if archive is not None and not is_test and archive.contains(video_id, fmt):
+            response = messagebox.askyesno(
+                "Already downloaded",
+                f"This video was already downloaded in {self.video_quality.get()} {self.video_format.get().upper()}.\n\n"
+                f"Do you want to download it again?"
+            )
+            if not response:
+                return
+            archive.remove(video_id, fmt)
+        
+        # Queue the video with the current settings
+        info = self.video_info.get('info') if self.video_info and url == self.current_url else None
+        job = DownloadJob(url,
+                          self.video_quality.get(),
+                          self.video_format.get(),
+                          self.download_library.get(),
+                          self.output_folder.get(),
+                          info=info,
+                          is_test=is_test,
+                          title=self.video_info.get('title') if info else None,
+                          weight=JOB_PRIORITIES.get(self.job_priority.get(), 1.0))
+        self.download_queue.submit(job)
+        self.update_status(f"➕ Added to queue: {job.title}")
     
-    def download_video(self, url, is_test=False):
+    def import_urls_from_file(self):
+        """Pick a text or CSV file of URLs and import it"""
+        path = filedialog.askopenfilename(title="Import URL list",
+                                          filetypes=[("URL lists", "*.txt *.csv"), ("All files", "*.*")])
+        if path:
+            self.import_urls(path, os.path.basename(path))
+    
+    def import_urls_from_clipboard(self):
+        """Import every URL in the clipboard"""
         try:
-            prefix = "🧪 TEST: " if is_test else ""
-            self.update_status(f"{prefix}🚀 Starting download...")
-            self.update_progress(0.1)
-            
-            library = self.download_library.get()
-            
-            if library == "yt-dlp":
-                success = self.download_with_ytdlp_ultimate(url, is_test)
-            else:
-                success = self.download_with_pytube_ultimate(url, is_test)
-            
-            if success:
-                self.update_status(f"{prefix}✅ Download completed successfully!")
-                self.update_progress(1.0)
-                
-                if is_test:
-                    messagebox.showinfo("🧪 Test Successful", "Test download worked correctly!\n\nYou can now download in the quality you want.")
-                else:
-                    messagebox.showinfo("🎉 Success", "Video downloaded successfully!\n\nYou can find your file in the output folder.")
-            else:
-                self.update_status(f"{prefix}❌ Download error")
-                
-        except Exception as e:
-            self.update_status(f"{prefix}❌ Error: {str(e)}")
-            messagebox.showerror("Error", f"Unexpected error: {str(e)}")
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            messagebox.showwarning("Warning", "The clipboard is empty")
+            return
+        self.import_urls(text.splitlines(), "clipboard")
+    
+    def import_urls(self, source, label):
+        """Queue the videos of a URL list with the current settings, in the background"""
+        if self.bulk_import and not self.bulk_import.done:
+            messagebox.showwarning("Warning", "A URL list is already being imported")
+            return
         
-        finally:
-            self.download_button.configure(state="normal")
+        quality = self.video_quality.get()
+        format_ext = self.video_format.get()
+        library = self.download_library.get()
+        output_folder = self.output_folder.get()
+        weight = JOB_PRIORITIES.get(self.job_priority.get(), 1.0)
+        
+        def make_job(url, title):
+            job = DownloadJob(url, quality, format_ext, library, output_folder, title=title, weight=weight)
+            self.bulk_job_keys.add(job.key)
+            return job
+        
+        # Videos already in the archive are skipped before any analysis
+        archive = self.download_queue.archive
+        is_downloaded = None
+        if archive is not None:
+            fmt = format_key(quality, format_ext)
+            is_downloaded = lambda video_id: archive.contains(video_id, fmt)
+        
+        self.update_status(f"📄 Importing URLs from {label}...")
+        self.bulk_import = BulkImport(self.engine, self.download_queue, make_job,
+                                      on_update=self.on_import_update,
+                                      is_downloaded=is_downloaded).start(source)
     
-    def download_with_ytdlp_ultimate(self, url, is_test=False):
-        try:
-            import yt_dlp
-            
-            quality = self.video_quality.get()
-            format_ext = self.video_format.get()
-            
-            # Configure SPECIFIC format selector
-            if quality == "Best available":
-                # Select best available quality in desired format
-                format_selector = f"best[ext={format_ext}]/bestvideo[ext={format_ext}]+bestaudio/best"
-            else:
-                # Map specific qualities
-                quality_map = {
-                    "4K (2160p)": 2160,
-                    "2K (1440p)": 1440,
-                    "1080p": 1080,
-                    "720p": 720,
-                    "480p": 480,
-                    "360p": 360
-                }
-                
-                target_height = quality_map.get(quality, 1080)
-                
-                # VERY specific selector to ensure correct resolution
-                format_selector = (
-                    f"bestvideo[height={target_height}][ext={format_ext}]+bestaudio/"
-                    f"best[height={target_height}][ext={format_ext}]/"
-                    f"bestvideo[height={target_height}]+bestaudio/"
-                    f"best[height={target_height}]/"
-                    f"worst[height>={target_height}][ext={format_ext}]/"
-                    f"worst[height>={target_height}]"
-                )
-            
-            # Configure yt-dlp options
-            output_template = '%(title)s.%(ext)s'
-            if is_test:
-                output_template = 'TEST_' + output_template
-            
-            ydl_opts = {
-                'format': format_selector,
-                'outtmpl': os.path.join(self.output_folder.get(), output_template),
-                'noplaylist': True,
-                'merge_output_format': format_ext,
-                'writeinfojson': False,
-                'writesubtitles': False,
-                'writeautomaticsub': False,
-            }
-            
-            # Show download information
-            self.update_status(f"📥 Downloading: {quality} in {format_ext.upper()} format with yt-dlp...")
-            self.update_progress(0.3)
-            
-            # Crear hook para progreso
-            def progress_hook(d):
-                if d['status'] == 'downloading':
-                    try:
-                        percent = d.get('_percent_str', '0%').replace('%', '')
-                        progress = float(percent) / 100
-                        self.root.after(0, lambda: self.update_progress(0.3 + (progress * 0.6)))
-                    except:
-                        pass
-                elif d['status'] == 'finished':
-                    self.root.after(0, lambda: self.update_progress(0.9))
-            
-            ydl_opts['progress_hooks'] = [progress_hook]
-            
-            # Download
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # First get info to verify format to be downloaded
-                info = ydl.extract_info(url, download=False)
-                
-                # Show which format was selected
-                selected_format = ydl.process_info(info)
-                
-                # Now download
-                ydl.download([url])
-            
-            self.update_progress(1.0)
-            return True
-            
-        except ImportError:
-            messagebox.showerror("Error", "yt-dlp is not installed.\nRun: pip install yt-dlp")
-            return False
-        except Exception as e:
-            error_msg = str(e)
-            messagebox.showerror("Error yt-dlp", f"Error with yt-dlp:\n{error_msg}\n\nTry pytube or verify the URL.")
-            return False
+    def on_import_update(self, bulk_import):
+        """Called from the import thread"""
+        self.events.publish('import', {'import': bulk_import}, coalesce_key='import')
     
-    def download_with_pytube_ultimate(self, url, is_test=False):
-        try:
-            from pytube import YouTube
-            
-            self.update_status("📥 Downloading with pytube...")
-            self.update_progress(0.3)
-            
-            yt = YouTube(url)
-            
-            quality = self.video_quality.get()
-            format_ext = self.video_format.get()
+    def show_import_progress(self, bulk_import):
+        stats = bulk_import.stats
+        summary = (f"{stats['queued']} queued, {stats['archived']} already downloaded, "
+                   f"{stats['duplicates']} duplicates, {stats['skipped']} unsupported")
+        if bulk_import.done:
+            self.update_status(f"✅ URL list imported: {summary}")
+        else:
+            self.update_status(f"📄 Importing URLs: {summary}")
+    
+    def queue_playlist(self, is_test=False):
+        """Queue every analyzed playlist video with the current settings"""
+        selected_quality = self.video_quality.get()
+        selected_format = self.video_format.get()
+        
+        # Queued together, so the journal is written once for the whole list
+        jobs = []
+        for entry_url, video_formats, video_info, _ in self.playlist_entries:
+            # Fall back per video instead of asking for each one
+            available, _ = check_quality(video_formats, selected_quality)
+            quality = selected_quality if available else "Best available"
+            format_ext = selected_format if check_format(video_formats, selected_format) else "mp4"
             
-            # Map qualities
-            quality_map = {
-                "4K (2160p)": "2160p",
-                "2K (1440p)": "1440p",
-                "1080p": "1080p",
-                "720p": "720p",
-                "480p": "480p",
-                "360p": "360p"
-            }
+            jobs.append(DownloadJob(entry_url,
+                                    quality,
+                                    format_ext,
+                                    self.download_library.get(),
+                                    self.output_folder.get(),
+                                    info=video_info.get('info'),
+                                    is_test=is_test,
+                                    title=video_info['title'],
+                                    weight=JOB_PRIORITIES.get(self.job_priority.get(), 1.0)))
+        self.download_queue.submit_many(jobs)
+        
+        self.update_status(f"➕ Added {len(self.playlist_entries)} videos to queue")
+    
+    def on_engine_event(self, kind, data):
+        """Forward engine events to the UI thread"""
+        if kind == 'status':
+            self.publish_status(data['message'])
+        elif kind == 'progress':
+            self.publish_progress(data['value'])
+    
+    def on_job_update(self, job, kind, data):
+        """Called from queue workers, forwards job changes to the UI thread"""
+        # Progress and status of a job are coalesced, state changes are not
+        coalesce_key = (job.job_id, kind) if kind in ['progress', 'status'] else None
+        self.events.publish('job', {'job': job, 'kind': kind, 'data': data}, coalesce_key=coalesce_key)
+    
+    def handle_job_update(self, job, kind, data):
+        """Reflect a job change in the status line, progress bar and queue list"""
+        prefix = "🧪 TEST: " if job.is_test else ""
+        # Imported lists report in the status line, not one dialog per video
+        bulk = job.key in self.bulk_job_keys
+        if bulk and job.status == DONE:
+            # Done jobs are never retried, so the set only grows with unfinished ones
+            self.bulk_job_keys.discard(job.key)
+        importing = self.bulk_import is not None and not self.bulk_import.done
+        
+        if kind == 'status':
+            self.update_status(f"{prefix}{data['message']}")
+        elif kind == 'job':
+            if job.status == RUNNING:
+                self.update_status(f"{prefix}🚀 Starting download: {job.title}")
+            elif job.status == DONE:
+                self.update_status(f"{prefix}✅ Download completed: {job.title}")
+                if job.is_test:
+                    messagebox.showinfo("🧪 Test Successful", "Test download worked correctly!\n\nYou can now download in the quality you want.")
+                elif not self.download_queue.active_jobs() and not importing:
+                    messagebox.showinfo("🎉 Success", "All queued videos downloaded successfully!\n\nYou can find your files in the output folder.")
+            elif job.status == FAILED:
+                self.update_status(f"{prefix}❌ Download error: {job.title}")
+                if not bulk:
+                    messagebox.showerror(job.error.title, str(job.error))
+            elif job.status == PAUSED:
+                self.update_status(f"{prefix}⏸ Download paused: {job.title}")
+            elif job.status == CANCELLED:
+                self.update_status(f"{prefix}✖ Download cancelled: {job.title}")
+            elif job.status == PROCESSING:
+                self.update_status(f"{prefix}🎞️ Merging: {job.title}")
+    
+    def job_label(self, job):
+        """Entry of a job in the pause/resume/cancel selector"""
+        return f"#{job.job_id} {job.title[:40]}"
+    
+    def selected_jobs(self):
+        """Jobs targeted by the queue control buttons"""
+        selected = self.selected_job.get()
+        if selected == "All jobs":
+            return list(self.download_queue.jobs)
+        return [job for job in self.download_queue.jobs if self.job_label(job) == selected]
+    
+    def pause_selected_jobs(self):
+        for job in self.selected_jobs():
+            self.download_queue.pause(job)
+    
+    def resume_selected_jobs(self):
+        for job in self.selected_jobs():
+            # Failed jobs are only retried when picked explicitly
+            if job.status != FAILED or self.selected_job.get() != "All jobs":
+                self.download_queue.resume(job)
+    
+    def cancel_selected_jobs(self):
+        for job in self.selected_jobs():
+            self.download_queue.cancel(job)
+    
+    def update_queue_view(self):
+        """Refresh the overall progress bar and the queue list"""
+        # Overall progress of the jobs still in the queue
+        active = self.download_queue.active_jobs()
+        if active:
+            stats = self.download_queue.stats()
+            running = len([job for job in active if job.status == RUNNING])
+            paused = len([job for job in active if job.status == PAUSED])
+            merging = len([job for job in active if job.status == PROCESSING])
             
-            if quality == "Best available":
-                # Search for best available quality in desired format
-                stream = yt.streams.filter(file_extension=format_ext, progressive=True).order_by('resolution').desc().first()
-                if not stream:
-                    stream = yt.streams.filter(file_extension=format_ext, adaptive=True, only_video=True).order_by('resolution').desc().first()
-                if not stream:
-                    stream = yt.streams.filter(progressive=True).order_by('resolution').desc().first()
+            # Byte-based progress once sizes are known, job average before that
+            if stats['total_bytes']:
+                self.progress_bar.set(stats['value'])
             else:
-                resolution = quality_map.get(quality, "1080p")
-                
-                # Search for specific stream with exact resolution
-                stream = yt.streams.filter(res=resolution, file_extension=format_ext, progressive=True).first()
-                
-                if not stream:
-                    # Search for adaptive stream
-                    stream = yt.streams.filter(res=resolution, file_extension=format_ext, adaptive=True, only_video=True).first()
-                
-                if not stream:
-                    # Search for any stream with that resolution
-                    stream = yt.streams.filter(res=resolution).first()
-                
-                if not stream:
-                    # As last resort, search for closest quality
-                    available_streams = yt.streams.filter(file_extension=format_ext).order_by('resolution').desc()
-                    stream = available_streams.first()
-            
-            if not stream:
-                messagebox.showerror("Error", f"No stream found for {quality} in {format_ext} format")
-                return False
-            
-            self.update_progress(0.5)
-            
-            # Show selected stream information
-            actual_resolution = getattr(stream, 'resolution', 'Unknown')
-            actual_format = getattr(stream, 'mime_type', format_ext)
+                self.progress_bar.set(sum(j.progress for j in active) / len(active))
             
-            self.update_status(f"📥 Downloading: {actual_resolution} {actual_format}")
-            
-            # Download with custom name if test
-            output_path = self.output_folder.get()
-            filename = None
-            if is_test:
-                filename = f"TEST_{yt.title}"
-            
-            stream.download(output_path=output_path, filename=filename)
-            
-            self.update_progress(0.9)
-            return True
-            
-        except ImportError:
-            messagebox.showerror("Error", "pytube is not installed.\nRun: pip install pytube")
-            return False
-        except Exception as e:
-            error_msg = str(e)
-            messagebox.showerror("Error pytube", f"Error with pytube:\n{error_msg}\n\nTry yt-dlp or update pytube.")
-            return False
+            self.throughput_label.configure(
+                text=f"📊 {running} active, {len(active) - running - paused - merging} queued, {paused} paused, "
+                     f"{merging} merging | "
+                     f"{format_bytes(stats['speed'])}/s | "
+                     f"{format_bytes(stats['downloaded_bytes'])} / {format_bytes(stats['total_bytes'])} | "
+                     f"ETA {format_eta(stats['eta'])}"
+            )
+        else:
+            self.throughput_label.configure(text="")
+            if any(job.status == DONE for job in self.download_queue.jobs):
+                self.progress_bar.set(1.0)
+        
+        self.update_queue_display()
+    
+    def update_queue_display(self):
+        """Update the download queue list"""
+        icons = {QUEUED: "⏳", RUNNING: "📥", DONE: "✅", FAILED: "❌", PAUSED: "⏸", CANCELLED: "✖", PROCESSING: "🎞️"}
+        
+        lines = []
+        for job in self.download_queue.jobs[-50:]:
+            line = f"{icons.get(job.status, '•')} {job.title} - {job.quality} {job.format_ext.upper()}"
+            if job.status == RUNNING:
+                line += f" ({int(job.progress * 100)}%"
+                if job.transfer.get('speed'):
+                    line += f", {format_bytes(job.transfer['speed'])}/s, ETA {format_eta(job.transfer.get('eta'))}"
+                line += ")"
+            lines.append(line)
+        
+        self.queue_text.configure(state="normal")
+        self.queue_text.delete("1.0", "end")
+        self.queue_text.insert("1.0", "\n".join(lines) if lines else "📋 Download queue is empty")
+        self.queue_text.configure(state="disabled")
+        
+        # Keep the job selector in sync with the queue
+        labels = ["All jobs"] + [self.job_label(job) for job in self.download_queue.jobs[-50:]]
+        self.job_menu.configure(values=labels)
+        if self.selected_job.get() not in labels:
+            self.selected_job.set("All jobs")
     
     def open_folder(self):
         try:
@@ -1471,14 +1766,27 @@ class HikariYoutubeDownloader:
     
     def run(self):
         print("Showing window...")
+        self.root.after(0, self.on_window_shown)
         self.root.mainloop()
         print("Application closed")
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Hikari Youtube Video Downloader")
+    parser.add_argument("--urls", metavar="FILE",
+                        help="text or CSV file of URLs to queue on startup, '-' to read them from stdin")
+    parser.add_argument("--trace", action="store_true",
+                        help="write per-phase timings of analyses and downloads to ~/.hikari/trace.jsonl")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="run yt-dlp in N worker processes instead of the window's process (0 to disable)")
+    args = parser.parse_args()
+    
     try:
         print("=== Hikari Youtube Video Downloader ===")
         print("Developed by Gary19gts")
-        app = HikariYoutubeDownloader()
+        app = HikariYoutubeDownloader(trace=args.trace, worker_processes=args.workers)
+        if args.urls:
+            app.import_urls(args.urls, "stdin" if args.urls == "-" else os.path.basename(args.urls))
         app.run()
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,13 @@
+"""
+Hikari Youtube Video Downloader - Core package
+Headless analysis and download engine shared by the GUI and batch workers
+
+Copyright (C) 2025 Gary19gts
+Licensed under AGPL-3.0 or a commercial license (see LICENSE)
+"""
+
+from .engine import HikariEngine, EngineError, DownloadStopped
+from .urls import detect_url_type, classify_url, classify_urls, canonical_url
+
+__all__ = ['HikariEngine', 'EngineError', 'DownloadStopped', 'detect_url_type', 'classify_url', 'classify_urls',
+           'canonical_url']
@@ -0,0 +1,123 @@
+"""
+Hikari Youtube Video Downloader - Download archive
+
+SQLite index of finished downloads keyed by video ID and chosen format,
+so queued or imported videos that are already on disk are skipped without
+analysing them again. Output folders are scanned once with os.scandir so
+files downloaded before the archive existed are recognised by name.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .cache import DATA_DIR
+
+
+DEFAULT_ARCHIVE_PATH = DATA_DIR / "archive.sqlite"
+
+
+def format_key(quality, format_ext):
+    """Archive key of a quality/format choice, e.g. '1080p/mp4'"""
+    return f"{quality}/{format_ext}"
+
+
+def _folder_key(folder):
+    return os.path.normcase(os.path.abspath(folder))
+
+
+class DownloadArchive:
+    """Finished downloads by (video ID, format) plus a name index of output folders"""
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS downloads ("
+            " video_id TEXT NOT NULL,"
+            " format TEXT NOT NULL,"
+            " path TEXT,"
+            " title TEXT,"
+            " downloaded REAL NOT NULL,"
+            " PRIMARY KEY (video_id, format))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " folder TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " PRIMARY KEY (folder, name))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS folders (folder TEXT PRIMARY KEY, scanned REAL NOT NULL)")
+        self._conn.commit()
+
+    def contains(self, video_id, fmt):
+        """True if the video was downloaded in this format and its file is still there"""
+        if not video_id:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path FROM downloads WHERE video_id = ? AND format = ?", (video_id, fmt)
+            ).fetchone()
+        return row is not None and (not row[0] or os.path.exists(row[0]))
+
+    def add(self, video_id, fmt, path=None, title=None):
+        """Record a finished download"""
+        if not video_id:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (video_id, format, path, title, downloaded) VALUES (?, ?, ?, ?, ?)",
+                (video_id, fmt, str(path) if path else None, title, time.time())
+            )
+            if path:
+                self._conn.execute("INSERT OR IGNORE INTO files (folder, name) VALUES (?, ?)",
+                                   (_folder_key(os.path.dirname(str(path))), os.path.basename(str(path)).lower()))
+            self._conn.commit()
+
+    def remove(self, video_id, fmt):
+        """Forget a download so it is fetched again"""
+        with self._lock:
+            self._conn.execute("DELETE FROM downloads WHERE video_id = ? AND format = ?", (video_id, fmt))
+            self._conn.commit()
+
+    def has_file(self, path):
+        """True if a file with this name exists in its folder, scanning the folder the first time"""
+        folder, name = os.path.split(str(path))
+        folder = _folder_key(folder)
+        self.bootstrap(folder)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM files WHERE folder = ? AND name = ?", (folder, name.lower())
+            ).fetchone()
+        # The index may be stale if the user deleted the file since
+        return row is not None and os.path.exists(path)
+
+    def bootstrap(self, folder, force=False):
+        """Index the file names of an output folder, once unless forced"""
+        folder = _folder_key(folder)
+        with self._lock:
+            if not force and self._conn.execute(
+                    "SELECT 1 FROM folders WHERE folder = ?", (folder,)).fetchone():
+                return
+
+        try:
+            with os.scandir(folder) as entries:
+                names = [(folder, entry.name.lower()) for entry in entries
+                         if entry.is_file() and not entry.name.endswith(('.part', '.ytdl'))]
+        except OSError:
+            names = []
+
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO files (folder, name) VALUES (?, ?)", names)
+            self._conn.execute("INSERT OR REPLACE INTO folders (folder, scanned) VALUES (?, ?)",
+                               (folder, time.time()))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
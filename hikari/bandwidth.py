@@ -0,0 +1,107 @@
+"""
+Hikari Youtube Video Downloader - Bandwidth limiter
+
+Global token bucket shared by every running download. The rate is split
+between the jobs that are currently transferring in proportion to their
+weights, and both the rate and the weights can be changed while jobs run.
+Backends call the limiter from their progress callbacks, so a job that is
+over its share simply sleeps before reading its next chunk.
+"""
+
+import threading
+import time
+
+
+# Jobs that reported bytes this recently count towards the fair share
+ACTIVE_WINDOW = 2.0
+# Seconds of transfer a job may burst after being idle
+BURST_SECONDS = 0.5
+# Longest single sleep, so rate changes and cancels are picked up quickly
+MAX_SLEEP = 0.25
+
+
+class BandwidthLimiter:
+    """Weighted fair token bucket; a rate of 0 means unlimited"""
+
+    def __init__(self, rate=0):
+        self.rate = max(0, rate or 0)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        """Change the aggregate limit in bytes per second, 0 for unlimited"""
+        with self._lock:
+            self.rate = max(0, rate or 0)
+
+    def set_weight(self, key, weight):
+        """Change the share of a job, relative to the other active jobs"""
+        with self._lock:
+            self._job(key)['weight'] = max(0.01, float(weight))
+
+    def release(self, key):
+        """Forget a finished job"""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def consume(self, key, nbytes, should_abort=None):
+        """Charge ``nbytes`` to a job, sleeping until its share has paid for them"""
+        if nbytes <= 0:
+            return
+        with self._lock:
+            job = self._refill(key)
+            if job is None:
+                return
+            # The chunk is already read; go into debt and wait it off
+            job['tokens'] -= nbytes
+
+        while True:
+            with self._lock:
+                job = self._refill(key)
+                if job is None or job['tokens'] >= 0:
+                    return
+                wait = -job['tokens'] / job['share']
+            if should_abort and should_abort():
+                return
+            time.sleep(min(wait, MAX_SLEEP))
+
+    def meter(self, key, should_abort=None):
+        """Returns ``report(name, downloaded_bytes)`` for cumulative counters
+
+        Only growth is charged. The first count of each name is taken as
+        the baseline, so a resumed file does not pay again for the bytes
+        it already had on disk.
+        """
+        seen = {}
+        lock = threading.Lock()
+
+        def report(name, downloaded_bytes):
+            downloaded_bytes = downloaded_bytes or 0
+            with lock:
+                delta = downloaded_bytes - seen.get(name, downloaded_bytes)
+                seen[name] = max(seen.get(name, 0), downloaded_bytes)
+            self.consume(key, delta, should_abort)
+
+        return report
+
+    def _job(self, key):
+        # Called with the lock held
+        job = self._jobs.get(key)
+        if job is None:
+            # Not active until it transfers something
+            job = self._jobs[key] = {'weight': 1.0, 'tokens': 0.0, 'share': 0.0,
+                                     'last': time.monotonic(), 'seen': float('-inf')}
+        return job
+
+    def _refill(self, key):
+        # Called with the lock held; None when the limiter is off
+        if not self.rate:
+            return None
+        now = time.monotonic()
+        job = self._job(key)
+        job['seen'] = now
+
+        active_weight = sum(j['weight'] for j in self._jobs.values() if now - j['seen'] <= ACTIVE_WINDOW)
+        job['share'] = self.rate * job['weight'] / active_weight
+        job['tokens'] = min(job['share'] * BURST_SECONDS, job['tokens'] + (now - job['last']) * job['share'])
+        job['last'] = now
+        return job
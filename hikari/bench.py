@@ -0,0 +1,229 @@
+"""
+Hikari Youtube Video Downloader - Analysis micro-benchmarks
+
+Replays extract_info dicts through the analysis path without touching the
+network: building the format table, quality and format checks, format
+planning and the formats summary, plus merging a playlist's tables.
+Fixtures are synthetic by default (from a handful of formats up to
+several hundred) and recorded info dicts can be added as JSON files:
+
+    python -m hikari.bench
+    python -m hikari.bench --fixture recorded.json --repeat 500
+
+Each operation reports its mean time and peak memory allocated per call,
+measured with tracemalloc in a separate pass so it does not skew timings.
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from .engine import HikariEngine, QUALITY_MAPPING, check_quality, check_format, quality_height
+from .formats import FormatTable, summarize_formats
+from .planner import plan_formats
+
+
+# Height, width and the usual yt-dlp video format IDs at that height (avc1, vp9, av01)
+LADDER = [
+    (144, 256, ('160', '278', '394')),
+    (240, 426, ('133', '242', '395')),
+    (360, 640, ('134', '243', '396')),
+    (480, 854, ('135', '244', '397')),
+    (720, 1280, ('136', '247', '398')),
+    (1080, 1920, ('137', '248', '399')),
+    (1440, 2560, ('264', '271', '400')),
+    (2160, 3840, ('266', '313', '401')),
+]
+VIDEO_CODECS = (('mp4', 'avc1.640028'), ('webm', 'vp9'), ('mp4', 'av01.0.08M.08'))
+AUDIO_FORMATS = (('139', 'm4a', 'mp4a.40.5', 48), ('140', 'm4a', 'mp4a.40.2', 128),
+                 ('249', 'webm', 'opus', 50), ('250', 'webm', 'opus', 70), ('251', 'webm', 'opus', 160))
+
+# Fixture name -> number of video formats
+SIZES = {'small': 6, 'typical': 24, 'large': 120, 'huge': 480}
+PLAYLIST_SIZE = 50
+
+
+def synthetic_info(video_formats=24, seed=0, video_id='bench0000000'):
+    """An extract_info-like dict with ``video_formats`` video formats and the usual audio ones
+
+    Large counts repeat the ladder the way HLS/DASH variants, dubbed
+    tracks and storyboards inflate real format lists.
+    """
+    rng = random.Random(seed)
+    formats = []
+    for format_id, ext, acodec, abr in AUDIO_FORMATS:
+        formats.append({'format_id': format_id, 'ext': ext, 'vcodec': 'none', 'acodec': acodec,
+                        'abr': abr, 'tbr': abr, 'filesize': rng.randint(1, 9) * 10 ** 6, 'protocol': 'https'})
+    for i in range(video_formats):
+        height, width, ids = LADDER[i % len(LADDER)]
+        variant = i // len(LADDER)
+        codec = variant % len(VIDEO_CODECS)
+        ext, vcodec = VIDEO_CODECS[codec]
+        # Every few rounds a progressive or HLS variant, like formats 18/22 and 9x
+        progressive = variant % 4 == 3
+        formats.append({
+            'format_id': ids[codec] + (f'-{variant}' if variant >= len(VIDEO_CODECS) else ''),
+            'ext': ext, 'height': height, 'width': width, 'fps': rng.choice((24, 30, 60)),
+            'vcodec': vcodec, 'acodec': 'mp4a.40.2' if progressive else 'none',
+            'tbr': height * rng.uniform(1.5, 3.0),
+            'filesize': None if variant % 2 else rng.randint(1, 500) * 10 ** 6,
+            'filesize_approx': rng.randint(1, 500) * 10 ** 6,
+            'protocol': 'm3u8_native' if variant % 4 == 2 else 'https',
+        })
+    # yt-dlp lists formats worst to best
+    formats.sort(key=lambda f: (f.get('height') or 0, f.get('tbr') or 0))
+    return {
+        'id': video_id, 'title': f'Benchmark video {seed}', 'duration': 600, 'uploader': 'Hikari',
+        'thumbnails': [{'url': f'https://i.ytimg.com/vi/{video_id}/{name}.jpg', 'width': w, 'height': h}
+                       for name, w, h in (('default', 120, 90), ('mqdefault', 320, 180),
+                                          ('hqdefault', 480, 360), ('maxresdefault', 1280, 720))],
+        'formats': formats,
+    }
+
+
+def load_fixture(path):
+    """Info dict(s) recorded with ``yt-dlp -J`` or json.dump(extract_info(...))"""
+    with open(path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+    # A recorded playlist yields one fixture per entry that has formats
+    if info.get('entries'):
+        return [entry for entry in info['entries'] if entry and entry.get('formats')]
+    return [info]
+
+
+def measure(func, repeat):
+    """(mean seconds, bytes allocated per call) of ``func()``"""
+    func()  # warm up caches and lazy imports
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / repeat
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # Allocations in a separate, shorter pass: tracemalloc slows everything down.
+    # The peak above the starting point counts short-lived garbage as well as
+    # what the call keeps.
+    calls = max(1, min(repeat, 20))
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            allocated += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return elapsed, allocated // calls
+
+
+def operations(info, engine):
+    """Named callables covering the analysis path for one info dict"""
+    table, _ = engine.process_formats(info)
+    qualities = list(QUALITY_MAPPING) + ["Best available"]
+
+    def check_all():
+        for quality in qualities:
+            check_quality(table, quality)
+        for ext in ('mp4', 'webm', 'mkv'):
+            check_format(table, ext)
+
+    def plan_all():
+        for quality in qualities:
+            height = quality_height(quality)
+            plan_formats(table, height, 'mp4')
+            plan_formats(table, height, 'webm', merge=False)
+
+    return [
+        ('process_formats', lambda: engine.process_formats(info)),
+        ('check_quality/format', check_all),
+        ('plan_formats', plan_all),
+        ('summarize_formats', lambda: summarize_formats(table)),
+    ]
+
+
+def playlist_operations(infos, engine):
+    """Analysis of a whole playlist: one table per video, merged for the summary"""
+    def analyze():
+        tables = [engine.process_formats(info)[0] for info in infos]
+        summarize_formats(FormatTable.merge(tables))
+
+    tables = [engine.process_formats(info)[0] for info in infos]
+    return [
+        ('process_formats xN', lambda: [engine.process_formats(info) for info in infos]),
+        ('merge tables', lambda: FormatTable.merge(tables)),
+        ('analyze playlist', analyze),
+    ]
+
+
+def format_size(nbytes):
+    if nbytes >= 1024 * 1024:
+        return f"{nbytes / (1024 * 1024):.1f} MB"
+    if nbytes >= 1024:
+        return f"{nbytes / 1024:.1f} KB"
+    return f"{nbytes} B"
+
+
+def run(fixtures, repeat=200, playlist_size=PLAYLIST_SIZE, out=sys.stdout):
+    """Benchmark every fixture, returning rows of (fixture, operation, seconds, bytes)"""
+    engine = HikariEngine()
+    rows = []
+
+    def report(fixture, name, func, times):
+        elapsed, allocated = measure(func, times)
+        rows.append((fixture, name, elapsed, allocated))
+        print(f"{fixture:<24} {name:<22} {elapsed * 1e6:>12.1f} µs {format_size(allocated):>10}", file=out)
+
+    print(f"{'fixture':<24} {'operation':<22} {'time/call':>15} {'alloc/call':>10}", file=out)
+    for fixture, info in fixtures:
+        for name, func in operations(info, engine):
+            report(fixture, name, func, repeat)
+
+    if playlist_size:
+        infos = [synthetic_info(SIZES['typical'], seed=i, video_id=f'bench{i:06d}')
+                 for i in range(playlist_size)]
+        # Whole playlists are slow enough that fewer rounds are just as stable
+        for name, func in playlist_operations(infos, engine):
+            report(f"playlist x{playlist_size}", name, func, max(1, repeat // 20))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m hikari.bench",
+                                     description="Offline micro-benchmarks of the analysis path")
+    parser.add_argument('--fixture', action='append', default=[], metavar='FILE',
+                        help="recorded extract_info JSON to benchmark as well (repeatable)")
+    parser.add_argument('--repeat', type=int, default=200, help="calls per operation (default 200)")
+    parser.add_argument('--playlist', type=int, default=PLAYLIST_SIZE, metavar='N',
+                        help=f"videos in the playlist benchmark, 0 to skip (default {PLAYLIST_SIZE})")
+    parser.add_argument('--no-synthetic', action='store_true', help="only benchmark --fixture files")
+    parser.add_argument('--json', metavar='FILE', help="also write the results as JSON, to compare runs")
+    args = parser.parse_args(argv)
+
+    fixtures = []
+    if not args.no_synthetic:
+        fixtures += [(f"synthetic {name} ({count})", synthetic_info(count)) for name, count in SIZES.items()]
+    for path in args.fixture:
+        for index, info in enumerate(load_fixture(path)):
+            fixtures.append((f"{info.get('id') or path}#{index}", info))
+
+    rows = run(fixtures, args.repeat, args.playlist)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([{'fixture': fixture, 'operation': name, 'seconds': seconds, 'bytes': nbytes}
+                       for fixture, name, seconds, nbytes in rows], f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
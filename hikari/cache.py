@@ -0,0 +1,104 @@
+"""
+Hikari Youtube Video Downloader - Metadata cache
+
+Persistent SQLite cache of yt-dlp info dicts keyed by the 11-char video ID,
+so re-analysing or downloading a recently seen video is a local lookup.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DATA_DIR = Path.home() / ".hikari"
+DEFAULT_CACHE_PATH = DATA_DIR / "metadata.sqlite"
+
+# Stream URLs inside an info dict expire after a few hours, keep TTL below that
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_ENTRIES = 500
+
+
+class MetadataCache:
+    """Size-bounded, TTL-based cache of extract_info results"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS info ("
+            " video_id TEXT PRIMARY KEY,"
+            " fetched REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS info_accessed ON info (accessed)")
+        self._conn.commit()
+
+    def get(self, video_id):
+        """Returns the cached info dict, or None if missing or expired"""
+        if not video_id:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched, data FROM info WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            fetched, data = row
+            if self.ttl is not None and now - fetched > self.ttl:
+                self._conn.execute("DELETE FROM info WHERE video_id = ?", (video_id,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute("UPDATE info SET accessed = ? WHERE video_id = ?", (now, video_id))
+            self._conn.commit()
+
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put(self, video_id, info):
+        """Store an info dict and evict the least recently used entries"""
+        if not video_id or not info:
+            return
+
+        data = json.dumps(info, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO info (video_id, fetched, accessed, data) VALUES (?, ?, ?, ?)",
+                (video_id, now, now, data)
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM info WHERE video_id IN ("
+                    " SELECT video_id FROM info ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def invalidate(self, video_id):
+        """Drop one entry, e.g. after its stream URLs stopped working"""
+        with self._lock:
+            self._conn.execute("DELETE FROM info WHERE video_id = ?", (video_id,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM info")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
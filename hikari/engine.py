@@ -0,0 +1,759 @@
+"""
+Hikari Youtube Video Downloader - Download engine
+
+Video analysis, format planning and downloads without any GUI dependency,
+so the same code can be driven by the Tk window or by headless workers.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from .bandwidth import BandwidthLimiter
+from .formats import FormatTable
+from .planner import plan_formats, plan_audio
+from .progress import JobProgress
+from .segmented import SegmentedDownloader, DEFAULT_CONNECTIONS
+from .thumbnails import pick_thumbnail
+from .tracing import Tracer
+from .urls import extract_video_id
+from .ydl import YoutubeDLPool, EXTRACT_OPTIONS, DOWNLOAD_OPTIONS
+
+
+# Map selector qualities to analysis keys
+QUALITY_MAPPING = {
+    "4K (2160p)": "2160p",
+    "2K (1440p)": "1440p",
+    "1080p": "1080p",
+    "720p": "720p",
+    "480p": "480p",
+    "360p": "360p",
+    "240p": "240p",
+    "144p": "144p"
+}
+
+# Audio-only output formats
+AUDIO_FORMATS = ('m4a', 'opus', 'mp3')
+
+# Audio-only selector qualities and their target bitrate in kbps
+AUDIO_QUALITIES = {
+    "Best audio": None,
+    "160 kbps": 160,
+    "128 kbps": 128,
+    "64 kbps": 64,
+}
+
+# pytube's own request size, restored once the bandwidth limit is lifted
+_pytube_range_size = None
+
+
+class EngineError(Exception):
+    """Error raised by the engine, carrying a dialog-friendly title"""
+
+    def __init__(self, message, title="Error"):
+        super().__init__(message)
+        self.title = title
+
+
+class DownloadStopped(EngineError):
+    """Raised when a download was paused or cancelled by the user"""
+
+    def __init__(self, reason):
+        super().__init__(f"Download {'cancelled' if reason == 'cancel' else 'paused'}", "Stopped")
+        self.reason = reason
+
+
+def check_stop(should_stop):
+    """Raise DownloadStopped if ``should_stop()`` reports a pause/cancel request"""
+    reason = should_stop() if should_stop else None
+    if reason:
+        raise DownloadStopped(reason)
+
+
+def quality_key(quality):
+    """Returns the analysis key ("1080p") for a selector quality"""
+    return QUALITY_MAPPING.get(quality, quality)
+
+
+def quality_height(quality):
+    """Target height of a selector quality, e.g. 1080 for "1080p"; None for "Best available"."""
+    key = quality_key(quality)
+    return int(key[:-1]) if key.endswith('p') and key[:-1].isdigit() else None
+
+
+def is_audio_format(format_ext):
+    """True for the audio-only output formats, which download no video at all"""
+    return format_ext.lower() in AUDIO_FORMATS
+
+
+def audio_bitrate(quality):
+    """Target bitrate in kbps of an audio selector quality; None for the best"""
+    return AUDIO_QUALITIES.get(quality)
+
+
+def check_quality(video_formats, quality):
+    """Returns (available, closest_height) for the selected quality in a FormatTable"""
+    if quality == "Best available":
+        return True, None
+    if quality in AUDIO_QUALITIES:
+        # The nearest bitrate is taken, any separate audio stream will do
+        return bool(video_formats.audio), None
+
+    target_height = quality_height(quality)
+    if target_height is None:
+        return False, None
+    return video_formats.check_quality(target_height)
+
+
+def plan_download(info, quality, format_ext, merge=True, direct=False):
+    """FormatPlan for a selector quality and output format, from a yt-dlp info dict"""
+    table = FormatTable.from_info(info)
+    if is_audio_format(format_ext):
+        return plan_audio(table, audio_bitrate(quality), format_ext, direct)
+    return plan_formats(table, quality_height(quality), format_ext, merge, direct)
+
+
+def check_format(video_formats, format_ext):
+    """Returns True if any analyzed format uses the given extension
+
+    Audio-only formats need a separate audio stream, which is converted if needed.
+    """
+    if is_audio_format(format_ext):
+        return bool(video_formats.audio)
+    return video_formats.has_ext(format_ext)
+
+
+class HikariEngine:
+    """Headless analysis and download engine
+
+    Events are reported through an ``on_event(kind, data)`` callback, where
+    ``kind`` is ``'status'`` (data: message), ``'progress'`` (data: a
+    JobProgress snapshot with value, bytes, speed, ETA and fragments),
+    ``'resume'`` (state needed to continue the download) or ``'output'``
+    (data: path of the finished file).
+    The engine keeps no per-download state, so one instance can run many
+    jobs, from any thread. An optional MetadataCache is consulted before
+    every extractor call, and all downloads share one BandwidthLimiter.
+    Analysis and download phases are timed with the given Tracer, which is
+    disabled by default. With a PostProcessPool, yt-dlp downloads that need
+    merging leave the merge to the pool instead of the download worker.
+    YoutubeDL instances come from a YoutubeDLPool, so back-to-back jobs
+    reuse initialized extractors and open connections.
+    """
+
+    # pytube reads 9 MB per request; smaller chunks keep a limited rate smooth
+    THROTTLED_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, on_event=None, cache=None, connections=DEFAULT_CONNECTIONS, limiter=None, tracer=None,
+                 postprocessor=None, ydl_pool=None):
+        self.on_event = on_event
+        self.cache = cache
+        self.connections = connections
+        self.limiter = limiter or BandwidthLimiter()
+        self.tracer = tracer or Tracer()
+        self.postprocessor = postprocessor
+        self.ydl_pool = ydl_pool or YoutubeDLPool()
+
+        # Extractions in progress by video ID, shared by concurrent callers
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def prewarm(self):
+        """Import yt-dlp and load its YouTube extractor ahead of the first analysis
+
+        Meant for a background thread; the warmed instance goes back to the
+        pool for the first analysis to use. Returns False if yt-dlp is missing.
+        """
+        try:
+            with self.ydl_pool.session(EXTRACT_OPTIONS) as ydl:
+                ydl.get_info_extractor('Youtube')
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not prewarm yt-dlp: {e}")
+            return False
+
+    def close(self):
+        """Release pooled yt-dlp instances and their connections"""
+        self.ydl_pool.close()
+
+    def emit(self, on_event, kind, **data):
+        """Send an event to the per-call callback or the engine default"""
+        callback = on_event or self.on_event
+        if callback:
+            callback(kind, data)
+
+    def extract_info(self, url):
+        """Returns the raw yt-dlp info dict for a URL, using the cache
+
+        Concurrent calls for the same video wait for a single extraction.
+        """
+        video_id = extract_video_id(url)
+        if self.cache is not None:
+            info = self.cache.get(video_id)
+            if info is not None:
+                return info
+
+        if not video_id:
+            return self._extract_info(url, video_id)
+
+        with self._inflight_lock:
+            call = self._inflight.get(video_id)
+            owner = call is None
+            if owner:
+                call = self._inflight[video_id] = {'done': threading.Event(), 'info': None, 'error': None}
+
+        if not owner:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['info']
+
+        try:
+            call['info'] = self._extract_info(url, video_id)
+            return call['info']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[video_id]
+            call['done'].set()
+
+    def _extract_info(self, url, video_id):
+        with self.tracer.span('extract', video_id=video_id) as span:
+            with self.ydl_pool.session(EXTRACT_OPTIONS) as ydl:
+                # Without the formats yt-dlp picked by default, which a download must not inherit
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False), remove_private_keys=True)
+            span.set(formats=len(info.get('formats') or ()))
+
+        if self.cache is not None:
+            self.cache.put(info.get('id') or video_id, info)
+        return info
+
+    def analyze(self, url, on_event=None):
+        """Get available video formats using yt-dlp
+
+        Returns (video_formats, video_info), where video_formats is a
+        FormatTable of the video's formats.
+        """
+        self.emit(on_event, 'status', message="🔍 Analyzing video and available formats...")
+
+        with self.tracer.span('analyze', video_id=extract_video_id(url)):
+            try:
+                info = self.extract_info(url)
+            except ImportError:
+                raise EngineError("yt-dlp is not installed.\nRun: pip install yt-dlp")
+            except Exception as e:
+                raise EngineError(f"Error analyzing video: {str(e)}")
+
+            with self.tracer.span('process_formats', formats=len(info.get('formats') or ())):
+                return self.process_formats(info)
+
+    def process_formats(self, info):
+        """Build (video_formats, video_info) from a yt-dlp info dict"""
+        video_formats = FormatTable.from_info(info)
+
+        video_info = {
+            'info': info,
+            'id': info.get('id'),
+            'title': info.get('title', 'No title'),
+            'duration': info.get('duration', 0),
+            'uploader': info.get('uploader', 'Unknown'),
+            'thumbnail': pick_thumbnail(info),
+            'audio_formats': video_formats.audio
+        }
+        return video_formats, video_info
+
+    def expand(self, url, on_event=None, depth=2):
+        """List the videos of a playlist or channel using flat extraction
+
+        Returns (title, entries) where each entry is a dict with the
+        video 'id', 'url' and 'title'. Channel tabs are followed up to
+        ``depth`` levels.
+        """
+        self.emit(on_event, 'status', message="📃 Reading playlist entries...")
+
+        try:
+            import yt_dlp
+        except ImportError:
+            raise EngineError("yt-dlp is not installed.\nRun: pip install yt-dlp")
+
+        try:
+            with self.ydl_pool.session(EXTRACT_OPTIONS, extract_flat='in_playlist') as ydl:
+                info = ydl.extract_info(url, download=False)
+                entries = self._flatten_entries(ydl, info.get('entries') or [], depth)
+        except Exception as e:
+            raise EngineError(f"Error reading playlist: {str(e)}")
+
+        return info.get('title') or url, entries
+
+    def _flatten_entries(self, ydl, entries, depth):
+        videos = []
+        seen = set()
+        for entry in entries:
+            if not entry:
+                continue
+            entry_url = entry.get('url') or entry.get('webpage_url') or ''
+            ie_key = entry.get('ie_key')
+
+            # Nested playlists, e.g. the Videos/Shorts tabs of a channel
+            if entry.get('_type') == 'playlist' or (ie_key and ie_key != 'Youtube'):
+                if depth > 0 and entry_url:
+                    nested = ydl.extract_info(entry_url, download=False)
+                    videos.extend(self._flatten_entries(ydl, nested.get('entries') or [], depth - 1))
+                continue
+
+            video_id = entry.get('id') or extract_video_id(entry_url)
+            if not video_id or video_id in seen:
+                continue
+            seen.add(video_id)
+            videos.append({
+                'id': video_id,
+                'url': f"https://www.youtube.com/watch?v={video_id}",
+                'title': entry.get('title') or video_id,
+            })
+        return videos
+
+    def analyze_many(self, urls, max_workers=8, on_result=None, cancelled=None):
+        """Analyze several videos concurrently with a bounded thread pool
+
+        Returns a list of (url, video_formats, video_info, error) tuples in
+        input order. ``on_result(done, total, url, error)`` is called as each
+        analysis finishes. Once ``cancelled()`` returns True the analyses not
+        started yet are dropped and an empty list is returned.
+        """
+        urls = list(urls)
+        results = [None] * len(urls)
+        quiet = lambda kind, data: None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {pool.submit(self.analyze, url, quiet): i for i, url in enumerate(urls)}
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancelled and cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    return []
+                i = futures[future]
+                try:
+                    video_formats, video_info = future.result()
+                    results[i] = (urls[i], video_formats, video_info, None)
+                except EngineError as e:
+                    results[i] = (urls[i], {}, None, e)
+                if on_result:
+                    on_result(done, len(urls), urls[i], results[i][3])
+
+        return results
+
+    def download(self, url, quality, format_ext, library, output_folder, is_test=False, on_event=None, info=None,
+                 resume=None, should_stop=None, job_key=None):
+        """Download a video with the selected library
+
+        ``info`` is the info dict from a previous analysis; when it belongs
+        to the same video the yt-dlp path reuses it instead of extracting
+        again. ``resume`` is the state previously reported through
+        ``'resume'`` events (format IDs, finished segments) and makes an
+        interrupted download continue from its partial files.
+        ``should_stop()`` is polled on every progress update; when it returns
+        'pause' or 'cancel' the transfer stops, partial files are kept and
+        DownloadStopped is raised. ``job_key`` identifies the download in the
+        bandwidth limiter, where its weight can be set. Returns True on
+        success and raises EngineError otherwise. When the merge was handed
+        to the post-processing pool, returns a Future instead, which resolves
+        to True (or an EngineError) once the merged file is written.
+        """
+        owns_key = job_key is None
+        if owns_key:
+            job_key = object()
+        throttle = self.limiter.meter(job_key, should_stop)
+
+        span = self.tracer.span('download', job=None if owns_key else job_key, video_id=extract_video_id(url),
+                                library=library, quality=quality, format=format_ext, resumed=bool(resume))
+        try:
+            with span:
+                return self._download(url, quality, format_ext, library, output_folder, is_test, on_event, info,
+                                      resume, should_stop, throttle)
+        finally:
+            if owns_key:
+                self.limiter.release(job_key)
+
+    def _download(self, url, quality, format_ext, library, output_folder, is_test, on_event, info, resume,
+                  should_stop, throttle):
+        if library != "yt-dlp" and is_audio_format(format_ext) and format_ext.lower() != 'm4a':
+            raise EngineError(f"The {library} engine saves audio as downloaded and cannot convert it.\n\n"
+                              f"Use yt-dlp for {format_ext.upper()} audio, or choose M4A.")
+        if library == "yt-dlp":
+            return self.download_with_ytdlp(url, quality, format_ext, output_folder, is_test, on_event, info,
+                                            resume, should_stop, throttle)
+        if library == "segmented":
+            return self.download_with_segmented(url, quality, format_ext, output_folder, is_test, on_event, info,
+                                                resume, should_stop, throttle)
+        # pytube always writes from scratch, there is nothing to resume
+        return self.download_with_pytube(url, quality, format_ext, output_folder, is_test, on_event, should_stop,
+                                         throttle)
+
+    def expected_filename(self, info, format_ext, output_folder, is_test=False):
+        """Path a download of ``info`` merged into ``format_ext`` would be written to"""
+        output_template = '%(title)s.%(ext)s'
+        if is_test:
+            output_template = 'TEST_' + output_template
+        with self.ydl_pool.session(EXTRACT_OPTIONS, outtmpl=os.path.join(output_folder, output_template)) as ydl:
+            return ydl.prepare_filename(dict(info, ext=format_ext))
+
+    def download_with_ytdlp(self, url, quality, format_ext, output_folder, is_test=False, on_event=None, info=None,
+                            resume=None, should_stop=None, throttle=None):
+        try:
+            import yt_dlp
+        except ImportError:
+            raise EngineError("yt-dlp is not installed.\nRun: pip install yt-dlp")
+
+        try:
+            # Reuse the analyzed info, extracting only when there is none
+            if not info or info.get('id') != extract_video_id(url):
+                info = self.extract_info(url)
+
+            # Pick the same formats as before so yt-dlp finds its .part files,
+            # otherwise plan them now from the analyzed formats
+            if resume and resume.get('format_ids'):
+                format_selector = resume['format_ids']
+                description = f"{quality} in {format_ext.upper()} format"
+            else:
+                with self.tracer.span('plan') as span:
+                    plan = plan_download(info, quality, format_ext)
+                    span.set(format_ids=plan.format_ids if plan else None)
+                if plan is None:
+                    raise EngineError(f"No format found for {quality} in {format_ext} format")
+                format_selector = plan.format_ids
+                description = plan.describe()
+                self.emit(on_event, 'resume', format_ids=format_selector)
+
+            # Configure yt-dlp options
+            output_template = '%(title)s.%(ext)s'
+            if is_test:
+                output_template = 'TEST_' + output_template
+
+            ydl_opts = {
+                'format': format_selector,
+                'outtmpl': os.path.join(output_folder, output_template),
+                'noplaylist': True,
+                'merge_output_format': format_ext,
+                'writeinfojson': False,
+                'writesubtitles': False,
+                'writeautomaticsub': False,
+                'continuedl': True,
+            }
+
+            postprocess_pool = self.postprocessor is not None and self.postprocessor.available
+            convert_later = False
+            if is_audio_format(format_ext):
+                # Only the audio stream is fetched, ffmpeg converts it when it is
+                # not in the output codec yet
+                del ydl_opts['merge_output_format']
+                source = next((f for f in info.get('formats') or [] if f.get('format_id') == format_selector), {})
+                if source.get('ext') != format_ext and postprocess_pool:
+                    # Converted in the pool like merges, not in this worker
+                    convert_later = True
+                elif source.get('ext') != format_ext:
+                    ydl_opts['postprocessors'] = [{
+                        'key': 'FFmpegExtractAudio',
+                        'preferredcodec': format_ext,
+                        'preferredquality': str(audio_bitrate(quality) or 0),
+                    }]
+
+            # Download the streams as separate files and merge them in the pool,
+            # so this worker can start the next job while ffmpeg runs
+            merge_later = '+' in format_selector and postprocess_pool
+            if merge_later:
+                ydl_opts['format'] = format_selector.replace('+', ',')
+            if merge_later or convert_later:
+                # The names yt-dlp gives streams before merging, so earlier partial files are reused
+                ydl_opts['outtmpl'] = os.path.join(output_folder,
+                                                   output_template.replace('.%(ext)s', '.f%(format_id)s.%(ext)s'))
+
+            # Show download information
+            self.emit(on_event, 'status', message=f"📥 Downloading: {description} with yt-dlp...")
+
+            # Crear hook para progreso
+            progress = JobProgress()
+            # Open 'transfer' spans by file and 'postprocess' spans by postprocessor
+            spans = {}
+            tracing = self.tracer.enabled
+            # Downloaded stream files by format ID, for merging or converting them later
+            stream_files = {}
+
+            def progress_hook(d):
+                # Raising here aborts yt-dlp's transfer and leaves the .part file
+                check_stop(should_stop)
+                if progress.update_from_ytdlp(d):
+                    self.emit(on_event, 'progress', **progress.snapshot())
+                if d.get('status') == 'finished':
+                    stream_files[(d.get('info_dict') or {}).get('format_id')] = d.get('filename')
+                if tracing:
+                    trace_transfer(d)
+                # Sleeping in the hook holds back yt-dlp's next read
+                if throttle and d.get('status') == 'downloading':
+                    throttle(d.get('tmpfilename') or d.get('filename'), d.get('downloaded_bytes'))
+
+            def trace_transfer(d):
+                filename = d.get('filename')
+                span = spans.get(filename)
+                if span is None:
+                    span = spans[filename] = self.tracer.span('transfer', file=os.path.basename(filename or ''),
+                                                              format_id=(d.get('info_dict') or {}).get('format_id'))
+                if d.get('status') != 'downloading':
+                    span.set(bytes=d.get('downloaded_bytes') or d.get('total_bytes'))
+                    spans.pop(filename).finish()
+
+            def trace_postprocess(d):
+                name = d.get('postprocessor')
+                if d.get('status') == 'started':
+                    spans[name] = self.tracer.span('postprocess', postprocessor=name)
+                elif name in spans:
+                    spans.pop(name).finish()
+
+            ydl_opts['progress_hooks'] = [progress_hook]
+            if tracing:
+                ydl_opts['postprocessor_hooks'] = [trace_postprocess]
+            # Called with the final path, after merging
+            if not (merge_later or convert_later):
+                ydl_opts['post_hooks'] = [lambda path: self.emit(on_event, 'output', path=path)]
+
+            # Download exactly the planned formats from a copy of that info: yt-dlp
+            # updates it in place and keeps any 'requested_formats' it already has,
+            # which would replace the planned selection with the analysis default
+            info = yt_dlp.YoutubeDL.sanitize_info(dict(info), remove_private_keys=True)
+            try:
+                with self.ydl_pool.session(DOWNLOAD_OPTIONS, **ydl_opts) as ydl:
+                    ydl.process_ie_result(info, download=True)
+            except yt_dlp.utils.DownloadError:
+                if self.cache is None:
+                    raise
+                # Cached stream URLs may have expired, retry once with fresh info
+                self.cache.invalidate(info.get('id'))
+                info = yt_dlp.YoutubeDL.sanitize_info(dict(self.extract_info(url)), remove_private_keys=True)
+                with self.ydl_pool.session(DOWNLOAD_OPTIONS, **ydl_opts) as ydl:
+                    ydl.process_ie_result(info, download=True)
+            finally:
+                # Transfers cut short by an error or a pause
+                for span in spans.values():
+                    span.finish(error="interrupted")
+                spans.clear()
+
+            if merge_later:
+                video_id, audio_id = format_selector.split('+')
+                if not stream_files.get(video_id) or not stream_files.get(audio_id):
+                    raise EngineError("yt-dlp did not report the downloaded video and audio files")
+                output_path = self.expected_filename(info, format_ext, output_folder, is_test)
+                return self.merge_later(stream_files[video_id], stream_files[audio_id], output_path, on_event)
+            if convert_later:
+                if not stream_files.get(format_selector):
+                    raise EngineError("yt-dlp did not report the downloaded audio file")
+                output_path = self.expected_filename(info, format_ext, output_folder, is_test)
+                return self.convert_later(stream_files[format_selector], output_path, format_ext,
+                                          audio_bitrate(quality), on_event)
+
+            return True
+
+        except EngineError:
+            raise
+        except Exception as e:
+            # yt-dlp may wrap the hook's exception in a DownloadError
+            check_stop(should_stop)
+            error_msg = str(e)
+            raise EngineError(f"Error with yt-dlp:\n{error_msg}\n\nTry pytube or verify the URL.", "Error yt-dlp")
+
+    def merge_later(self, video_path, audio_path, output_path, on_event=None):
+        """Queue a merge in the post-processing pool; returns a Future of True"""
+        self.emit(on_event, 'status', message=f"🎞️ Merging video and audio: {os.path.basename(output_path)}")
+        span = self.tracer.span('postprocess', postprocessor='merge', file=os.path.basename(output_path))
+        return self._postprocessed(self.postprocessor.merge(video_path, audio_path, output_path), span,
+                                   "Error merging video and audio", on_event)
+
+    def convert_later(self, source_path, output_path, codec, bitrate=None, on_event=None):
+        """Queue an audio conversion in the post-processing pool; returns a Future of True"""
+        self.emit(on_event, 'status', message=f"🎵 Converting audio: {os.path.basename(output_path)}")
+        span = self.tracer.span('postprocess', postprocessor='convert', file=os.path.basename(output_path))
+        return self._postprocessed(self.postprocessor.convert(source_path, output_path, codec, bitrate), span,
+                                   "Error converting audio", on_event)
+
+    def _postprocessed(self, future, span, error, on_event):
+        """Future of True for a pool job, reporting its output path when it is done"""
+        done = Future()
+
+        def finished(future):
+            try:
+                path = future.result()
+            except Exception as e:
+                span.finish(e)
+                done.set_exception(EngineError(f"{error}:\n{str(e)}", "Error ffmpeg"))
+                return
+            span.finish()
+            self.emit(on_event, 'output', path=path)
+            done.set_result(True)
+
+        future.add_done_callback(finished)
+        return done
+
+    def download_with_pytube(self, url, quality, format_ext, output_folder, is_test=False, on_event=None,
+                             should_stop=None, throttle=None):
+        try:
+            from pytube import YouTube, request as pytube_request
+        except ImportError:
+            raise EngineError("pytube is not installed.\nRun: pip install pytube")
+
+        # A process-wide setting in pytube, so it follows the current limit both ways
+        global _pytube_range_size
+        if _pytube_range_size is None:
+            _pytube_range_size = pytube_request.default_range_size
+        if self.limiter.rate:
+            pytube_request.default_range_size = min(_pytube_range_size, self.THROTTLED_CHUNK_SIZE)
+        else:
+            pytube_request.default_range_size = _pytube_range_size
+
+        try:
+            self.emit(on_event, 'status', message="📥 Downloading with pytube...")
+
+            progress = JobProgress()
+
+            def on_progress(stream, chunk, bytes_remaining):
+                # Called between chunks, raising stops the stream
+                check_stop(should_stop)
+                progress.update(stream.default_filename, stream.filesize - bytes_remaining, stream.filesize)
+                self.emit(on_event, 'progress', **progress.snapshot())
+                if throttle:
+                    throttle(stream.default_filename, stream.filesize - bytes_remaining)
+
+            yt = YouTube(url, on_progress_callback=on_progress)
+
+            # pytube cannot merge, so plan a single stream; itags are YouTube format IDs
+            with self.tracer.span('plan') as span:
+                table = FormatTable.from_streams(yt.streams)
+                if is_audio_format(format_ext):
+                    plan = plan_audio(table, audio_bitrate(quality), format_ext)
+                else:
+                    plan = plan_formats(table, quality_height(quality), format_ext, merge=False)
+                span.set(format_ids=plan.format_ids if plan else None)
+            stream = yt.streams.get_by_itag(int(plan.format_ids)) if plan else None
+        except Exception as e:
+            raise EngineError(f"Error with pytube:\n{str(e)}\n\nTry yt-dlp or update pytube.", "Error pytube")
+
+        if not stream or plan.needs_conversion:
+            raise EngineError(f"No stream found for {quality} in {format_ext} format")
+
+        try:
+            # Show selected stream information
+            actual_resolution = getattr(stream, 'resolution', 'Unknown')
+            actual_format = getattr(stream, 'mime_type', format_ext)
+
+            self.emit(on_event, 'status', message=f"📥 Downloading: {actual_resolution} {actual_format}")
+
+            # Download with custom name if test
+            filename = None
+            if is_test:
+                filename = f"TEST_{yt.title}"
+            if plan.audio_only:
+                # The audio of an MP4 container, saved under its usual extension
+                filename = f"{'TEST_' if is_test else ''}{os.path.splitext(stream.default_filename)[0]}.{format_ext}"
+
+            path = stream.get_file_path(filename=filename, output_path=output_folder)
+            try:
+                with self.tracer.span('transfer', format_id=str(stream.itag), bytes=stream.filesize):
+                    path = stream.download(output_path=output_folder, filename=filename)
+            except Exception:
+                # pytube writes under the final name and cannot resume, so a stopped or
+                # failed transfer would leave what looks like a finished but broken video
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                raise
+            self.emit(on_event, 'output', path=path)
+            return True
+
+        except Exception as e:
+            check_stop(should_stop)
+            raise EngineError(f"Error with pytube:\n{str(e)}\n\nTry yt-dlp or update pytube.", "Error pytube")
+
+    def download_with_segmented(self, url, quality, format_ext, output_folder, is_test=False, on_event=None, info=None,
+                                resume=None, should_stop=None, throttle=None):
+        """Download a progressive format over several parallel connections"""
+        try:
+            import yt_dlp
+        except ImportError:
+            raise EngineError("yt-dlp is not installed.\nRun: pip install yt-dlp")
+
+        try:
+            if not info or info.get('id') != extract_video_id(url):
+                info = self.extract_info(url)
+        except Exception as e:
+            raise EngineError(f"Error analyzing video: {str(e)}")
+
+        def find_format(format_id):
+            return next((f for f in info.get('formats') or [] if f.get('format_id') == format_id), None)
+
+        resume = resume or {}
+        fmt = find_format(resume['format_ids']) if resume.get('format_ids') else None
+        if fmt is None:
+            resume = {}
+            with self.tracer.span('plan') as span:
+                plan = plan_download(info, quality, format_ext, merge=False, direct=True)
+                span.set(format_ids=plan.format_ids if plan else None)
+            # Audio that would need converting is not a direct download either
+            fmt = find_format(plan.format_ids) if plan and not plan.needs_conversion else None
+        if not fmt:
+            raise EngineError("No direct progressive format is available for this video.\n\n"
+                              "Use yt-dlp to download and merge separate streams.")
+
+        output_template = '%(title)s.%(ext)s'
+        if is_test:
+            output_template = 'TEST_' + output_template
+
+        with self.ydl_pool.session(EXTRACT_OPTIONS, outtmpl=os.path.join(output_folder, output_template)) as ydl:
+            path = ydl.prepare_filename(dict(info, **fmt))
+
+        self.emit(on_event, 'status', message=f"📥 Downloading: {fmt.get('height') or '?'}p "
+                                              f"{fmt.get('ext', format_ext).upper()} over {self.connections} connections...")
+
+        progress = JobProgress()
+        lock = threading.Lock()
+
+        def on_progress(downloaded, total):
+            # Fails the segment workers; finished segments stay recorded for resume
+            check_stop(should_stop)
+            with lock:
+                progress.update(path, downloaded, total)
+                snapshot = progress.snapshot()
+            self.emit(on_event, 'progress', **snapshot)
+            # Each connection thread waits for its own share
+            if throttle:
+                throttle(path, downloaded)
+
+        done_segments = set(resume.get('segments_done') or [])
+        if resume.get('path') != path:
+            done_segments = set()
+        self.emit(on_event, 'resume', format_ids=fmt.get('format_id'), path=path, segments_done=sorted(done_segments))
+
+        def on_segment(start):
+            with lock:
+                done_segments.add(start)
+                segments_done = sorted(done_segments)
+            self.emit(on_event, 'resume', segments_done=segments_done)
+
+        downloader = SegmentedDownloader(connections=self.connections)
+        span = self.tracer.span('transfer', format_id=fmt.get('format_id'), connections=self.connections,
+                                segments_resumed=len(done_segments))
+        try:
+            with span:
+                downloader.download(fmt['url'], path,
+                                    headers=fmt.get('http_headers'),
+                                    on_progress=on_progress,
+                                    # Ranges are laid out from the size, an approximate one would truncate the file
+                                    size=fmt.get('filesize'),
+                                    done_segments=done_segments,
+                                    on_segment=on_segment)
+                span.set(bytes=progress.downloaded_bytes)
+        except Exception as e:
+            check_stop(should_stop)
+            raise EngineError(f"Error with segmented download:\n{str(e)}\n\nTry yt-dlp or verify the URL.", "Error segmented")
+
+        self.emit(on_event, 'output', path=path)
+        return True
@@ -0,0 +1,43 @@
+"""
+Hikari Youtube Video Downloader - UI event bus
+
+Worker threads publish events into a single thread-safe bus and the UI
+thread drains it on a fixed cadence. Events published with a coalesce key
+replace any pending event with the same kind and key, so a job reporting
+progress hundreds of times per second costs one UI update per drain.
+"""
+
+import threading
+
+
+class EventBus:
+    """Thread-safe event queue with per-key coalescing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ordered = []
+        self._coalesced = {}
+
+    def publish(self, kind, data=None, coalesce_key=None):
+        """Queue an event; only the latest event per (kind, coalesce_key) is kept"""
+        event = (kind, data or {})
+        with self._lock:
+            if coalesce_key is None:
+                self._ordered.append(event)
+            else:
+                self._coalesced[(kind, coalesce_key)] = event
+
+    def call(self, func, *args):
+        """Run ``func(*args)`` on the thread that drains the bus"""
+        self.publish('call', {'func': func, 'args': args})
+
+    def drain(self):
+        """Returns all pending events, coalesced ones first"""
+        with self._lock:
+            coalesced, self._coalesced = self._coalesced, {}
+            ordered, self._ordered = self._ordered, []
+        return list(coalesced.values()) + ordered
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ordered) + len(self._coalesced)
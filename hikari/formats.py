@@ -0,0 +1,206 @@
+"""
+Hikari Youtube Video Downloader - Format table
+
+Compact view of the formats of an analyzed video. Entries are slotted
+objects instead of dicts, distinct heights are kept sorted in an array,
+and formats are indexed by height, extension and codec, so availability
+checks and nearest-quality lookups are dictionary hits or a bisect
+instead of re-parsing "1080p" keys and scanning every format.
+"""
+
+from array import array
+from bisect import bisect_left
+
+
+# Resolutions listed in the analysis summary
+SUMMARY_QUALITIES = 6
+
+
+class FormatEntry:
+    """One yt-dlp format, with only the fields the app uses"""
+
+    __slots__ = ('format_id', 'ext', 'height', 'width', 'fps', 'vcodec', 'acodec', 'filesize', 'tbr', 'protocol')
+
+    def __init__(self, format_id, ext, height, width, fps, vcodec, acodec, filesize, tbr, protocol=None):
+        self.format_id = format_id
+        self.ext = ext
+        self.height = height
+        self.width = width
+        self.fps = fps
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.filesize = filesize
+        self.tbr = tbr
+        self.protocol = protocol
+
+    @classmethod
+    def from_dict(cls, f):
+        return cls(f.get('format_id', ''), (f.get('ext') or 'unknown').lower(), f.get('height') or 0,
+                   f.get('width'), f.get('fps'), f.get('vcodec') or 'none', f.get('acodec') or 'none',
+                   f.get('filesize') or f.get('filesize_approx'), f.get('tbr'), f.get('protocol'))
+
+    @classmethod
+    def from_stream(cls, stream):
+        """Entry for a pytube Stream; its itag is the YouTube format ID"""
+        resolution = getattr(stream, 'resolution', None) or ''
+        return cls(str(stream.itag), (stream.subtype or 'unknown').lower(),
+                   int(resolution[:-1]) if resolution[:-1].isdigit() else 0,
+                   None, getattr(stream, 'fps', None),
+                   (stream.video_codec if stream.includes_video_track else None) or 'none',
+                   (stream.audio_codec if stream.includes_audio_track else None) or 'none',
+                   None, (getattr(stream, 'bitrate', None) or 0) / 1000, 'https')
+
+    @property
+    def has_audio(self):
+        return self.acodec != 'none'
+
+    @property
+    def codec(self):
+        """Codec family of the video stream, e.g. 'avc1', 'vp9', 'av01'"""
+        return self.vcodec.split('.')[0].lower()
+
+    def __repr__(self):
+        return f"<FormatEntry {self.format_id} {self.height}p {self.ext} {self.vcodec}>"
+
+
+class FormatTable:
+    """Video formats indexed by height, extension and codec, plus audio-only formats"""
+
+    __slots__ = ('video', 'audio', 'heights', '_by_height', '_by_ext', '_by_codec')
+
+    def __init__(self, video=(), audio=()):
+        self.video = tuple(video)
+        self.audio = tuple(audio)
+        self._by_height = {}
+        self._by_ext = {}
+        self._by_codec = {}
+        # Index lists are int arrays into self.video
+        for index, entry in enumerate(self.video):
+            self._by_height.setdefault(entry.height, array('I')).append(index)
+            self._by_ext.setdefault(entry.ext, array('I')).append(index)
+            self._by_codec.setdefault(entry.codec, array('I')).append(index)
+        # Ascending, so nearest-quality lookups can bisect
+        self.heights = array('I', sorted(self._by_height))
+
+    @classmethod
+    def from_info(cls, info):
+        """Build the table from the 'formats' of a yt-dlp info dict"""
+        video = []
+        audio = []
+        for f in info.get('formats') or []:
+            vcodec = f.get('vcodec', 'none')
+            acodec = f.get('acodec', 'none')
+            height = f.get('height')
+            if vcodec != 'none' and height and height > 0:
+                video.append(FormatEntry.from_dict(f))
+            elif acodec != 'none' and vcodec == 'none':
+                audio.append(FormatEntry.from_dict(f))
+        return cls(video, audio)
+
+    @classmethod
+    def from_streams(cls, streams):
+        """Build the table from pytube streams, in ascending quality like yt-dlp's list"""
+        video = []
+        audio = []
+        for stream in streams:
+            entry = FormatEntry.from_stream(stream)
+            if entry.vcodec != 'none' and entry.height:
+                video.append(entry)
+            elif entry.acodec != 'none':
+                audio.append(entry)
+        video.sort(key=lambda e: (e.height, e.fps or 0, e.tbr or 0))
+        audio.sort(key=lambda e: e.tbr or 0)
+        return cls(video, audio)
+
+    @classmethod
+    def merge(cls, tables):
+        """One table covering several videos, e.g. a whole playlist"""
+        tables = list(tables)
+        return cls([entry for table in tables for entry in table.video],
+                   [entry for table in tables for entry in table.audio])
+
+    def __len__(self):
+        return len(self.video)
+
+    def __getstate__(self):
+        # The indexes are rebuilt on load
+        return self.video, self.audio
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def has_height(self, height):
+        return height in self._by_height
+
+    def nearest_height(self, height):
+        """Available height closest to ``height`` (the lower one on ties), or None"""
+        heights = self.heights
+        if not heights:
+            return None
+        i = bisect_left(heights, height)
+        if i == len(heights):
+            return heights[-1]
+        if heights[i] == height or i == 0:
+            return heights[i]
+        below, above = heights[i - 1], heights[i]
+        return below if height - below <= above - height else above
+
+    def at_height(self, height):
+        return [self.video[i] for i in self._by_height.get(height, ())]
+
+    def has_ext(self, ext):
+        return ext.lower() in self._by_ext
+
+    def with_ext(self, ext):
+        return [self.video[i] for i in self._by_ext.get(ext.lower(), ())]
+
+    def with_codec(self, codec):
+        return [self.video[i] for i in self._by_codec.get(codec.lower(), ())]
+
+    def exts(self):
+        return sorted(self._by_ext)
+
+    def codecs(self):
+        return sorted(self._by_codec)
+
+    def qualities(self):
+        """(height, format count) pairs, highest first"""
+        return [(height, len(self._by_height[height])) for height in reversed(self.heights)]
+
+    def check_quality(self, target_height):
+        """Returns (available, closest_height) for a target height"""
+        if self.has_height(target_height):
+            return True, None
+        return False, self.nearest_height(target_height)
+
+
+def quality_emoji(height):
+    if height >= 2160:
+        return "🔥"
+    if height >= 1440:
+        return "⭐"
+    if height >= 1080:
+        return "✅"
+    if height >= 720:
+        return "📺"
+    return "📱"
+
+
+def summarize_formats(table, limit=SUMMARY_QUALITIES):
+    """Analysis text shown in the formats box: resolutions, extensions and a tip"""
+    qualities = table.qualities()
+    lines = ["🎬 RESOLUTIONS:"]
+    for height, count in qualities[:limit]:
+        lines.append(f"  {quality_emoji(height)} {height}p ({count} formats)")
+    if len(qualities) > limit:
+        lines.append(f"  ... +{len(qualities) - limit} more")
+
+    lines.append("")
+    lines.append("📹 FORMATS: " + ", ".join(ext.upper() for ext in table.exts()))
+    if table.audio:
+        exts = sorted({entry.ext.upper() for entry in table.audio})
+        best = max(entry.tbr or 0 for entry in table.audio)
+        lines.append(f"🎵 AUDIO: {', '.join(exts)}" + (f" (up to {round(best)} kbps)" if best else ""))
+    lines.append("")
+    lines.append("💡 TIP: MP4 1080p recommended")
+    return "\n".join(lines)
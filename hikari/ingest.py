@@ -0,0 +1,162 @@
+"""
+Hikari Youtube Video Downloader - Bulk URL import
+
+Streams URLs out of text or CSV files, stdin or a pasted list, reduces
+them to canonical video IDs, drops duplicates as they are read and feeds
+the download queue only as fast as it drains. Nothing is read ahead, so
+lists of tens of thousands of lines load in constant memory (apart from
+the set of IDs already seen) and never block the UI thread.
+"""
+
+import re
+import sys
+import threading
+
+from .engine import EngineError
+from .urls import classify_url, canonical_url
+
+
+# YouTube links anywhere in a line, so CSV cells and notes around them work too
+URL_TOKEN_RE = re.compile(
+    r'(?:https?://)?(?:[\w-]+\.)?(?:youtube\.com|youtube-nocookie\.com|youtu\.be)/[^\s,;"\'<>|]+',
+    re.IGNORECASE)
+
+# Queued jobs kept ahead of the workers while importing
+DEFAULT_MAX_PENDING = 20
+
+
+def iter_lines(source):
+    """Lines of a file path, ``'-'`` for stdin, or any iterable of lines"""
+    if source == '-':
+        yield from sys.stdin
+    elif isinstance(source, str) or hasattr(source, '__fspath__'):
+        with open(source, 'r', encoding='utf-8-sig', errors='replace', newline='') as f:
+            yield from f
+    else:
+        yield from source
+
+
+def iter_urls(lines):
+    """YouTube URLs found in the given lines, in order"""
+    for line in lines:
+        yield from URL_TOKEN_RE.findall(line)
+
+
+def iter_unique(urls, seen=None):
+    """Yields (url_type, url, video_id) for each new video, playlist or channel
+
+    Videos are keyed on their canonical ID and returned as plain watch
+    URLs, so the same video pasted as youtu.be, m.youtube.com or with
+    extra parameters is only returned once.
+    """
+    seen = set() if seen is None else seen
+    for url in urls:
+        url_type, video_id, playlist_id = classify_url(url)
+        if url_type in ('normal_video', 'video_in_playlist'):
+            key = video_id
+            url_type, url = 'normal_video', canonical_url(video_id)
+        elif url_type == 'playlist':
+            key = 'list:' + playlist_id
+        elif url_type == 'channel':
+            key = url.split('?')[0].rstrip('/').lower()
+        else:
+            yield url_type, url, None
+            continue
+
+        if key in seen:
+            yield 'duplicate', url, video_id
+            continue
+        seen.add(key)
+        yield url_type, url, video_id
+
+
+class BulkImport:
+    """Feeds the URLs of a source into a DownloadQueue from a background thread
+
+    ``make_job(url, title)`` builds the DownloadJob for a video, so the
+    caller decides quality, format and engine. Playlists and channels in
+    the list are expanded and their videos deduplicated with the rest.
+    Videos for which ``is_downloaded(video_id)`` is true are not queued.
+    """
+
+    def __init__(self, engine, download_queue, make_job, max_pending=DEFAULT_MAX_PENDING, on_update=None,
+                 is_downloaded=None):
+        self.engine = engine
+        self.download_queue = download_queue
+        self.make_job = make_job
+        self.max_pending = max_pending
+        self.on_update = on_update
+        self.is_downloaded = is_downloaded
+
+        self.stats = {'queued': 0, 'duplicates': 0, 'archived': 0, 'skipped': 0, 'errors': 0}
+        self.done = False
+        # Video, playlist and channel keys already handled
+        self._seen = set()
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self, source):
+        """Start importing from a path, '-' for stdin, or an iterable of lines"""
+        self._thread = threading.Thread(target=self._run, args=(source,), daemon=True, name="hikari-import")
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop reading; jobs already queued are kept"""
+        self._cancelled.set()
+
+    def _run(self, source):
+        try:
+            for url_type, url, video_id in iter_unique(iter_urls(iter_lines(source)), self._seen):
+                if self._cancelled.is_set():
+                    break
+                if url_type == 'normal_video':
+                    self._submit(url, video_id, None)
+                elif url_type in ('playlist', 'channel'):
+                    self._expand(url)
+                elif url_type == 'duplicate':
+                    self.stats['duplicates'] += 1
+                else:
+                    self.stats['skipped'] += 1
+                self._notify()
+        except Exception as e:
+            print(f"⚠️ URL import stopped: {e}")
+            self.stats['errors'] += 1
+        finally:
+            self.done = True
+            self._notify()
+
+    def _expand(self, url):
+        try:
+            _, entries = self.engine.expand(url)
+        except EngineError as e:
+            print(f"⚠️ Could not read {url}: {e}")
+            self.stats['errors'] += 1
+            return
+        titles = {entry['id']: entry.get('title') for entry in entries}
+        # Videos already listed elsewhere in the source are not queued twice
+        for url_type, entry_url, video_id in iter_unique((entry['url'] for entry in entries), self._seen):
+            if self._cancelled.is_set():
+                return
+            if url_type == 'normal_video':
+                self._submit(entry_url, video_id, titles.get(video_id))
+            elif url_type == 'duplicate':
+                self.stats['duplicates'] += 1
+            else:
+                self.stats['skipped'] += 1
+            self._notify()
+
+    def _submit(self, url, video_id, title):
+        if self.is_downloaded and self.is_downloaded(video_id):
+            self.stats['archived'] += 1
+            return
+        # Only keep a few jobs waiting, the rest of the list stays unread
+        while self.download_queue.pending_count() >= self.max_pending:
+            if self._cancelled.wait(0.5):
+                return
+        self.download_queue.submit(self.make_job(url, title))
+        self.stats['queued'] += 1
+
+    def _notify(self):
+        if self.on_update:
+            self.on_update(self)
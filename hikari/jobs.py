@@ -0,0 +1,429 @@
+"""
+Hikari Youtube Video Downloader - Download queue
+
+Jobs carry their own URL, quality, format and engine, and are executed by a
+bounded pool of worker threads sharing one HikariEngine.
+"""
+
+import collections
+import itertools
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from .archive import format_key
+from .engine import EngineError, DownloadStopped
+from .progress import aggregate
+from .urls import extract_video_id
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+PAUSED = 'paused'
+CANCELLED = 'cancelled'
+# Downloaded, waiting for the post-processing pool to merge or convert the files
+PROCESSING = 'processing'
+
+# Requests a running job checks between chunks
+STOP_PAUSE = 'pause'
+STOP_CANCEL = 'cancel'
+
+# Finished jobs kept for the queue view; older ones are forgotten
+MAX_FINISHED_JOBS = 500
+
+_job_ids = itertools.count(1)
+
+
+class DownloadJob:
+    """One video to download with its own settings and status"""
+
+    def __init__(self, url, quality, format_ext, library, output_folder, info=None, is_test=False, title=None,
+                 key=None, resume=None, created=None, weight=1.0):
+        self.job_id = next(_job_ids)
+        # Stable identity across restarts, used by the journal
+        self.key = key or uuid.uuid4().hex
+        self.created = created or time.time()
+        self.url = url
+        self.quality = quality
+        self.format_ext = format_ext
+        self.library = library
+        self.output_folder = output_folder
+        self.info = info
+        self.is_test = is_test
+        self.title = title or url
+
+        self.status = QUEUED
+        self.progress = 0.0
+        self.transfer = {}
+        self.message = ""
+        self.error = None
+        self.stop_request = None
+        self.output_path = None
+        # Share of the bandwidth limit relative to the other running jobs
+        self.weight = weight
+
+        # Format IDs and partial files reported by the engine, for resuming
+        self.resume = dict(resume or {})
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def should_stop(self):
+        """Pending pause/cancel request, polled by the engine while downloading"""
+        return self.stop_request
+
+    def to_record(self):
+        """Plain dict for the job journal"""
+        return {
+            'key': self.key,
+            'created': self.created,
+            'url': self.url,
+            'title': self.title,
+            'quality': self.quality,
+            'format_ext': self.format_ext,
+            'library': self.library,
+            'output_folder': self.output_folder,
+            'is_test': self.is_test,
+            'weight': self.weight,
+            'status': self.status,
+            'resume': self.resume,
+            'files': self.transfer.get('files', {}),
+            'downloaded_bytes': self.transfer.get('downloaded_bytes', 0),
+            'error': str(self.error) if self.error else None,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        """Rebuild a queued (or paused) job from a journal record"""
+        job = cls(record['url'], record['quality'], record['format_ext'], record['library'],
+                  record['output_folder'], is_test=record.get('is_test', False),
+                  title=record.get('title'), key=record['key'],
+                  resume=record.get('resume'), created=record.get('created'),
+                  weight=record.get('weight', 1.0))
+        if record.get('status') == PAUSED:
+            job.status = PAUSED
+        return job
+
+    def __repr__(self):
+        return f"<DownloadJob {self.job_id} {self.status} {self.url}>"
+
+
+class DownloadQueue:
+    """Job queue executed by up to ``max_workers`` worker threads
+
+    ``on_update(job, kind, data)`` is called from worker threads for every
+    engine event of a job and with kind ``'job'`` whenever its status changes.
+    With a JobJournal every change is recorded so unfinished jobs can be
+    resumed on the next start. With a DownloadArchive, videos already
+    downloaded in the job's format are skipped and finished ones recorded.
+    Unfinished jobs are counted by status as they change, and only the
+    latest MAX_FINISHED_JOBS finished ones are kept, so long imports cost
+    neither memory nor scans of every job ever queued.
+    """
+
+    def __init__(self, engine, max_workers=3, on_update=None, journal=None, archive=None):
+        self.engine = engine
+        self.max_workers = max(1, int(max_workers))
+        self.on_update = on_update
+        self.journal = journal
+        self.archive = archive
+
+        # Unfinished jobs by ID in submission order, counted by status
+        self._active = {}
+        self._counts = collections.Counter()
+        self._finished = collections.deque(maxlen=MAX_FINISHED_JOBS)
+
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._stopping = False
+
+    def submit(self, job):
+        """Add a job to the queue and make sure a worker will pick it up"""
+        return self.submit_many([job])[0]
+
+    def submit_many(self, jobs):
+        """Add several jobs at once, with a single journal write"""
+        jobs = list(jobs)
+        with self._lock:
+            for job in jobs:
+                if job.finished:
+                    self._finished.append(job)
+                else:
+                    self._active[job.job_id] = job
+                    self._counts[job.status] += 1
+                if job.status == QUEUED:
+                    self._pending.put(job)
+            self._spawn_workers()
+        if self.journal is not None:
+            self.journal.record_many([job.to_record() for job in jobs], force=True)
+        for job in jobs:
+            self._notify(job, 'job', {'status': job.status})
+        return jobs
+
+    def resume_unfinished(self):
+        """Re-queue the jobs the journal recorded as queued, running or merging
+
+        Jobs paused by the user come back paused.
+        """
+        if self.journal is None:
+            return []
+        return self.submit_many(DownloadJob.from_record(record) for record in self.journal.unfinished())
+
+    def pause(self, job):
+        """Pause a job; a running one stops at its next chunk and frees its worker"""
+        self._stop(job, STOP_PAUSE, PAUSED)
+
+    def cancel(self, job):
+        """Cancel a job; partial files are kept so it can still be resumed"""
+        self._stop(job, STOP_CANCEL, CANCELLED)
+
+    def resume(self, job):
+        """Queue a paused, cancelled or failed job again, continuing its partial files"""
+        with self._lock:
+            if job.status not in (PAUSED, CANCELLED, FAILED):
+                return
+            self._set_status(job, QUEUED)
+            job.error = None
+            job.stop_request = None
+            self._pending.put(job)
+            self._spawn_workers()
+        self._journal(job, force=True)
+        self._notify(job, 'job', {'status': job.status})
+
+    def set_weight(self, job, weight):
+        """Change a job's bandwidth share; applies immediately if it is running"""
+        job.weight = weight
+        if job.status == RUNNING:
+            self.engine.limiter.set_weight(job.key, weight)
+        self._journal(job, force=True)
+
+    def _stop(self, job, request, status):
+        with self._lock:
+            if job.status == RUNNING:
+                # The worker updates the status once the engine has stopped
+                job.stop_request = request
+                return
+            if job.status not in (QUEUED, PAUSED):
+                return
+            self._set_status(job, status)
+        self._journal(job, force=True)
+        self._notify(job, 'job', {'status': job.status})
+
+    def set_max_workers(self, max_workers):
+        """Change the pool size; extra workers exit once their job ends"""
+        with self._lock:
+            self.max_workers = max(1, int(max_workers))
+            self._spawn_workers()
+
+    @property
+    def jobs(self):
+        """Unfinished jobs and the latest finished ones, in submission order"""
+        with self._lock:
+            jobs = list(self._finished) + list(self._active.values())
+        jobs.sort(key=lambda job: job.job_id)
+        return jobs
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def pending_count(self):
+        """Number of jobs waiting for a worker"""
+        with self._lock:
+            return self._counts[QUEUED]
+
+    def stats(self):
+        """Queue-wide bytes, throughput and ETA of the running jobs"""
+        running = [job.transfer for job in self.active_jobs() if job.status == RUNNING]
+        return aggregate(running)
+
+    def clear_finished(self):
+        with self._lock:
+            self._finished.clear()
+
+    def shutdown(self):
+        """Stop workers after their current job; queued jobs stay queued"""
+        with self._lock:
+            self._stopping = True
+            for _ in self._workers:
+                self._pending.put(None)
+        if self.journal is not None:
+            self.journal.flush()
+
+    def _spawn_workers(self):
+        # Called with the lock held
+        self._workers = [w for w in self._workers if w.is_alive()]
+        wanted = min(self.max_workers, self._pending.qsize() + self._busy_count())
+        while len(self._workers) < wanted:
+            worker = threading.Thread(target=self._worker_loop, daemon=True,
+                                      name=f"hikari-worker-{len(self._workers) + 1}")
+            self._workers.append(worker)
+            worker.start()
+
+    def _busy_count(self):
+        return self._counts[RUNNING]
+
+    def _set_status(self, job, status):
+        # Called with the lock held; moves the job between the active and finished sets
+        if not job.finished:
+            self._counts[job.status] -= 1
+        job.status = status
+        if job.finished:
+            if self._active.pop(job.job_id, None) is not None:
+                self._finished.append(job)
+            return
+        if job.job_id not in self._active:
+            # Retried from the finished history, if it is still there
+            try:
+                self._finished.remove(job)
+            except ValueError:
+                pass
+            self._active[job.job_id] = job
+        self._counts[status] += 1
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                too_many = len([w for w in self._workers if w.is_alive()]) > self.max_workers
+                if self._stopping or too_many:
+                    self._workers.remove(threading.current_thread())
+                    return
+            try:
+                job = self._pending.get(timeout=5)
+            except queue.Empty:
+                with self._lock:
+                    if self._pending.empty():
+                        self._workers.remove(threading.current_thread())
+                        return
+                continue
+            if job is None:
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        with self._lock:
+            # Paused or cancelled while waiting in the queue
+            if job.status != QUEUED:
+                return
+            self._set_status(job, RUNNING)
+            job.stop_request = None
+        self._journal(job, force=True)
+        self._notify(job, 'job', {'status': job.status})
+
+        def on_event(kind, data):
+            if kind == 'progress':
+                job.progress = data['value']
+                job.transfer = data
+                self._journal(job)
+            elif kind == 'status':
+                job.message = data['message']
+            elif kind == 'output':
+                job.output_path = data['path']
+            elif kind == 'resume':
+                job.resume.update(data)
+                # Segment completions are frequent, let the journal throttle them
+                self._journal(job, force='format_ids' in data)
+            self._notify(job, kind, data)
+
+        self.engine.limiter.set_weight(job.key, job.weight)
+        merging = None
+        try:
+            if self._archived(job):
+                on_event('status', {'message': f"⏭️ Already downloaded: {job.title}"})
+            else:
+                result = self.engine.download(job.url, job.quality, job.format_ext, job.library,
+                                              job.output_folder, job.is_test, on_event=on_event, info=job.info,
+                                              resume=job.resume, should_stop=job.should_stop, job_key=job.key)
+                if isinstance(result, Future):
+                    # The merge or conversion runs in the post-processing pool, this worker moves on
+                    merging = result
+                else:
+                    self._add_to_archive(job)
+            status = DONE if merging is None else PROCESSING
+            job.progress = 1.0
+            job.transfer = dict(job.transfer, speed=None, eta=0)
+        except DownloadStopped as e:
+            status = CANCELLED if e.reason == STOP_CANCEL else PAUSED
+            job.transfer = dict(job.transfer, speed=None, eta=None)
+        except EngineError as e:
+            status = FAILED
+            job.error = e
+        except Exception as e:
+            status = FAILED
+            job.error = EngineError(f"Unexpected error: {str(e)}")
+
+        with self._lock:
+            self._set_status(job, status)
+            job.stop_request = None
+        self.engine.limiter.release(job.key)
+        if job.status != PAUSED:
+            # Drop the analyzed info, it is not needed anymore
+            job.info = None
+
+        self._journal(job, force=True)
+        self._notify(job, 'job', {'status': job.status})
+
+        if merging is not None:
+            merging.add_done_callback(lambda future: self._merged(job, future))
+
+    def _merged(self, job, future):
+        """Finish a job once the post-processing pool has merged its files"""
+        try:
+            future.result()
+            self._add_to_archive(job)
+            status = DONE
+        except EngineError as e:
+            status = FAILED
+            job.error = e
+        except Exception as e:
+            status = FAILED
+            job.error = EngineError(f"Unexpected error: {str(e)}")
+        with self._lock:
+            self._set_status(job, status)
+        self._journal(job, force=True)
+        self._notify(job, 'job', {'status': job.status})
+
+    def _add_to_archive(self, job):
+        if self.archive is not None and not job.is_test:
+            self.archive.add(extract_video_id(job.url), format_key(job.quality, job.format_ext),
+                             job.output_path, job.title)
+
+    def _archived(self, job):
+        """True if the archive already has this video in the job's format"""
+        if self.archive is None or job.is_test:
+            return False
+        video_id = extract_video_id(job.url)
+        fmt = format_key(job.quality, job.format_ext)
+        if self.archive.contains(video_id, fmt):
+            return True
+
+        # Files from before the archive existed are matched by name, like yt-dlp does.
+        # Imported and resumed jobs carry no info yet; the cached extraction is
+        # kept on the job so the download does not analyse the video again
+        if video_id:
+            try:
+                if not job.info:
+                    job.info = self.engine.extract_info(job.url)
+                    if job.title == job.url:
+                        job.title = job.info.get('title') or job.title
+                path = self.engine.expected_filename(job.info, job.format_ext, job.output_folder)
+            except Exception:
+                return False
+            if self.archive.has_file(path):
+                self.archive.add(video_id, fmt, path, job.title)
+                return True
+        return False
+
+    def _journal(self, job, force=False):
+        if self.journal is not None:
+            self.journal.record(job.to_record(), force=force)
+
+    def _notify(self, job, kind, data):
+        if self.on_update:
+            self.on_update(job, kind, data)
@@ -0,0 +1,129 @@
+"""
+Hikari Youtube Video Downloader - Job journal
+
+Persistent record of queued/running/done jobs, their chosen format IDs and
+partial files, written atomically so unfinished downloads can be resumed
+after the app is closed or crashes. Writes happen in a background thread,
+so callers on the UI thread never wait for the fsync, and changes made
+while a write is pending go out together.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .cache import DATA_DIR
+
+
+DEFAULT_JOURNAL_PATH = DATA_DIR / "journal.json"
+
+# Progress-only updates are written at most this often
+FLUSH_INTERVAL = 2.0
+MAX_FINISHED_RECORDS = 100
+
+UNFINISHED = ('queued', 'running', 'paused', 'processing')
+
+
+class JobJournal:
+    """Job records keyed by job key, saved with write-to-temp + rename"""
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._records = {}
+        self._lock = threading.Lock()
+        # Serializes writes between the writer thread and flush()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer = None
+        self._dirty = False
+        self._last_flush = 0.0
+        self.load()
+
+    def load(self):
+        """Read the journal; a missing or corrupt file starts empty"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            self._records = {record['key']: record for record in records}
+        except FileNotFoundError:
+            self._records = {}
+        except Exception as e:
+            print(f"⚠️ Could not read job journal: {e}")
+            self._records = {}
+
+    def record(self, record, force=False):
+        """Store a job record; written soon if forced, else throttled"""
+        self.record_many([record], force)
+
+    def record_many(self, records, force=False):
+        """Store several job records with a single write"""
+        with self._lock:
+            updated = time.time()
+            for record in records:
+                self._records[record['key']] = dict(record, updated=updated)
+            self._dirty = True
+            due = force or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self._schedule()
+
+    def remove(self, key):
+        with self._lock:
+            if self._records.pop(key, None) is None:
+                return
+            self._dirty = True
+        self._schedule()
+
+    def unfinished(self):
+        """Records of jobs that were queued, running or paused when the app stopped"""
+        with self._lock:
+            records = [r for r in self._records.values() if r.get('status') in UNFINISHED]
+        return sorted(records, key=lambda r: r.get('created', 0))
+
+    def flush(self):
+        """Write pending changes now, in the calling thread"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                # Keep only the most recent finished jobs
+                finished = sorted((r for r in self._records.values() if r.get('status') not in UNFINISHED),
+                                  key=lambda r: r.get('updated', 0))
+                for record in finished[:-MAX_FINISHED_RECORDS]:
+                    del self._records[record['key']]
+                data = json.dumps(list(self._records.values()), indent=2)
+                self._dirty = False
+                self._last_flush = time.monotonic()
+
+            if not self._write(data):
+                with self._lock:
+                    self._dirty = True
+
+    def _schedule(self):
+        """Wake the writer thread, starting it on first use"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True, name="hikari-journal")
+                self._writer.start()
+        self._wake.set()
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+
+    def _write(self, data):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not write job journal: {e}")
+            return False
@@ -0,0 +1,60 @@
+"""
+Hikari Youtube Video Downloader - Startup metrics
+
+Records how long the app takes to show its window, measured from process
+start, and how long its first analysis takes from the moment it is
+started, and keeps a short history in ~/.hikari/startup.jsonl so startup
+regressions are easy to spot.
+"""
+
+import json
+import threading
+import time
+
+from .cache import DATA_DIR
+
+
+DEFAULT_METRICS_PATH = DATA_DIR / "startup.jsonl"
+MAX_RECORDS = 200
+
+
+class StartupMetrics:
+    """Named one-shot timings relative to a start time"""
+
+    def __init__(self, started=None, path=DEFAULT_METRICS_PATH):
+        self.started = time.perf_counter() if started is None else started
+        self.path = path
+        self.marks = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        """Record seconds since start for ``name``, the first time only"""
+        return self.record(name, time.perf_counter() - self.started)
+
+    def record(self, name, seconds):
+        """Record a duration measured by the caller for ``name``, the first time only"""
+        with self._lock:
+            if name in self.marks:
+                return None
+            elapsed = self.marks[name] = round(seconds, 3)
+        print(f"⏱️ {name.replace('_', ' ')}: {elapsed:.2f} s")
+        return elapsed
+
+    def save(self):
+        """Append this run to the history file, keeping the latest records"""
+        with self._lock:
+            if not self.marks:
+                return
+            record = dict(self.marks, time=time.time())
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()[-(MAX_RECORDS - 1):]
+            except FileNotFoundError:
+                lines = []
+            lines.append(json.dumps(record) + "\n")
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+        except Exception as e:
+            print(f"⚠️ Could not save startup metrics: {e}")
@@ -0,0 +1,144 @@
+"""
+Hikari Youtube Video Downloader - Format planner
+
+Turns a quality/format choice and a FormatTable into the exact format IDs
+to fetch, before the download starts. Every backend downloads the plan it
+is given instead of resolving its own selector, so the UI checks, yt-dlp,
+pytube and the segmented downloader all agree on what a quality means.
+Audio-only plans pick a single audio format and no video at all.
+"""
+
+from .formats import FormatTable
+
+
+# Audio containers that can be merged into each output format
+AUDIO_COMPATIBLE = {
+    'mp4': ('m4a', 'mp4'),
+    'webm': ('webm',),
+}
+
+# Audio-only output formats and the source containers that already hold
+# their codec; anything else has to be converted by ffmpeg
+AUDIO_SOURCES = {
+    'm4a': ('m4a', 'mp4'),
+    'opus': ('webm',),
+    'mp3': (),
+}
+
+
+class FormatPlan:
+    """Concrete formats for one download: a video format and optionally an audio one
+
+    Audio-only plans have no video format.
+    """
+
+    __slots__ = ('video', 'audio', 'ext')
+
+    def __init__(self, video, audio=None, ext=None):
+        self.video = video
+        self.audio = audio
+        # Container of the final file, the merge format when there is audio to add
+        self.ext = ext or (video or audio).ext
+
+    @property
+    def audio_only(self):
+        return self.video is None
+
+    @property
+    def format_ids(self):
+        """yt-dlp format selector naming exactly these formats, e.g. '137+140'"""
+        if self.video is None:
+            return self.audio.format_id
+        if self.audio is not None:
+            return f"{self.video.format_id}+{self.audio.format_id}"
+        return self.video.format_id
+
+    @property
+    def height(self):
+        return self.video.height if self.video is not None else None
+
+    @property
+    def needs_conversion(self):
+        """True if an audio-only plan must be converted to reach its output format"""
+        return self.video is None and self.audio.ext not in AUDIO_SOURCES.get(self.ext, ())
+
+    def describe(self):
+        if self.video is None:
+            bitrate = f"{round(self.audio.tbr)}k " if self.audio.tbr else ""
+            text = f"{bitrate}{self.audio.ext.upper()} audio ({self.audio.acodec.split('.')[0]})"
+            if self.needs_conversion:
+                text += f" to {self.ext.upper()}"
+            return text
+        text = f"{self.video.height}p {self.video.ext.upper()} ({self.video.codec})"
+        if self.audio is not None:
+            text += f" + {self.audio.ext.upper()} audio"
+        return text
+
+    def __repr__(self):
+        return f"<FormatPlan {self.format_ids} -> {self.ext}>"
+
+
+def plan_formats(table, target_height, format_ext, merge=True, direct=False):
+    """Pick the formats for a target height (None for the best) and output format
+
+    The exact height is used when available, otherwise the nearest one,
+    as the UI reports. At that height formats in ``format_ext`` win, then
+    the one yt-dlp ranks best (later in its list). With ``merge`` a
+    video-only format gets the best audio format that fits the container.
+    Without it formats with sound are preferred, and ``direct`` only
+    allows progressive formats served over plain HTTP(S). Returns a
+    FormatPlan, or None when nothing fits.
+    """
+    candidates = table.video
+    if direct:
+        candidates = [e for e in candidates if e.has_audio and e.protocol in ('http', 'https')]
+    elif not merge and target_height is None:
+        # Without merging, the best file is the best one that has sound
+        candidates = [e for e in candidates if e.has_audio] or candidates
+    if not candidates:
+        return None
+    if candidates is not table.video:
+        table = FormatTable(candidates, table.audio)
+
+    if target_height is None:
+        height = table.heights[-1]
+    else:
+        height = table.nearest_height(target_height)
+
+    format_ext = format_ext.lower()
+    at_height = table.at_height(height)
+    video = max(range(len(at_height)),
+                key=lambda i: (not merge and at_height[i].has_audio, at_height[i].ext == format_ext, i))
+    video = at_height[video]
+
+    if video.has_audio or not merge or not table.audio:
+        return FormatPlan(video)
+
+    compatible = AUDIO_COMPATIBLE.get(format_ext)
+    audio = max(range(len(table.audio)),
+                key=lambda i: (compatible is None or table.audio[i].ext in compatible, i))
+    return FormatPlan(video, table.audio[audio], format_ext)
+
+
+def plan_audio(table, target_kbps, audio_ext, direct=False):
+    """Pick the audio-only format for a target bitrate (None for the best) and output format
+
+    Formats already in the output codec win, so no conversion is needed,
+    then the bitrate closest to ``target_kbps`` (the lower one on ties),
+    then the one yt-dlp ranks best. Returns a FormatPlan without video, or
+    None when the video has no separate audio stream.
+    """
+    candidates = table.audio
+    if direct:
+        candidates = [e for e in candidates if e.protocol in ('http', 'https')]
+    if not candidates:
+        return None
+
+    sources = AUDIO_SOURCES.get(audio_ext.lower(), ())
+    if target_kbps is None:
+        closeness = lambda entry: entry.tbr or 0
+    else:
+        closeness = lambda entry: (-abs((entry.tbr or 0) - target_kbps), -(entry.tbr or 0))
+    audio = max(range(len(candidates)),
+                key=lambda i: (candidates[i].ext in sources, closeness(candidates[i]), i))
+    return FormatPlan(None, candidates[audio], audio_ext.lower())
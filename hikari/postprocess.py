@@ -0,0 +1,131 @@
+"""
+Hikari Youtube Video Downloader - Post-processing pool
+
+Merging separately downloaded video and audio streams, and converting
+audio to MP3 or Opus, is handed to a pool sized to the CPU, so a download
+worker is free for the next job as soon as its transfer ends and ffmpeg
+runs while the network keeps downloading. Each job is an ffmpeg
+subprocess, so the pool only needs threads to wait on them; processes
+would have to be forked from the Tk process.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_WORKERS = os.cpu_count() or 2
+
+# ffmpeg encoder of each audio output format
+AUDIO_ENCODERS = {
+    'mp3': 'libmp3lame',
+    'opus': 'libopus',
+    'm4a': 'aac',
+}
+
+
+def find_ffmpeg(location=None):
+    """Path of the ffmpeg executable, from ``location`` (file or folder) or PATH"""
+    if location:
+        if os.path.isdir(location):
+            location = os.path.join(location, 'ffmpeg')
+        return shutil.which(location)
+    return shutil.which('ffmpeg')
+
+
+def merge_streams(ffmpeg, video_path, audio_path, output_path):
+    """Mux a video and an audio file into ``output_path`` without re-encoding
+
+    Runs in a pool thread. The inputs are removed once the output is in
+    place, so a failed merge can be retried from the same files.
+    """
+    _run_ffmpeg(ffmpeg, ['-i', video_path, '-i', audio_path, '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy'],
+                output_path)
+    for path in (video_path, audio_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return output_path
+
+
+def convert_audio(ffmpeg, source_path, output_path, codec, bitrate=None):
+    """Encode the audio of ``source_path`` as ``codec`` ('mp3', 'opus', 'm4a') into ``output_path``
+
+    Runs in a pool thread. ``bitrate`` is in kbps, None for the encoder's
+    best quality. The source is removed once the output is in place.
+    """
+    args = ['-i', source_path, '-vn', '-map', '0:a:0', '-c:a', AUDIO_ENCODERS.get(codec, codec)]
+    if bitrate:
+        args += ['-b:a', f"{int(bitrate)}k"]
+    elif codec == 'mp3':
+        # Best variable bitrate, as yt-dlp's own conversion uses
+        args += ['-q:a', '0']
+    _run_ffmpeg(ffmpeg, args, output_path)
+    try:
+        os.remove(source_path)
+    except OSError:
+        pass
+    return output_path
+
+
+def _run_ffmpeg(ffmpeg, args, output_path):
+    """Run ffmpeg into a temporary file and move it to ``output_path`` when it succeeds"""
+    root, ext = os.path.splitext(output_path)
+    tmp_path = f"{root}.temp{ext}"
+    command = [ffmpeg, '-y', '-loglevel', 'error'] + args + [tmp_path]
+    # No console window per job on Windows
+    creationflags = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, creationflags=creationflags)
+    if result.returncode != 0:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        error = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(error[-1] if error else f"ffmpeg exited with code {result.returncode}")
+
+    os.replace(tmp_path, output_path)
+
+
+class PostProcessPool:
+    """Thread pool for ffmpeg merges and conversions, started on first use
+
+    ``available`` is False when ffmpeg cannot be found, in which case
+    callers should let yt-dlp merge or convert in the download worker as before.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, ffmpeg_location=None):
+        self.max_workers = max(1, int(max_workers))
+        self.ffmpeg = find_ffmpeg(ffmpeg_location)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.ffmpeg is not None
+
+    def merge(self, video_path, audio_path, output_path):
+        """Returns a Future of the merged file's path"""
+        return self._pool().submit(merge_streams, self.ffmpeg, video_path, audio_path, output_path)
+
+    def convert(self, source_path, output_path, codec, bitrate=None):
+        """Returns a Future of the converted file's path"""
+        return self._pool().submit(convert_audio, self.ffmpeg, source_path, output_path, codec, bitrate)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="hikari-merge")
+            return self._executor
+
+    def shutdown(self, wait=False):
+        """Stop the pool; jobs not started yet keep their input files for a retry"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
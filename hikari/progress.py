@@ -0,0 +1,152 @@
+"""
+Hikari Youtube Video Downloader - Progress model
+
+Numeric per-job progress (bytes, speed, ETA, fragments) built from the
+yt-dlp progress hook or the pytube chunk callback, plus queue-wide totals.
+"""
+
+import time
+
+
+# Weight of the newest sample in the smoothed speed
+SPEED_SMOOTHING = 0.3
+
+
+class JobProgress:
+    """Transfer state of one job, possibly made of several files"""
+
+    def __init__(self):
+        self.files = {}
+        self.current_file = None
+        self.speed = None
+        self.eta = None
+        self.fragment_index = None
+        self.fragment_count = None
+        self.started = time.monotonic()
+        self._last_time = None
+        self._last_bytes = None
+
+    def update(self, filename, downloaded_bytes, total_bytes=None, speed=None, eta=None,
+               fragment_index=None, fragment_count=None):
+        """Record a sample for one file of the job"""
+        now = time.monotonic()
+        downloaded_bytes = downloaded_bytes or 0
+
+        if filename != self.current_file:
+            self.current_file = filename
+            self._last_time = None
+            self._last_bytes = None
+
+        previous_total = self.files.get(filename, (0, None))[1]
+        self.files[filename] = (downloaded_bytes, total_bytes or previous_total)
+
+        # Measure the speed ourselves when the backend does not report it
+        if speed is None and self._last_time is not None and now > self._last_time:
+            sample = (downloaded_bytes - self._last_bytes) / (now - self._last_time)
+            speed = sample if self.speed is None else (
+                SPEED_SMOOTHING * sample + (1 - SPEED_SMOOTHING) * self.speed)
+        self._last_time = now
+        self._last_bytes = downloaded_bytes
+
+        self.speed = speed
+        self.fragment_index = fragment_index
+        self.fragment_count = fragment_count
+
+        if eta is None and speed:
+            remaining = self.total_bytes - self.downloaded_bytes
+            eta = remaining / speed if remaining > 0 else 0
+        self.eta = eta
+
+    def finish_file(self, filename):
+        """Mark a file as complete, e.g. on the 'finished' hook status"""
+        downloaded, total = self.files.get(filename, (0, None))
+        size = max(downloaded, total or 0)
+        self.files[filename] = (size, size)
+        self.speed = None
+        self.eta = None
+
+    @property
+    def downloaded_bytes(self):
+        return sum(downloaded for downloaded, _ in self.files.values())
+
+    @property
+    def total_bytes(self):
+        return sum(total or downloaded for downloaded, total in self.files.values())
+
+    @property
+    def fraction(self):
+        total = self.total_bytes
+        if total:
+            return min(1.0, self.downloaded_bytes / total)
+        if self.fragment_count:
+            return min(1.0, (self.fragment_index or 0) / self.fragment_count)
+        return 0.0
+
+    def snapshot(self):
+        """Plain dict for events and display"""
+        return {
+            'value': self.fraction,
+            'downloaded_bytes': self.downloaded_bytes,
+            'total_bytes': self.total_bytes,
+            'speed': self.speed,
+            'eta': self.eta,
+            'fragment_index': self.fragment_index,
+            'fragment_count': self.fragment_count,
+            'elapsed': time.monotonic() - self.started,
+            'files': {name: [downloaded, total] for name, (downloaded, total) in self.files.items()},
+        }
+
+    def update_from_ytdlp(self, d):
+        """Feed a yt-dlp progress hook dict; returns True if it was a transfer sample"""
+        filename = d.get('filename') or d.get('tmpfilename')
+        if d.get('status') == 'downloading':
+            self.update(filename,
+                        d.get('downloaded_bytes'),
+                        d.get('total_bytes') or d.get('total_bytes_estimate'),
+                        d.get('speed'),
+                        d.get('eta'),
+                        d.get('fragment_index'),
+                        d.get('fragment_count'))
+            return True
+        if d.get('status') == 'finished':
+            self.finish_file(filename)
+            return True
+        return False
+
+
+def aggregate(snapshots):
+    """Queue-wide totals from job progress snapshots"""
+    downloaded = sum(s.get('downloaded_bytes') or 0 for s in snapshots)
+    total = sum(s.get('total_bytes') or 0 for s in snapshots)
+    speed = sum(s.get('speed') or 0 for s in snapshots)
+    remaining = max(0, total - downloaded)
+    return {
+        'downloaded_bytes': downloaded,
+        'total_bytes': total,
+        'speed': speed,
+        'eta': remaining / speed if speed else None,
+        'value': downloaded / total if total else 0.0,
+    }
+
+
+def format_bytes(num):
+    """Human readable byte count, e.g. '12.3 MB'"""
+    if num is None:
+        return "?"
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(num) < 1024:
+            return f"{num:.1f} {unit}" if unit != "B" else f"{int(num)} B"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def format_eta(seconds):
+    """ETA as m:ss or h:mm:ss"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
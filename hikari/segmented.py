@@ -0,0 +1,227 @@
+"""
+Hikari Youtube Video Downloader - Segmented HTTP downloader
+
+Fetches a known-size resource as byte ranges over several persistent
+connections in parallel, writing each range at its offset into a
+preallocated file. Used for direct progressive formats, where a single
+stream is often throttled well below the link speed.
+"""
+
+import http.client
+import os
+import queue
+import threading
+from urllib.parse import urljoin, urlsplit
+
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+READ_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+MAX_RETRIES = 3
+
+
+class SegmentedDownloadError(Exception):
+    """Raised when a resource cannot be fetched"""
+
+
+class _Connection:
+    """One persistent HTTP(S) connection to a host, reopened on failure"""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, url, headers):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        if self.conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.conn = conn_class(self.host, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, headers=headers)
+            return self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class SegmentedDownloader:
+    """Parallel range downloader over a small pool of connections"""
+
+    def __init__(self, connections=DEFAULT_CONNECTIONS, segment_size=DEFAULT_SEGMENT_SIZE, timeout=20):
+        self.connections = max(1, int(connections))
+        self.segment_size = segment_size
+        self.timeout = timeout
+
+    def probe(self, url, headers=None):
+        """Follow redirects and return (final_url, size, accepts_ranges)"""
+        headers = dict(headers or {})
+        headers['Range'] = 'bytes=0-0'
+
+        for _ in range(MAX_REDIRECTS + 1):
+            conn = _Connection(url, self.timeout)
+            try:
+                response = conn.request('GET', url, headers)
+                # A 200 means the whole body is coming, do not read it here
+                if response.status != 200:
+                    response.read()
+            finally:
+                conn.close()
+
+            if response.status in (301, 302, 303, 307, 308):
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if response.status == 206:
+                content_range = response.getheader('Content-Range') or ''
+                total = content_range.rpartition('/')[2]
+                return url, int(total) if total.isdigit() else None, True
+            if response.status == 200:
+                length = response.getheader('Content-Length')
+                return url, int(length) if length and length.isdigit() else None, False
+            raise SegmentedDownloadError(f"HTTP {response.status} {response.reason}")
+
+        raise SegmentedDownloadError("Too many redirects")
+
+    def download(self, url, path, headers=None, on_progress=None, size=None, done_segments=None, on_segment=None):
+        """Download ``url`` to ``path``; returns the number of bytes written
+
+        ``size`` is only used when the server does not report one and must
+        be exact; without a size the file is fetched over one connection.
+        ``on_progress(downloaded_bytes, total_bytes)`` may be called from
+        several threads. ``on_segment(start)`` reports each finished range;
+        passing those starts back as ``done_segments`` resumes an
+        interrupted download from its ``.part`` file.
+        """
+        headers = dict(headers or {})
+        final_url, probed_size, ranges = self.probe(url, headers)
+        size = probed_size or size
+
+        part_path = str(path) + ".part"
+        if not ranges or not size or self.connections == 1:
+            written = self._download_single(final_url, part_path, headers, on_progress, size)
+        else:
+            written = self._download_segments(final_url, part_path, headers, on_progress, size,
+                                              done_segments, on_segment)
+
+        os.replace(part_path, path)
+        return written
+
+    def _download_single(self, url, part_path, headers, on_progress, size):
+        conn = _Connection(url, self.timeout)
+        downloaded = 0
+        try:
+            response = conn.request('GET', url, headers)
+            if response.status != 200:
+                raise SegmentedDownloadError(f"HTTP {response.status} {response.reason}")
+            with open(part_path, 'wb') as f:
+                while True:
+                    chunk = response.read(READ_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if on_progress:
+                        on_progress(downloaded, size)
+        finally:
+            conn.close()
+        return downloaded
+
+    def _download_segments(self, url, part_path, headers, on_progress, size, done_segments=None, on_segment=None):
+        # Reuse a partial file of the right size, otherwise preallocate so
+        # every worker can write at its own offset
+        done_segments = set(done_segments or [])
+        if not done_segments or not os.path.exists(part_path) or os.path.getsize(part_path) != size:
+            done_segments = set()
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+
+        segments = queue.Queue()
+        already = 0
+        for start in range(0, size, self.segment_size):
+            end = min(start + self.segment_size, size) - 1
+            if start in done_segments:
+                already += end - start + 1
+            else:
+                segments.put((start, end))
+
+        lock = threading.Lock()
+        state = {'downloaded': already}
+        errors = []
+
+        def report(count):
+            with lock:
+                state['downloaded'] += count
+                downloaded = state['downloaded']
+            if on_progress:
+                on_progress(downloaded, size)
+
+        def worker():
+            conn = _Connection(url, self.timeout)
+            try:
+                with open(part_path, 'r+b') as f:
+                    while not errors:
+                        try:
+                            start, end = segments.get_nowait()
+                        except queue.Empty:
+                            return
+                        self._fetch_segment(conn, url, headers, f, start, end, report)
+                        if on_segment:
+                            # Data must be on disk before the range is recorded as done
+                            f.flush()
+                            on_segment(start)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=worker, daemon=True)
+                   for _ in range(min(self.connections, segments.qsize()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise SegmentedDownloadError(f"Segment failed: {errors[0]}")
+        return state['downloaded']
+
+    def _fetch_segment(self, conn, url, headers, f, start, end, report):
+        offset = start
+        for attempt in range(MAX_RETRIES):
+            try:
+                range_headers = dict(headers, Range=f"bytes={offset}-{end}")
+                response = conn.request('GET', url, range_headers)
+                if response.status != 206:
+                    response.read()
+                    raise SegmentedDownloadError(f"HTTP {response.status} for range {offset}-{end}")
+
+                f.seek(offset)
+                while offset <= end:
+                    chunk = response.read(min(READ_SIZE, end - offset + 1))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    offset += len(chunk)
+                    report(len(chunk))
+
+                if offset > end:
+                    return
+                # Short read, reconnect and continue from the current offset
+                conn.close()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if attempt == MAX_RETRIES - 1:
+                    raise
+        raise SegmentedDownloadError(f"Incomplete range {start}-{end}")
@@ -0,0 +1,148 @@
+"""
+Hikari Youtube Video Downloader - Thumbnail pipeline
+
+Fetches, decodes and resizes video thumbnails away from the UI thread, with
+an in-memory LRU of resized images and an on-disk cache keyed by video ID.
+Downloads share one HTTP session, so the connection to the image host stays
+open between videos.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+from .cache import DATA_DIR
+from .tracing import Tracer
+
+
+DEFAULT_THUMBNAIL_DIR = DATA_DIR / "thumbnails"
+PREVIEW_SIZE = (400, 160)
+
+
+def pick_thumbnail(info, min_height=PREVIEW_SIZE[1]):
+    """Returns the smallest JPEG thumbnail URL that still fills the preview"""
+    candidates = [
+        t for t in info.get('thumbnails') or []
+        if t.get('url') and t.get('height') and t['height'] >= min_height
+        and t['url'].split('?')[0].endswith('.jpg')
+    ]
+    if candidates:
+        return min(candidates, key=lambda t: t['height'])['url']
+    return info.get('thumbnail')
+
+
+class ThumbnailCache:
+    """Two-level cache of preview-sized PIL images"""
+
+    def __init__(self, cache_dir=DEFAULT_THUMBNAIL_DIR, max_items=64, size=PREVIEW_SIZE, timeout=5, tracer=None):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.size = size
+        self.timeout = timeout
+        self.tracer = tracer or Tracer()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"⚠️ Thumbnail disk cache disabled: {e}")
+            self.cache_dir = None
+
+    def get(self, video_id, url):
+        """Returns the resized image for a video, fetching it if needed
+
+        Blocking; call it from a background thread.
+        """
+        image = self._from_memory(video_id)
+        if image is not None:
+            return image
+
+        with self.tracer.span('thumbnail', video_id=video_id, source='disk') as span:
+            image = self._from_disk(video_id)
+            if image is None:
+                if not url:
+                    return None
+                data = self._fetch(url)
+                span.set(source='network', bytes=len(data))
+                image = self._decode(data)
+                self._to_disk(video_id, image)
+
+        self._to_memory(video_id, image)
+        return image
+
+    def _from_memory(self, video_id):
+        if not video_id:
+            return None
+        with self._lock:
+            image = self._memory.get(video_id)
+            if image is not None:
+                self._memory.move_to_end(video_id)
+            return image
+
+    def _to_memory(self, video_id, image):
+        if not video_id:
+            return
+        with self._lock:
+            self._memory[video_id] = image
+            self._memory.move_to_end(video_id)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, video_id):
+        if not video_id or self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{video_id}.jpg"
+
+    def _from_disk(self, video_id):
+        path = self._disk_path(video_id)
+        if path is None or not path.exists():
+            return None
+        try:
+            from PIL import Image
+
+            image = Image.open(path)
+            image.load()
+            return image
+        except Exception as e:
+            print(f"⚠️ Corrupt cached thumbnail {path.name}: {e}")
+            return None
+
+    def _to_disk(self, video_id, image):
+        path = self._disk_path(video_id)
+        if path is None:
+            return
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            image.save(tmp_path, format='JPEG', quality=90)
+            tmp_path.replace(path)
+        except Exception as e:
+            print(f"⚠️ Could not cache thumbnail: {e}")
+
+    def _fetch(self, url):
+        # Thumbnails are small, fetching one at a time keeps the session thread-safe
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            response = self._session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.content
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _decode(self, data):
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(data))
+        # Let the JPEG decoder downscale by a power of two while decoding
+        image.draft('RGB', self.size)
+        image = image.convert('RGB')
+        image.thumbnail(self.size, Image.Resampling.LANCZOS)
+        return image
@@ -0,0 +1,185 @@
+"""
+Hikari Youtube Video Downloader - Tracing
+
+Timed spans around the phases of an analysis or download (extraction,
+format planning, transfer, post-processing, thumbnail, UI updates),
+written as JSON lines to a rotating trace file under ~/.hikari. Each
+record carries the span's duration, its parent span and attributes
+such as the job key, video ID and byte counts, so a slow job can be
+attributed to the phase that made it slow.
+
+Tracing is off unless enabled. A disabled tracer hands out one shared
+no-op span, so instrumented code costs an attribute lookup and a call.
+"""
+
+import itertools
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from pathlib import Path
+
+from .cache import DATA_DIR
+
+
+DEFAULT_TRACE_PATH = DATA_DIR / "trace.jsonl"
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+_span_ids = itertools.count(1)
+
+
+class _NullSpan:
+    """Span of a disabled tracer; every method does nothing"""
+
+    __slots__ = ()
+    id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, name, amount):
+        pass
+
+    def finish(self, error=None):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed phase; use as a context manager or call finish()"""
+
+    __slots__ = ('tracer', 'name', 'id', 'parent', 'attrs', 'started', 'start_time', '_finished')
+
+    def __init__(self, tracer, name, parent, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.id = next(_span_ids)
+        self.parent = parent
+        self.attrs = attrs
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        self._finished = False
+
+    def __enter__(self):
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._pop(self)
+        self.finish(exc)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, name, amount):
+        """Accumulate a counter attribute, e.g. bytes transferred"""
+        self.attrs[name] = self.attrs.get(name, 0) + (amount or 0)
+
+    def finish(self, error=None):
+        if self._finished:
+            return
+        self._finished = True
+        record = {
+            'span': self.name,
+            'id': self.id,
+            'parent': self.parent,
+            'start': round(self.start_time, 6),
+            'ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'thread': threading.current_thread().name,
+        }
+        if isinstance(error, str):
+            record['error'] = error
+        elif error is not None:
+            record['error'] = f"{type(error).__name__}: {error}"
+        record.update(self.attrs)
+        self.tracer._write(record)
+
+
+class Tracer:
+    """Hands out spans and writes finished ones to a rotating JSONL file
+
+    Spans opened with ``with`` nest per thread: a span started inside
+    another on the same thread records it as its parent. Work handed to
+    other threads can pass ``parent=span.id`` explicitly.
+    """
+
+    def __init__(self, path=None, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.enabled = False
+        self.path = None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._local = threading.local()
+        self._logger = None
+        if path is not None:
+            self.enable(path)
+
+    def enable(self, path=DEFAULT_TRACE_PATH):
+        if self.enabled:
+            return
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                str(path), maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️ Tracing disabled: {e}")
+            return
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        # A private logger, so records never reach the root handlers
+        logger = logging.getLogger(f"hikari.trace.{id(self)}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        self._logger = logger
+        self.path = path
+        self.enabled = True
+        print(f"🧭 Tracing to {path}")
+
+    def disable(self):
+        self.enabled = False
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                self._logger.removeHandler(handler)
+                handler.close()
+            self._logger = None
+
+    def span(self, name, parent=None, **attrs):
+        """New span named ``name``; a no-op span when tracing is off"""
+        if not self.enabled:
+            return NULL_SPAN
+        if parent is None:
+            stack = getattr(self._local, 'stack', None)
+            if stack:
+                parent = stack[-1].id
+        return Span(self, name, parent, attrs)
+
+    def _push(self, span):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(span)
+
+    def _pop(self, span):
+        stack = getattr(self._local, 'stack', None)
+        if stack and stack[-1] is span:
+            stack.pop()
+
+    def _write(self, record):
+        logger = self._logger
+        if logger is None:
+            return
+        try:
+            logger.info(json.dumps(record, default=str))
+        except Exception as e:
+            print(f"⚠️ Could not write trace record: {e}")
@@ -0,0 +1,121 @@
+"""
+Hikari Youtube Video Downloader - URL classification
+
+All patterns are compiled once at import. ``classify_url`` parses a URL in
+a single pass into (type, canonical video ID, playlist ID), treating
+youtu.be, m./music. hosts, extra query parameters, shorts and embeds alike,
+so caches and indexes can key on the video ID whatever form was pasted.
+"""
+
+import re
+from functools import lru_cache
+
+
+# Scheme and host, then path and query split off in the same match
+_URL_RE = re.compile(
+    r'^\s*(?:https?://)?(?:(?:www|m|music)\.)?'
+    r'(?P<host>youtube\.com|youtube-nocookie\.com|youtu\.be)'
+    r'(?P<path>/[^?#\s]*)?(?:\?(?P<query>[^#\s]*))?',
+    re.IGNORECASE)
+
+# Path shapes of youtube.com, checked in order
+_PATH_RE = re.compile(
+    r'^/(?:'
+    r'(?P<watch>watch)/?'
+    r'|(?P<kind>shorts|live|embed|v)/(?P<id>[A-Za-z0-9_-]{11})'
+    r'|(?P<playlist>playlist)/?'
+    r'|(?P<channel>channel/|c/|user/|@)[^/]+'
+    r')', re.IGNORECASE)
+
+_SHORT_PATH_RE = re.compile(r'^/([A-Za-z0-9_-]{11})/?$')
+_VIDEO_ID_RE = re.compile(r'[A-Za-z0-9_-]{11}')
+_PLAYLIST_ID_RE = re.compile(r'[A-Za-z0-9_-]{2,}')
+_PARAM_RE = re.compile(r'(?:^|&)(v|list)=([^&]*)')
+
+# Path prefixes that are video pages in their own right
+_VIDEO_KINDS = {'shorts': 'shorts', 'live': 'live', 'embed': 'normal_video', 'v': 'normal_video'}
+
+URL_MESSAGES = {
+    'normal_video': None,
+    'video_in_playlist': "⚠️ Video in playlist URL detected.\n\nOnly the individual video will be downloaded.\n\nTo download the whole playlist use its playlist URL:\n\nhttps://www.youtube.com/playlist?list=PLAYLIST_ID",
+    'playlist': "📃 Playlist URL detected.\n\nAll videos of the playlist will be analyzed and can be queued for download.",
+    'shorts': "❌ YouTube Shorts URL detected.\n\nThis program does NOT support YouTube Shorts.\n\nPlease use a normal video URL:\nhttps://www.youtube.com/watch?v=VIDEO_ID",
+    'live': "❌ Live stream URL detected.\n\nThis program does NOT support live streams.\n\nPlease use a normal video URL.",
+    'channel': "📃 Channel URL detected.\n\nAll videos of the channel will be analyzed and can be queued for download.",
+    'unknown': "❌ URL not recognized.\n\nPlease use a valid YouTube video URL:\n\n• https://www.youtube.com/watch?v=VIDEO_ID\n• https://youtu.be/VIDEO_ID",
+}
+
+UNKNOWN = ('unknown', None, None)
+
+
+@lru_cache(maxsize=4096)
+def classify_url(url):
+    """Returns (url_type, video_id, playlist_id) for a YouTube URL
+
+    ``url_type`` is one of normal_video, video_in_playlist, playlist,
+    shorts, live, channel or unknown; the IDs are None when absent.
+    """
+    match = _URL_RE.match(url)
+    if not match:
+        return UNKNOWN
+
+    params = dict(_PARAM_RE.findall(match.group('query') or ''))
+    playlist_id = params.get('list')
+    if playlist_id is not None and not _PLAYLIST_ID_RE.fullmatch(playlist_id):
+        playlist_id = None
+
+    path = match.group('path') or '/'
+    if match.group('host').lower() == 'youtu.be':
+        short_match = _SHORT_PATH_RE.match(path)
+        if not short_match:
+            return UNKNOWN
+        video_id = short_match.group(1)
+        url_type = 'normal_video'
+    else:
+        path_match = _PATH_RE.match(path)
+        if not path_match:
+            return UNKNOWN
+        if path_match.group('watch'):
+            video_id = params.get('v')
+            if video_id is None or not _VIDEO_ID_RE.fullmatch(video_id):
+                return UNKNOWN
+            url_type = 'normal_video'
+        elif path_match.group('kind'):
+            video_id = path_match.group('id')
+            url_type = _VIDEO_KINDS[path_match.group('kind').lower()]
+        elif path_match.group('playlist'):
+            return ('playlist', None, playlist_id) if playlist_id else UNKNOWN
+        else:
+            return 'channel', None, None
+
+    if url_type == 'normal_video' and playlist_id:
+        url_type = 'video_in_playlist'
+    return url_type, video_id, playlist_id
+
+
+def classify_urls(urls):
+    """Yields (url, url_type, video_id, playlist_id) for an iterable of URLs
+
+    Lazy, so large pasted lists and files are classified as they are read.
+    Blank lines are skipped.
+    """
+    for url in urls:
+        url = url.strip()
+        if url:
+            yield (url,) + classify_url(url)
+
+
+def canonical_url(video_id):
+    """The plain watch URL of a video"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def detect_url_type(url):
+    """Detects YouTube URL type and returns (url_type, message)"""
+    url_type = classify_url(url)[0]
+    return url_type, URL_MESSAGES[url_type]
+
+
+def extract_video_id(url):
+    """Returns the canonical 11-char video ID of any video URL, or None"""
+    return classify_url(url)[1]
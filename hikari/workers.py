@@ -0,0 +1,367 @@
+"""
+Hikari Youtube Video Downloader - Worker processes
+
+Optional pool of long-lived processes that run yt-dlp, so extraction and
+downloads use more than one core and the UI interpreter never competes
+with yt-dlp's parsing for the GIL. Each worker imports and prewarms yt-dlp
+once, then runs calls (extract, expand, filename, download) in threads,
+streaming engine events back over a pipe.
+
+ProcessEngine is a drop-in HikariEngine: callbacks, should_stop() and the
+bandwidth limiter keep running in the calling thread of the UI process,
+and the metadata cache, journal and archive stay there too.
+"""
+
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+
+from .engine import HikariEngine, EngineError, DownloadStopped
+
+
+# How often a waiting call checks should_stop()
+STOP_POLL_INTERVAL = 0.2
+# Unlimited transfers report their byte counts this often, without waiting for an answer
+REPORT_INTERVAL = 0.25
+
+_call_ids = itertools.count(1)
+
+
+class ProcessEngine(HikariEngine):
+    """HikariEngine whose yt-dlp work runs in a pool of worker processes"""
+
+    def __init__(self, workers=2, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = WorkerPool(workers, {
+            'connections': self.connections,
+            # Merges still go to this process's post-processing pool
+            'merge_later': self.postprocessor is not None and self.postprocessor.available,
+        })
+
+    def prewarm(self):
+        """Start the workers, which import and prewarm yt-dlp themselves"""
+        try:
+            self.pool.start()
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not start worker processes: {e}")
+            return False
+
+    def _extract_info(self, url, video_id):
+        with self.tracer.span('extract', video_id=video_id, process='worker') as span:
+            info = self.pool.call('extract', (url, video_id))
+            span.set(formats=len(info.get('formats') or ()))
+
+        if self.cache is not None:
+            self.cache.put(info.get('id') or video_id, info)
+        return info
+
+    def expand(self, url, on_event=None, depth=2):
+        self.emit(on_event, 'status', message="📃 Reading playlist entries...")
+        return self.pool.call('expand', (url, None, depth))
+
+    def expected_filename(self, info, format_ext, output_folder, is_test=False):
+        return self.pool.call('filename', (info, format_ext, output_folder, is_test))
+
+    def _download(self, url, quality, format_ext, library, output_folder, is_test, on_event, info, resume,
+                  should_stop, throttle):
+        def call(info):
+            return self.pool.call('download',
+                                  (url, quality, format_ext, library, output_folder, is_test, info, resume,
+                                   self.limiter.rate),
+                                  on_event=lambda kind, data: self.emit(on_event, kind, **data),
+                                  should_stop=should_stop, throttle=throttle, rate=lambda: self.limiter.rate)
+
+        try:
+            result = call(info)
+        except DownloadStopped:
+            raise
+        except EngineError as e:
+            # Workers have no cache, so the retry with fresh info for expired
+            # stream URLs happens here, as download_with_ytdlp does in-process
+            if e.title != "Error yt-dlp" or self.cache is None or not info:
+                raise
+            self.cache.invalidate(info.get('id'))
+            result = call(self.extract_info(url))
+
+        if isinstance(result, tuple) and result[0] == 'merge':
+            return self.merge_later(*result[1:], on_event=on_event)
+        if isinstance(result, tuple) and result[0] == 'convert':
+            return self.convert_later(*result[1:], on_event=on_event)
+        return result
+
+    def close(self):
+        super().close()
+        self.pool.shutdown()
+
+
+class WorkerPool:
+    """Worker processes started on first use; calls go to the least busy one"""
+
+    def __init__(self, size=2, options=None):
+        self.size = max(1, int(size))
+        self.options = options or {}
+        self.workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                raise EngineError("The worker processes have been shut down")
+            self.workers = [w for w in self.workers if w.alive]
+            while len(self.workers) < self.size:
+                self.workers.append(_Worker(self.options))
+            return list(self.workers)
+
+    def call(self, kind, args, on_event=None, should_stop=None, throttle=None, rate=None):
+        """Run ``kind`` in a worker and return its result, raising its EngineError
+
+        Blocks the calling thread, which also runs ``on_event``, the
+        ``throttle`` requests of the worker and the ``should_stop()`` polls.
+        Changes of ``rate()``, the current bandwidth limit, are passed on to
+        the worker, which only waits for ``throttle`` while it is limited.
+        """
+        worker = min(self.start(), key=lambda w: w.busy)
+        return worker.call(kind, args, on_event, should_stop, throttle, rate)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.stop()
+
+
+class _Worker:
+    """UI-side handle of one worker process"""
+
+    def __init__(self, options):
+        # Spawned, never forked: the UI process has threads and a Tk interpreter
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_conn, options),
+                                       daemon=True, name="hikari-engine-worker")
+        self.process.start()
+        child_conn.close()
+
+        self.alive = True
+        self.busy = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read_loop, daemon=True, name="hikari-worker-reader").start()
+
+    def call(self, kind, args, on_event, should_stop, throttle, rate):
+        call_id = next(_call_ids)
+        messages = queue.Queue()
+        with self._lock:
+            if not self.alive:
+                raise EngineError("The worker process stopped unexpectedly")
+            self._calls[call_id] = messages
+            self.busy += 1
+
+        finished = False
+        try:
+            self._send(('call', call_id, kind, args))
+            stop_sent = None
+            rate_sent = rate() if rate else None
+            while True:
+                try:
+                    message = messages.get(timeout=STOP_POLL_INTERVAL)
+                except queue.Empty:
+                    message = None
+
+                reason = should_stop() if should_stop else None
+                if reason and reason != stop_sent:
+                    self._send(('stop', call_id, reason))
+                    stop_sent = reason
+                current_rate = rate() if rate else None
+                if current_rate != rate_sent:
+                    self._send(('rate', call_id, current_rate))
+                    rate_sent = current_rate
+                if message is None:
+                    continue
+
+                if message[0] == 'event':
+                    if on_event:
+                        on_event(message[2], message[3])
+                elif message[0] == 'throttle':
+                    try:
+                        if throttle:
+                            throttle(message[2], message[3])
+                    finally:
+                        self._send(('ack', call_id, message[4]))
+                elif message[0] == 'bytes':
+                    # Keeps the limiter's counts current; nobody waits for it
+                    if throttle:
+                        throttle(message[2], message[3])
+                elif message[0] == 'result':
+                    finished = True
+                    return message[2]
+                else:
+                    finished = True
+                    _, _, error, text, title = message
+                    if error == 'stopped':
+                        raise DownloadStopped(text)
+                    raise EngineError(text, title)
+        finally:
+            if not finished and self.alive:
+                # A callback raised: nobody answers the worker any more, stop the call there
+                try:
+                    self._send(('stop', call_id, 'cancel'))
+                except EngineError:
+                    pass
+            with self._lock:
+                self._calls.pop(call_id, None)
+                self.busy -= 1
+
+    def stop(self):
+        try:
+            self._send(None)
+        except EngineError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def _send(self, message):
+        try:
+            with self._send_lock:
+                self.conn.send(message)
+        except (OSError, ValueError) as e:
+            raise EngineError(f"The worker process stopped unexpectedly: {e}")
+
+    def _read_loop(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                messages = self._calls.get(message[1])
+            if messages is not None:
+                messages.put(message)
+
+        # Fail the calls in flight; the pool starts a replacement on the next call
+        with self._lock:
+            self.alive = False
+            pending = list(self._calls.items())
+        for call_id, messages in pending:
+            messages.put(('error', call_id, 'engine', "The worker process stopped unexpectedly", "Error"))
+
+
+class _DeferredMerges:
+    """Post-processor of a worker: merges and conversions are handed back to the UI process's pool"""
+
+    def __init__(self, available):
+        self.available = available
+
+
+class _WorkerEngine(HikariEngine):
+    def merge_later(self, video_path, audio_path, output_path, on_event=None):
+        return ('merge', video_path, audio_path, output_path)
+
+    def convert_later(self, source_path, output_path, codec, bitrate=None, on_event=None):
+        return ('convert', source_path, output_path, codec, bitrate)
+
+
+def worker_main(conn, options):
+    """Entry point of a worker process"""
+    engine = _WorkerEngine(connections=options.get('connections'),
+                           postprocessor=_DeferredMerges(options.get('merge_later', False)))
+    engine.prewarm()
+
+    send_lock = threading.Lock()
+    stops = {}
+    rates = {}
+    acks = {}
+    tokens = itertools.count(1)
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def run(call_id, kind, args):
+        def on_event(event, data):
+            send(('event', call_id, event, data))
+
+        reported = {}
+
+        def throttle(name, count):
+            if not rates.get(call_id):
+                # Unlimited: no round trip per chunk, the counts only keep the
+                # limiter's baseline current should a limit be set meanwhile
+                now = time.monotonic()
+                if now - reported.get(name, 0) >= REPORT_INTERVAL:
+                    reported[name] = now
+                    send(('bytes', call_id, name, count))
+                return
+            # The UI process owns the bandwidth limiter; wait until it lets us go on.
+            # Segmented downloads throttle from several threads, each with its own token.
+            token = next(tokens)
+            ack = acks[token] = threading.Event()
+            try:
+                send(('throttle', call_id, name, count, token))
+                while not ack.wait(STOP_POLL_INTERVAL):
+                    if stops.get(call_id):
+                        return
+            finally:
+                acks.pop(token, None)
+
+        should_stop = lambda: stops.get(call_id)
+        try:
+            if kind == 'extract':
+                result = engine._extract_info(*args)
+            elif kind == 'expand':
+                result = engine.expand(*args)
+            elif kind == 'filename':
+                result = engine.expected_filename(*args)
+            elif kind == 'download':
+                url, quality, format_ext, library, output_folder, is_test, info, resume, rate = args
+                engine.limiter.set_rate(rate)
+                result = engine._download(url, quality, format_ext, library, output_folder, is_test, on_event,
+                                          info, resume, should_stop, throttle)
+            else:
+                raise EngineError(f"Unknown worker call: {kind}")
+            send(('result', call_id, result))
+        except DownloadStopped as e:
+            send(('error', call_id, 'stopped', e.reason, e.title))
+        except EngineError as e:
+            send(('error', call_id, 'engine', str(e), e.title))
+        except ImportError:
+            send(('error', call_id, 'engine', "yt-dlp is not installed.\nRun: pip install yt-dlp", "Error"))
+        except Exception as e:
+            # Raw extractor errors, wrapped by the UI side as the in-process engine would
+            send(('error', call_id, 'engine', str(e), "Error"))
+        finally:
+            stops.pop(call_id, None)
+            rates.pop(call_id, None)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        if message[0] == 'call':
+            _, call_id, kind, args = message
+            if kind == 'download':
+                # Set here, before any later 'rate' message for the call is read
+                rates[call_id] = args[-1]
+            threading.Thread(target=run, args=(call_id, kind, args), daemon=True).start()
+        elif message[0] == 'stop':
+            stops[message[1]] = message[2]
+        elif message[0] == 'rate' and message[1] in rates:
+            rates[message[1]] = message[2]
+            # pytube sizes its chunks from the engine's limiter
+            engine.limiter.set_rate(message[2])
+        elif message[0] == 'ack':
+            ack = acks.get(message[2])
+            if ack is not None:
+                ack.set()
+
+    engine.close()
@@ -0,0 +1,146 @@
+"""
+Hikari Youtube Video Downloader - Reusable YoutubeDL instances
+
+Creating a YoutubeDL loads and instantiates extractors, and closing it
+tears down its HTTP connections, so building one per analysis or download
+repeats that work for every video. YoutubeDLPool keeps idle instances
+keyed by the options they were created with and lends them out one caller
+at a time, applying per-job overrides (format, output template, hooks,
+postprocessors) for the duration of a session and restoring them after.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+# Options that only take effect when a YoutubeDL is created; instances are pooled by them
+EXTRACT_OPTIONS = {'quiet': True, 'no_warnings': True}
+DOWNLOAD_OPTIONS = {}
+
+DEFAULT_MAX_IDLE = 8
+
+# Hook options and the YoutubeDL methods that register them
+HOOK_ADDERS = {
+    'progress_hooks': 'add_progress_hook',
+    'post_hooks': 'add_post_hook',
+    'postprocessor_hooks': 'add_postprocessor_hook',
+}
+
+# Internal lists restored after a session; without them instances are not reused
+_HOOK_LISTS = ('_progress_hooks', '_post_hooks', '_postprocessor_hooks')
+
+
+class YoutubeDLPool:
+    """Idle YoutubeDL instances by creation options, lent out one session at a time"""
+
+    def __init__(self, max_idle=DEFAULT_MAX_IDLE):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def session(self, base=EXTRACT_OPTIONS, **overrides):
+        """A YoutubeDL created with ``base`` options and ``overrides`` applied
+
+            with pool.session(DOWNLOAD_OPTIONS, format='137+140', outtmpl=...) as ydl:
+                ydl.process_ie_result(info, download=True)
+        """
+        key = tuple(sorted(base.items()))
+        ydl = self._acquire(key, base)
+        if not self._reusable(ydl):
+            # A yt-dlp without the internals relied on here: one instance per call, as before
+            import yt_dlp
+            ydl.close()
+            with yt_dlp.YoutubeDL(dict(base, **overrides)) as ydl:
+                yield ydl
+            return
+
+        saved = self._save(ydl)
+        try:
+            self._apply(ydl, overrides, saved)
+            yield ydl
+        finally:
+            self._restore(ydl, saved)
+            self._release(key, ydl)
+
+    def close(self):
+        """Close every idle instance and its connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for instances in idle.values():
+            for ydl in instances:
+                try:
+                    ydl.close()
+                except Exception as e:
+                    print(f"⚠️ Error closing yt-dlp: {e}")
+
+    def _acquire(self, key, base):
+        with self._lock:
+            instances = self._idle.get(key)
+            if instances:
+                self.reused += 1
+                return instances.pop()
+            self.created += 1
+
+        import yt_dlp
+        return yt_dlp.YoutubeDL(dict(base))
+
+    def _release(self, key, ydl):
+        with self._lock:
+            instances = self._idle.setdefault(key, [])
+            if len(instances) < self.max_idle:
+                instances.append(ydl)
+                return
+        ydl.close()
+
+    @staticmethod
+    def _reusable(ydl):
+        return all(hasattr(ydl, name) for name in _HOOK_LISTS + ('_pps', 'format_selector'))
+
+    @staticmethod
+    def _save(ydl):
+        return {
+            'params': dict(ydl.params),
+            'outtmpl': dict(ydl.params.get('outtmpl') or {}),
+            'format_selector': ydl.format_selector,
+            'hooks': {name: list(getattr(ydl, name)) for name in _HOOK_LISTS},
+            'pps': {when: list(pps) for when, pps in ydl._pps.items()},
+        }
+
+    @staticmethod
+    def _apply(ydl, overrides, saved):
+        from yt_dlp.postprocessor import get_postprocessor
+
+        for name, value in overrides.items():
+            if name in HOOK_ADDERS or name == 'postprocessors':
+                continue
+            if name == 'outtmpl':
+                # Parsed into a dict of templates when the instance was created
+                ydl.params['outtmpl'] = dict(saved['outtmpl'], default=value)
+                continue
+            ydl.params[name] = value
+            if name == 'format':
+                # The selector is compiled when the instance is created
+                ydl.format_selector = ydl.build_format_selector(value)
+
+        # Postprocessors before hooks, so postprocessor hooks reach them once
+        for pp_def in overrides.get('postprocessors', ()):
+            pp_def = dict(pp_def)
+            when = pp_def.pop('when', 'post_process')
+            ydl.add_post_processor(get_postprocessor(pp_def.pop('key'))(ydl, **pp_def), when=when)
+        for name, adder in HOOK_ADDERS.items():
+            for hook in overrides.get(name, ()):
+                getattr(ydl, adder)(hook)
+
+    @staticmethod
+    def _restore(ydl, saved):
+        ydl.params.clear()
+        ydl.params.update(saved['params'])
+        ydl.params['outtmpl'] = saved['outtmpl']
+        ydl.format_selector = saved['format_selector']
+        for name, hooks in saved['hooks'].items():
+            getattr(ydl, name)[:] = hooks
+        for when, pps in saved['pps'].items():
+            ydl._pps[when][:] = pps
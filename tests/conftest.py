@@ -0,0 +1,52 @@
+"""
+Shared fixtures: a local HTTP server that honours byte ranges.
+"""
+
+import http.server
+import random
+import threading
+
+import pytest
+
+
+DATA = random.Random(0).randbytes(5 * 64 * 1024 + 1234)
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves ``server.data`` at any path, honouring single 'bytes=a-b' ranges"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        data = self.server.data
+        body = data
+        requested = self.headers.get('Range')
+        if requested and self.server.ranges:
+            first, _, last = requested.partition('=')[2].partition('-')
+            first, last = int(first), min(int(last or len(data) - 1), len(data) - 1)
+            body = data[first:last + 1]
+            self.server.requested.append((first, last))
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {first}-{last}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """Range-capable server; ``url(path)`` gives its URLs, ``requested`` the ranges asked for"""
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    httpd.data = DATA
+    httpd.ranges = True
+    httpd.requested = []
+    httpd.url = lambda path="video.mp4": f"http://127.0.0.1:{httpd.server_address[1]}/{path}"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
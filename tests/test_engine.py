@@ -0,0 +1,147 @@
+"""
+Format selection of yt-dlp downloads, run offline: process_info is replaced
+by a recorder, so nothing is fetched.
+"""
+
+import os
+from concurrent.futures import Future
+
+import pytest
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+from hikari.bench import synthetic_info
+from hikari.engine import HikariEngine, EngineError
+
+
+VIDEO_ID = "abcdefghijk"
+URL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+def analyzed_info():
+    """An info dict as analysis leaves it, with yt-dlp's default best pair selected"""
+    info = synthetic_info(24, video_id=VIDEO_ID)
+    info.update(extractor="youtube", extractor_key="Youtube", webpage_url=URL)
+    for fmt in info['formats']:
+        fmt['url'] = f"https://example.invalid/{fmt['format_id']}"
+    with yt_dlp.YoutubeDL({'quiet': True, 'format': 'bestvideo*+bestaudio/best'}) as ydl:
+        return ydl.process_ie_result(info, download=False)
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Format IDs and requested formats of every info dict yt-dlp would download"""
+    recorded = []
+
+    def process_info(ydl, info_dict):
+        requested = [f['format_id'] for f in info_dict.get('requested_formats') or ()]
+        recorded.append((info_dict['format_id'], requested))
+
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'process_info', process_info)
+    return recorded
+
+
+def test_analysis_selects_default_pair():
+    assert analyzed_info().get('requested_formats')
+
+
+def test_merged_plan_replaces_stale_pair(downloads, tmp_path):
+    info = analyzed_info()
+    HikariEngine().download(URL, "360p", "webm", "yt-dlp", str(tmp_path), info=info)
+    assert len(downloads) == 1
+    format_id, requested = downloads[0]
+    assert '+' in format_id and requested == format_id.split('+')
+    assert requested != [f['format_id'] for f in info['requested_formats']]
+
+
+def test_single_format_plan_downloads_only_that_format(downloads, tmp_path):
+    info = analyzed_info()
+    HikariEngine().download(URL, "Best audio", "m4a", "yt-dlp", str(tmp_path), info=info)
+    assert downloads == [('140', [])]
+
+
+@pytest.mark.parametrize("quality, format_ext, expected", [
+    ("Best audio", "m4a", '140'),
+    ("64 kbps", "m4a", '139'),
+    ("Best audio", "opus", '251'),
+    ("64 kbps", "opus", '250'),
+    ("128 kbps", "mp3", '140'),
+])
+def test_audio_plans_download_only_the_audio_format(downloads, tmp_path, quality, format_ext, expected):
+    HikariEngine().download(URL, quality, format_ext, "yt-dlp", str(tmp_path), info=analyzed_info())
+    assert downloads == [(expected, [])]
+
+
+class FakeMerges:
+    available = True
+
+    def __init__(self):
+        self.conversions = []
+
+    def merge(self, video_path, audio_path, output_path):
+        return Future()
+
+    def convert(self, source_path, output_path, codec, bitrate=None):
+        self.conversions.append((source_path, output_path, codec, bitrate))
+        return Future()
+
+
+def test_merge_later_downloads_each_stream_once(downloads, tmp_path):
+    engine = HikariEngine(postprocessor=FakeMerges())
+    # The recorder writes no files, so the streams to merge are missing afterwards
+    with pytest.raises(EngineError):
+        engine.download(URL, "1080p", "mp4", "yt-dlp", str(tmp_path), info=analyzed_info())
+    assert len(downloads) == 2
+    assert all('+' not in format_id and requested == [] for format_id, requested in downloads)
+
+
+@pytest.fixture
+def finished_downloads(monkeypatch):
+    """Format ID and postprocessors of every download, each reported as finished to the progress hooks"""
+    recorded = []
+
+    def process_info(ydl, info_dict):
+        recorded.append((info_dict['format_id'], [type(pp).__name__ for pp in ydl._pps['post_process']]))
+        status = {'status': 'finished', 'filename': ydl.prepare_filename(info_dict), 'info_dict': info_dict}
+        for hook in ydl._progress_hooks:
+            hook(status)
+
+    monkeypatch.setattr(yt_dlp.YoutubeDL, 'process_info', process_info)
+    return recorded
+
+
+@pytest.mark.parametrize("quality, format_ext, source, bitrate", [
+    ("128 kbps", "mp3", '140', 128),
+    ("Best audio", "mp3", '251', None),
+])
+def test_conversion_runs_in_the_pool(finished_downloads, tmp_path, quality, format_ext, source, bitrate):
+    pool = FakeMerges()
+    engine = HikariEngine(postprocessor=pool)
+    result = engine.download(URL, quality, format_ext, "yt-dlp", str(tmp_path), info=analyzed_info())
+
+    assert isinstance(result, Future)
+    assert finished_downloads == [(source, [])]
+    [(source_path, output_path, codec, kbps)] = pool.conversions
+    assert os.path.basename(source_path).endswith(f".f{source}.{'m4a' if source == '140' else 'webm'}")
+    assert os.path.splitext(output_path)[1] == f".{format_ext}"
+    assert (codec, kbps) == (format_ext, bitrate)
+
+
+def test_conversion_without_ffmpeg_stays_in_yt_dlp(finished_downloads, tmp_path):
+    pool = FakeMerges()
+    pool.available = False
+    engine = HikariEngine(postprocessor=pool)
+    assert engine.download(URL, "128 kbps", "mp3", "yt-dlp", str(tmp_path), info=analyzed_info()) is True
+    assert finished_downloads == [('140', ['FFmpegExtractAudioPP'])]
+    assert pool.conversions == []
+
+
+def test_download_leaves_shared_info_untouched(downloads, tmp_path):
+    info = analyzed_info()
+    selected = (info['format_id'], [f['format_id'] for f in info['requested_formats']])
+    engine = HikariEngine()
+    engine.download(URL, "Best audio", "m4a", "yt-dlp", str(tmp_path), info=info)
+    engine.download(URL, "720p", "mp4", "yt-dlp", str(tmp_path), info=info)
+    assert (info['format_id'], [f['format_id'] for f in info['requested_formats']]) == selected
+    assert downloads[0] == ('140', [])
+    assert downloads[1][1] == downloads[1][0].split('+')
@@ -0,0 +1,135 @@
+"""
+DownloadQueue bookkeeping with a fake engine.
+"""
+
+import os
+import threading
+import time
+
+from hikari import jobs
+from hikari.archive import DownloadArchive, format_key
+from hikari.bandwidth import BandwidthLimiter
+from hikari.engine import EngineError
+from hikari.jobs import DownloadJob, DownloadQueue, QUEUED, RUNNING, DONE, FAILED, PAUSED
+
+
+class FakeEngine:
+    def __init__(self, fail=()):
+        self.limiter = BandwidthLimiter()
+        self.fail = set(fail)
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def download(self, url, *args, **kwargs):
+        self.gate.wait()
+        if url in self.fail:
+            raise EngineError("boom")
+        return True
+
+
+class NamingEngine(FakeEngine):
+    """Names files '<title>.<ext>' and records what it is asked"""
+
+    def __init__(self):
+        super().__init__()
+        self.extracted = []
+        self.downloads = []
+
+    def extract_info(self, url):
+        self.extracted.append(url)
+        return {'id': url[-11:], 'title': "Old video"}
+
+    def expected_filename(self, info, format_ext, output_folder, is_test=False):
+        return os.path.join(output_folder, f"{info['title']}.{format_ext}")
+
+    def download(self, url, *args, **kwargs):
+        self.downloads.append((url, kwargs.get('info')))
+        return True
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def job(i):
+    return DownloadJob(f"https://www.youtube.com/watch?v=video{i:06d}", "720p", "mp4", "yt-dlp", "/tmp")
+
+
+def test_counts_follow_status_changes():
+    engine = FakeEngine()
+    engine.gate.clear()
+    queue = DownloadQueue(engine, max_workers=1)
+    submitted = [queue.submit(job(i)) for i in range(5)]
+
+    wait_until(lambda: queue.pending_count() == 4)
+    queue.pause(submitted[4])
+    assert queue.pending_count() == 3
+    assert submitted[4].status == PAUSED
+
+    engine.gate.set()
+    wait_until(lambda: queue.active_jobs() == [submitted[4]])
+    assert queue.pending_count() == 0
+    assert [j.job_id for j in queue.jobs] == [j.job_id for j in submitted]
+
+
+def test_finished_jobs_are_capped(monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_FINISHED_JOBS', 10)
+    queue = DownloadQueue(FakeEngine(), max_workers=4)
+    for i in range(50):
+        queue.submit(job(i))
+
+    wait_until(lambda: not queue.active_jobs())
+    assert len(queue.jobs) == 10
+    assert all(j.status == DONE for j in queue.jobs)
+
+
+def test_failed_job_can_be_retried_after_leaving_the_history(monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_FINISHED_JOBS', 2)
+    failing = job(0)
+    engine = FakeEngine(fail={failing.url})
+    queue = DownloadQueue(engine, max_workers=1)
+    queue.submit(failing)
+    wait_until(lambda: failing.status == FAILED)
+    for i in range(1, 5):
+        queue.submit(job(i))
+    wait_until(lambda: not queue.active_jobs())
+    assert failing not in queue.jobs
+
+    engine.fail.clear()
+    queue.resume(failing)
+    assert failing.status in (QUEUED, RUNNING, DONE)
+    wait_until(lambda: failing.status == DONE)
+    assert failing in queue.jobs
+    assert queue.pending_count() == 0
+
+
+def test_file_from_before_the_archive_is_skipped_without_info(tmp_path):
+    (tmp_path / "Old video.mp4").write_bytes(b"video")
+    archive = DownloadArchive(tmp_path / "archive.sqlite")
+    engine = NamingEngine()
+    queue = DownloadQueue(engine, max_workers=1, archive=archive)
+    # Like an imported or resumed job, which has no info
+    imported = DownloadJob("https://www.youtube.com/watch?v=abcdefghijk", "720p", "mp4", "yt-dlp", str(tmp_path))
+    queue.submit(imported)
+
+    wait_until(lambda: imported.status == DONE)
+    assert engine.extracted == [imported.url]
+    assert engine.downloads == []
+    assert imported.title == "Old video"
+    assert archive.contains("abcdefghijk", format_key("720p", "mp4"))
+    archive.close()
+
+
+def test_missing_file_is_downloaded_with_the_extracted_info(tmp_path):
+    archive = DownloadArchive(tmp_path / "archive.sqlite")
+    engine = NamingEngine()
+    queue = DownloadQueue(engine, max_workers=1, archive=archive)
+    imported = DownloadJob("https://www.youtube.com/watch?v=abcdefghijk", "720p", "mp4", "yt-dlp", str(tmp_path))
+    queue.submit(imported)
+
+    wait_until(lambda: imported.status == DONE)
+    assert engine.downloads == [(imported.url, {'id': "abcdefghijk", 'title': "Old video"})]
+    archive.close()
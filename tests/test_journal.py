@@ -0,0 +1,69 @@
+"""
+JobJournal writes and batch submission.
+"""
+
+import json
+import threading
+import time
+
+from hikari.bandwidth import BandwidthLimiter
+from hikari.jobs import DownloadJob, DownloadQueue
+from hikari.journal import JobJournal
+
+
+class IdleEngine:
+    """Never finishes a download, so jobs stay queued"""
+
+    def __init__(self):
+        self.limiter = BandwidthLimiter()
+        self.gate = threading.Event()
+
+    def download(self, *args, **kwargs):
+        self.gate.wait()
+        return True
+
+
+def job(i):
+    return DownloadJob(f"https://www.youtube.com/watch?v=video{i:06d}", "720p", "mp4", "yt-dlp", "/tmp")
+
+
+def test_submit_many_writes_once(tmp_path, monkeypatch):
+    journal = JobJournal(tmp_path / "journal.json")
+    writes = []
+    write = journal._write
+    monkeypatch.setattr(journal, '_write', lambda data: writes.append(data) or write(data))
+    # The background writer is not started, so every write is the flush below
+    monkeypatch.setattr(journal, '_schedule', lambda: None)
+    engine = IdleEngine()
+    queue = DownloadQueue(engine, max_workers=1, journal=journal)
+
+    queue.submit_many(job(i) for i in range(500))
+    journal.flush()
+    engine.gate.set()
+
+    assert len(writes) == 1
+    assert len(json.loads(writes[0])) == 500
+
+
+def test_records_survive_a_restart(tmp_path):
+    path = tmp_path / "journal.json"
+    engine = IdleEngine()
+    queue = DownloadQueue(engine, max_workers=1, journal=JobJournal(path))
+    submitted = queue.submit_many(job(i) for i in range(20))
+    queue.shutdown()
+    engine.gate.set()
+
+    unfinished = JobJournal(path).unfinished()
+    assert [r['key'] for r in unfinished] == [j.key for j in submitted]
+
+
+def test_forced_records_are_written_in_the_background(tmp_path):
+    path = tmp_path / "journal.json"
+    journal = JobJournal(path)
+    journal.record(job(0).to_record(), force=True)
+    assert journal._writer is not threading.current_thread()
+    deadline = time.monotonic() + 5
+    while not path.exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert len(json.loads(path.read_text(encoding='utf-8'))) == 1
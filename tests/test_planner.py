@@ -0,0 +1,90 @@
+"""
+plan_formats and plan_audio over a YouTube-like format table.
+"""
+
+import pytest
+
+from hikari.formats import FormatEntry, FormatTable
+from hikari.planner import plan_audio, plan_formats
+
+
+def entry(format_id, ext, height, vcodec, acodec, tbr, protocol='https'):
+    return FormatEntry(format_id, ext, height, None, 30 if height else None, vcodec, acodec, None, tbr, protocol)
+
+
+# In yt-dlp's order, worst to best
+VIDEO = [
+    entry('18', 'mp4', 360, 'avc1.42001E', 'mp4a.40.2', 500),
+    entry('134', 'mp4', 360, 'avc1.4d401e', 'none', 600),
+    entry('243', 'webm', 360, 'vp9', 'none', 500),
+    entry('22', 'mp4', 720, 'avc1.64001F', 'mp4a.40.2', 1500),
+    entry('136', 'mp4', 720, 'avc1.4d401f', 'none', 2000),
+    entry('247', 'webm', 720, 'vp9', 'none', 1800),
+    entry('96', 'mp4', 1080, 'avc1.640028', 'mp4a.40.2', 4500, 'm3u8_native'),
+    entry('137', 'mp4', 1080, 'avc1.640028', 'none', 4000),
+    entry('248', 'webm', 1080, 'vp9', 'none', 3500),
+]
+AUDIO = [
+    entry('139', 'm4a', 0, 'none', 'mp4a.40.5', 48),
+    entry('250', 'webm', 0, 'none', 'opus', 64),
+    entry('140', 'm4a', 0, 'none', 'mp4a.40.2', 128),
+    entry('251', 'webm', 0, 'none', 'opus', 160),
+]
+TABLE = FormatTable(VIDEO, AUDIO)
+
+
+@pytest.mark.parametrize("height, ext, options, expected", [
+    # Exact heights, paired with audio that fits the container
+    (1080, 'mp4', {}, ('137+140', 'mp4')),
+    (1080, 'webm', {}, ('248+251', 'webm')),
+    (720, 'mp4', {}, ('136+140', 'mp4')),
+    (360, 'webm', {}, ('243+251', 'webm')),
+    (None, 'mp4', {}, ('137+140', 'mp4')),
+    # Nearest height, the lower one on ties
+    (480, 'mp4', {}, ('134+140', 'mp4')),
+    (900, 'mp4', {}, ('136+140', 'mp4')),
+    (144, 'webm', {}, ('243+251', 'webm')),
+    (2160, 'mp4', {}, ('137+140', 'mp4')),
+    # No format in the container: the best one, and any audio
+    (1080, 'mkv', {}, ('248+251', 'mkv')),
+    # Without merging (pytube), formats with sound win over the container
+    (720, 'mp4', {'merge': False}, ('22', 'mp4')),
+    (480, 'webm', {'merge': False}, ('18', 'mp4')),
+    (None, 'mp4', {'merge': False}, ('96', 'mp4')),
+    # Segmented downloads only take progressive HTTP(S) formats
+    (1080, 'mp4', {'merge': False, 'direct': True}, ('22', 'mp4')),
+    (None, 'webm', {'merge': False, 'direct': True}, ('22', 'mp4')),
+    (360, 'mp4', {'merge': False, 'direct': True}, ('18', 'mp4')),
+])
+def test_plan_formats(height, ext, options, expected):
+    plan = plan_formats(TABLE, height, ext, **options)
+    assert (plan.format_ids, plan.ext) == expected
+
+
+def test_direct_without_progressive_formats():
+    table = FormatTable([e for e in VIDEO if not e.has_audio], AUDIO)
+    assert plan_formats(table, 720, 'mp4', merge=False, direct=True) is None
+
+
+def test_video_only_table_is_not_merged():
+    plan = plan_formats(FormatTable(VIDEO), 1080, 'mp4')
+    assert plan.format_ids == '137' and plan.audio is None
+
+
+def test_empty_table():
+    assert plan_formats(FormatTable(), 720, 'mp4') is None
+    assert plan_audio(FormatTable(), None, 'm4a') is None
+
+
+@pytest.mark.parametrize("kbps, ext, expected, conversion", [
+    (None, 'm4a', '140', False),
+    (64, 'm4a', '139', False),
+    (None, 'opus', '251', False),
+    (64, 'opus', '250', False),
+    (128, 'mp3', '140', True),
+    (None, 'mp3', '251', True),
+])
+def test_plan_audio(kbps, ext, expected, conversion):
+    plan = plan_audio(TABLE, kbps, ext)
+    assert plan.audio_only
+    assert (plan.format_ids, plan.ext, plan.needs_conversion) == (expected, ext, conversion)
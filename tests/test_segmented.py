@@ -0,0 +1,55 @@
+"""
+SegmentedDownloader against a local range-capable HTTP server.
+"""
+
+import os
+
+from hikari.segmented import SegmentedDownloader
+
+
+SEGMENT_SIZE = 64 * 1024
+
+
+def test_full_download(http_server, tmp_path):
+    data = http_server.data
+    path = tmp_path / "video.mp4"
+    progress = []
+    segments = []
+    downloader = SegmentedDownloader(connections=3, segment_size=SEGMENT_SIZE)
+    written = downloader.download(http_server.url(), path,
+                                  on_progress=lambda done, total: progress.append((done, total)),
+                                  on_segment=segments.append)
+
+    assert path.read_bytes() == data
+    assert written == len(data)
+    assert max(progress) == (len(data), len(data))
+    assert sorted(segments) == list(range(0, len(data), SEGMENT_SIZE))
+    assert not os.path.exists(str(path) + ".part")
+
+
+def test_resume_from_done_segments(http_server, tmp_path):
+    data = http_server.data
+    path = tmp_path / "video.mp4"
+    done = [0, 2 * SEGMENT_SIZE]
+    # A partial file where only the finished segments hold data
+    partial = bytearray(len(data))
+    for start in done:
+        partial[start:start + SEGMENT_SIZE] = data[start:start + SEGMENT_SIZE]
+    (tmp_path / "video.mp4.part").write_bytes(bytes(partial))
+
+    downloader = SegmentedDownloader(connections=2, segment_size=SEGMENT_SIZE)
+    downloader.download(http_server.url(), path, done_segments=done)
+
+    assert path.read_bytes() == data
+    fetched = {first for first, last in http_server.requested if last > 0}
+    assert not fetched & set(done)
+    assert fetched == set(range(0, len(data), SEGMENT_SIZE)) - set(done)
+
+
+def test_without_ranges_downloads_in_one_stream(http_server, tmp_path):
+    http_server.ranges = False
+    path = tmp_path / "video.mp4"
+    # A wrong size must not be used to lay out ranges
+    SegmentedDownloader(connections=4, segment_size=SEGMENT_SIZE).download(http_server.url(), path,
+                                                                           size=len(http_server.data) // 2)
+    assert path.read_bytes() == http_server.data
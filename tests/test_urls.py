@@ -0,0 +1,75 @@
+"""
+classify_url over the URL shapes people paste.
+"""
+
+import pytest
+
+from hikari.urls import classify_url, classify_urls, extract_video_id
+
+
+VIDEO = "dQw4w9WgXcQ"
+PLAYLIST = "PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf"
+
+
+@pytest.mark.parametrize("url, expected", [
+    # Watch pages, with and without scheme, www and extra parameters
+    (f"https://www.youtube.com/watch?v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"http://youtube.com/watch?v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"youtube.com/watch?v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"  https://www.youtube.com/watch?v={VIDEO}&t=42s", ('normal_video', VIDEO, None)),
+    (f"https://www.youtube.com/watch?feature=share&t=1&v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"https://www.youtube.com/watch?v={VIDEO}#comments", ('normal_video', VIDEO, None)),
+    # Other hosts
+    (f"https://youtu.be/{VIDEO}", ('normal_video', VIDEO, None)),
+    (f"https://youtu.be/{VIDEO}?si=abc123&t=5", ('normal_video', VIDEO, None)),
+    (f"https://m.youtube.com/watch?v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"https://music.youtube.com/watch?v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"HTTPS://WWW.YOUTUBE.COM/watch?v={VIDEO}", ('normal_video', VIDEO, None)),
+    (f"https://www.youtube-nocookie.com/embed/{VIDEO}", ('normal_video', VIDEO, None)),
+    # Video pages under a path
+    (f"https://www.youtube.com/embed/{VIDEO}", ('normal_video', VIDEO, None)),
+    (f"https://www.youtube.com/v/{VIDEO}", ('normal_video', VIDEO, None)),
+    (f"https://www.youtube.com/shorts/{VIDEO}", ('shorts', VIDEO, None)),
+    (f"https://www.youtube.com/live/{VIDEO}?feature=share", ('live', VIDEO, None)),
+    # Playlists
+    (f"https://www.youtube.com/watch?v={VIDEO}&list={PLAYLIST}", ('video_in_playlist', VIDEO, PLAYLIST)),
+    (f"https://www.youtube.com/watch?list={PLAYLIST}&index=3&v={VIDEO}", ('video_in_playlist', VIDEO, PLAYLIST)),
+    (f"https://youtu.be/{VIDEO}?list={PLAYLIST}", ('video_in_playlist', VIDEO, PLAYLIST)),
+    (f"https://www.youtube.com/playlist?list={PLAYLIST}", ('playlist', None, PLAYLIST)),
+    (f"https://music.youtube.com/playlist?list={PLAYLIST}", ('playlist', None, PLAYLIST)),
+    # Channels
+    ("https://www.youtube.com/@SomeChannel", ('channel', None, None)),
+    ("https://www.youtube.com/@SomeChannel/videos", ('channel', None, None)),
+    ("https://www.youtube.com/channel/UC38IQsAvIsxxjztdMZQtwHA", ('channel', None, None)),
+    ("https://www.youtube.com/c/SomeName", ('channel', None, None)),
+    ("https://www.youtube.com/user/someone", ('channel', None, None)),
+    # Not usable
+    ("", ('unknown', None, None)),
+    ("https://vimeo.com/123456", ('unknown', None, None)),
+    (f"https://www.notyoutube.com/watch?v={VIDEO}", ('unknown', None, None)),
+    ("https://www.youtube.com/watch?v=short", ('unknown', None, None)),
+    ("https://www.youtube.com/watch", ('unknown', None, None)),
+    ("https://www.youtube.com/playlist", ('unknown', None, None)),
+    ("https://www.youtube.com/feed/trending", ('unknown', None, None)),
+    ("https://youtu.be/", ('unknown', None, None)),
+])
+def test_classify_url(url, expected):
+    assert classify_url(url) == expected
+
+
+def test_invalid_playlist_id_is_ignored():
+    assert classify_url(f"https://www.youtube.com/watch?v={VIDEO}&list=") == ('normal_video', VIDEO, None)
+
+
+def test_extract_video_id_is_the_same_for_every_form():
+    urls = [f"https://youtu.be/{VIDEO}", f"https://m.youtube.com/watch?v={VIDEO}&list={PLAYLIST}",
+            f"https://www.youtube.com/embed/{VIDEO}", f"https://www.youtube.com/shorts/{VIDEO}"]
+    assert {extract_video_id(url) for url in urls} == {VIDEO}
+
+
+def test_classify_urls_skips_blank_lines():
+    lines = [f"https://youtu.be/{VIDEO}\n", "   \n", "", "nonsense\n"]
+    assert list(classify_urls(lines)) == [
+        (f"https://youtu.be/{VIDEO}", 'normal_video', VIDEO, None),
+        ("nonsense", 'unknown', None, None),
+    ]
@@ -0,0 +1,97 @@
+"""
+ProcessEngine downloads in a spawned worker, from a local HTTP server.
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from hikari.bandwidth import BandwidthLimiter
+from hikari.bench import synthetic_info
+from hikari.workers import ProcessEngine
+
+
+VIDEO_ID = "abcdefghijk"
+URL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+def served_info(base_url, size):
+    """Info dict whose formats all point at ``base_url``"""
+    info = synthetic_info(6, video_id=VIDEO_ID)
+    info.update(title="served", extractor="youtube", extractor_key="Youtube", webpage_url=URL)
+    for fmt in info['formats']:
+        fmt.update(url=f"{base_url}/{fmt['format_id']}", filesize=size, filesize_approx=None)
+    return info
+
+
+class FakeCache:
+    """Hands out ``fresh`` info once the stale entry has been invalidated"""
+
+    def __init__(self, fresh):
+        self.fresh = fresh
+        self.invalidated = []
+
+    def get(self, video_id):
+        return self.fresh if self.invalidated else None
+
+    def put(self, video_id, info):
+        pass
+
+    def invalidate(self, video_id):
+        self.invalidated.append(video_id)
+
+
+@pytest.fixture
+def engine_factory():
+    engines = []
+
+    def create(**kwargs):
+        engine = ProcessEngine(workers=1, **kwargs)
+        assert engine.prewarm()
+        engines.append(engine)
+        return engine
+
+    yield create
+    for engine in engines:
+        engine.close()
+
+
+def download_audio(engine, info, tmp_path):
+    events = []
+    result = engine.download(URL, "Best audio", "m4a", "yt-dlp", str(tmp_path), info=info,
+                             on_event=lambda kind, data: events.append(kind))
+    return result, events
+
+
+def test_download_in_worker(http_server, engine_factory, tmp_path):
+    engine = engine_factory()
+    result, events = download_audio(engine, served_info(http_server.url("f"), len(http_server.data)), tmp_path)
+
+    assert result is True
+    assert 'progress' in events and 'output' in events
+    assert (tmp_path / "served.m4a").read_bytes() == http_server.data
+
+
+def test_rate_limit_reaches_worker(http_server, engine_factory, tmp_path):
+    size = len(http_server.data)
+    engine = engine_factory(limiter=BandwidthLimiter(size // 2))
+    start = time.monotonic()
+    result, _ = download_audio(engine, served_info(http_server.url("f"), size), tmp_path)
+
+    assert result is True
+    # Two seconds of data at the limit, less the initial burst allowance
+    assert time.monotonic() - start > 1.0
+
+
+def test_expired_urls_retried_with_fresh_info(http_server, engine_factory, tmp_path):
+    size = len(http_server.data)
+    cache = FakeCache(served_info(http_server.url("f"), size))
+    engine = engine_factory(cache=cache)
+    # Nothing listens on port 9: the stale stream URLs fail in the worker
+    result, _ = download_audio(engine, served_info("http://127.0.0.1:9", size), tmp_path)
+
+    assert result is True
+    assert cache.invalidated == [VIDEO_ID]
+    assert (tmp_path / "served.m4a").read_bytes() == http_server.data